@@ -0,0 +1,81 @@
+"""
+Warehouse bulk insert benchmark: rows/sec of each LoadService insert method
+(COPY, multi-row VALUES and the per-row executemany baseline).
+
+Each transformation output (built from synthetic source data, see
+benchmarks/synthetic.py) is inserted into a TEMP copy of its warehouse table
+with every method in INSERT_METHODS. Everything runs in one transaction that is
+rolled back, so the warehouse is left untouched.
+
+Needs a reachable Postgres configured through the usual WAREHOUSE_* env vars.
+
+Usage (from the repo root):
+    PYTHONPATH=src:. python -m benchmarks.bulk_insert --scale 1 --tables fact_sales_order fact_payment
+"""
+
+import argparse
+import json
+import time
+
+import pandas as pd
+
+from benchmarks.parquet_profiles import build_outputs
+from loading.db_client_load import WarehouseDBClient
+from loading.load_service import INSERT_METHODS, LoadService
+from loading.sql import CREATE_TABLE_SQL
+
+
+def _bench_table(service: LoadService, db: WarehouseDBClient, table: str, df: pd.DataFrame) -> list[dict]:
+    df = df.where(pd.notnull(df), None)
+    # the output's columns with their warehouse types; no NOT NULL on keys the output lacks
+    col_list = ", ".join(f'"{col}"' for col in df.columns)
+    results = []
+    for method in INSERT_METHODS:
+        temp_table = f"bench_{method}_{table}"
+        db.execute(f'CREATE TEMP TABLE "{temp_table}" AS SELECT {col_list} FROM "{table}" WITH NO DATA')
+        service.insert_method = method
+
+        start = time.perf_counter()
+        rows = service._insert_df(temp_table, df)
+        elapsed = time.perf_counter() - start
+
+        results.append(
+            {
+                "table": table,
+                "method": method,
+                "rows": rows,
+                "seconds": round(elapsed, 3),
+                "rows_per_sec": round(rows / elapsed) if elapsed else None,
+            }
+        )
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark warehouse insert methods")
+    parser.add_argument("--scale", type=float, default=1.0, help="source data scale factor")
+    parser.add_argument("--tables", nargs="*", default=["fact_sales_order", "fact_payment", "fact_purchase_order"])
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    outputs = build_outputs(args.scale)
+    results = []
+    with WarehouseDBClient() as db:
+        # typed tables to clone; created inside the transaction that is rolled back below
+        for table in CREATE_TABLE_SQL:
+            db.execute(CREATE_TABLE_SQL[table])
+        service = LoadService(processed_bucket="benchmark-processed", db=db)
+        try:
+            for table in args.tables:
+                results.extend(_bench_table(service, db, table, outputs[table]))
+        finally:
+            db.conn.rollback()
+
+    print(pd.DataFrame(results).to_string(index=False))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Parquet storage profile benchmark.
+
+Builds every transformation output from synthetic source data (real output
+shapes and dtypes, see benchmarks/synthetic.py) and, for each output, encodes it
+with the configured profile from STORAGE_PROFILES plus a set of alternatives.
+For each (output, profile) it reports:
+    - write_ms: encode time (to_parquet_bytes, as used by write_parquet)
+    - size_kb:  object size that would be PUT to the processed bucket
+    - read_ms:  decode time the loader pays (pd.read_parquet on the bytes)
+
+Usage (from the repo root):
+    PYTHONPATH=src:. python -m benchmarks.parquet_profiles --scale 10 --repeat 3
+    PYTHONPATH=src:. python -m benchmarks.parquet_profiles --json results.json
+"""
+
+import argparse
+import json
+import time
+from io import BytesIO
+
+import pandas as pd
+
+from benchmarks.synthetic import make_source_tables
+from transformation.s3_client import DEFAULT_STORAGE_PROFILE, to_parquet_bytes
+from transformation.transform_service import OUTPUT_NAME, STORAGE_PROFILES, TransformService
+
+ALTERNATIVE_PROFILES = {
+    "snappy": {"compression": "snappy"},
+    "zstd-1": {"compression": "zstd", "compression_level": 1},
+    "zstd-9": {"compression": "zstd", "compression_level": 9},
+    "gzip": {"compression": "gzip"},
+    "uncompressed": {"compression": "none"},
+    "zstd-3-rg64k": {"compression": "zstd", "compression_level": 3, "row_group_size": 64_000},
+    "zstd-3-nodict": {"compression": "zstd", "compression_level": 3, "use_dictionary": False},
+}
+
+
+def build_outputs(scale: float, seed: int = 42) -> dict[str, pd.DataFrame]:
+    # Run the real make_* builders over synthetic raw tables (no S3 reads)
+    service = TransformService(ingest_bucket="benchmark-landing", processed_bucket="benchmark-processed")
+    service._cache = make_source_tables(scale, seed)
+    return {output: getattr(service, method)() for method, output in OUTPUT_NAME.items()}
+
+
+def _best_of(fn, repeat: int) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark(outputs: dict[str, pd.DataFrame], repeat: int) -> list[dict]:
+    results = []
+    for output, df in outputs.items():
+        profiles = {"configured": STORAGE_PROFILES.get(output, DEFAULT_STORAGE_PROFILE), "default": DEFAULT_STORAGE_PROFILE}
+        profiles.update(ALTERNATIVE_PROFILES)
+        for name, profile in profiles.items():
+            write_s, body = _best_of(lambda: to_parquet_bytes(df, profile), repeat)
+            read_s, _ = _best_of(lambda: pd.read_parquet(BytesIO(body)), repeat)
+            results.append(
+                {
+                    "output": output,
+                    "profile": name,
+                    "rows": len(df),
+                    "write_ms": round(write_s * 1000, 2),
+                    "size_kb": round(len(body) / 1024, 1),
+                    "read_ms": round(read_s * 1000, 2),
+                }
+            )
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark parquet storage profiles on transformation outputs")
+    parser.add_argument("--scale", type=float, default=1.0, help="source data scale factor")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions (best is reported)")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = benchmark(build_outputs(args.scale), args.repeat)
+    print(pd.DataFrame(results).to_string(index=False))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+End-to-end pipeline benchmark: ingest -> transform -> load at several scale factors.
+
+For each scale, synthetic source data (benchmarks/synthetic.py) is written to a
+source Postgres database, then the real IngestionService, TransformService and
+LoadService run against moto S3 buckets and the warehouse database. Per stage it
+reports:
+    - seconds:      wall time
+    - rows / rows_per_sec: source rows (ingest, transform) or warehouse rows (load)
+    - s3_requests:  S3 API calls, and s3_bytes_out / s3_bytes_in (request / response bodies)
+    - peak_rss_mb:  peak resident memory of the process during the stage
+
+Results are compared with a stored baseline (one entry per scale); the run exits
+non-zero when any metric regresses by more than --threshold, or when there is no
+baseline to compare with (pass --write-baseline to create one). --metrics limits
+the comparison: CI compares only the S3 counters, since wall time and memory
+depend on the runner the baseline was recorded on.
+
+Needs two reachable Postgres databases, both dropped and re-created table by table
+on every run, so point them at throwaway databases:
+    - source:    DB_HOST / DB_PORT / DB_NAME / DB_USER / DB_PASSWORD
+    - warehouse: the usual WAREHOUSE_* env vars
+
+Usage (from the repo root):
+    PYTHONPATH=src:. python -m benchmarks.pipeline --scales 1 10 --write-baseline
+    PYTHONPATH=src:. python -m benchmarks.pipeline --scales 1 10 --threshold 0.25
+    PYTHONPATH=src:. python -m benchmarks.pipeline --metrics s3_requests s3_bytes_out s3_bytes_in
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from io import BytesIO
+
+import boto3
+import pandas as pd
+from moto import mock_aws
+from pg8000.native import Connection
+
+import loading.load_service as load_service
+from benchmarks.synthetic import make_source_tables
+from ingestion.ingest_service import IngestionService
+from loading.db_client_load import WarehouseDBClient
+from loading.load_service import LoadService
+from loading.sql import CHECKPOINT_TABLE, CREATE_TABLE_SQL
+from observability.memory import peak_rss_mb, reset_peak_rss
+from transformation.transform_service import TransformService
+
+LANDING_BUCKET = "benchmark-landing"
+PROCESSED_BUCKET = "benchmark-processed"
+REGION = "eu-west-2"
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "pipeline.json")
+
+# metric -> which direction is a regression
+REGRESSION_METRICS = {
+    "seconds": "higher",
+    "rows_per_sec": "lower",
+    "s3_requests": "higher",
+    "s3_bytes_out": "higher",
+    "s3_bytes_in": "higher",
+    "peak_rss_mb": "higher",
+}
+
+
+class S3Counter:
+    # Counts S3 calls and body bytes through botocore events on the default session.
+    # Clients copy the session's handlers when created, so install before the services.
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def install(self) -> None:
+        events = boto3.DEFAULT_SESSION.events
+        events.register("before-send.s3", self._before_send)
+        events.register("after-call.s3", self._after_call)
+
+    def _before_send(self, request, **kwargs) -> None:
+        self.requests += 1
+        # streamed (aws-chunked) uploads carry their size in the decoded length header
+        headers = request.headers
+        self.bytes_out += int(headers.get("X-Amz-Decoded-Content-Length") or headers.get("Content-Length") or 0)
+
+    def _after_call(self, http_response, **kwargs) -> None:
+        self.bytes_in += int(http_response.headers.get("content-length") or 0)
+
+
+def _source_type(column: str, series: pd.Series) -> str:
+    if column in ("created_at", "last_updated"):
+        return "TIMESTAMP"
+    if column.endswith("_date"):
+        return "DATE"
+    kind = pd.api.types.infer_dtype(series, skipna=True)
+    if kind == "boolean":
+        return "BOOLEAN"
+    if kind == "integer":
+        return "BIGINT"
+    if kind == "floating":
+        return "NUMERIC"
+    return "TEXT"
+
+
+def seed_source(tables: dict[str, pd.DataFrame]) -> None:
+    conn = Connection(
+        host=os.getenv("DB_HOST"),
+        port=int(os.getenv("DB_PORT", "5432")),
+        database=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+    )
+    try:
+        for table, df in tables.items():
+            columns = ", ".join(f'"{col}" {_source_type(col, df[col])}' for col in df.columns)
+            conn.run(f'DROP TABLE IF EXISTS "{table}" CASCADE')
+            conn.run(f'CREATE TABLE "{table}" ({columns})')
+            body = BytesIO(df.to_csv(index=False, header=False).encode("utf-8"))
+            conn.run(f'COPY "{table}" FROM STDIN WITH (FORMAT csv)', stream=body)
+    finally:
+        conn.close()
+
+
+def reset_warehouse() -> None:
+    tables = ", ".join(f'"{table}"' for table in [*CREATE_TABLE_SQL, CHECKPOINT_TABLE])
+    with WarehouseDBClient() as db:
+        db.execute(f"DROP TABLE IF EXISTS {tables} CASCADE;")
+    # same process, fresh warehouse: forget what the loader cached about it
+    load_service._CATALOG_CACHE.clear()
+    load_service._CHECKPOINT_TABLE_READY.clear()
+    load_service._KEY_MAPS.clear()
+
+
+def _stage(name: str, counter: S3Counter, fn) -> tuple[dict, object]:
+    counter.reset()
+    reset_peak_rss()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    return {
+        "stage": name,
+        "seconds": round(seconds, 3),
+        "s3_requests": counter.requests,
+        "s3_bytes_out": counter.bytes_out,
+        "s3_bytes_in": counter.bytes_in,
+        "peak_rss_mb": peak_rss_mb(),
+    }, result
+
+
+def run_pipeline(scale: float, args: argparse.Namespace) -> list[dict]:
+    source = make_source_tables(scale)
+    source_rows = sum(len(df) for df in source.values())
+    seed_source(source)
+    reset_warehouse()
+
+    with mock_aws():
+        boto3.setup_default_session(region_name=REGION)
+        counter = S3Counter()
+        counter.install()
+        s3 = boto3.client("s3")
+        for bucket in (LANDING_BUCKET, PROCESSED_BUCKET):
+            s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": REGION})
+
+        def ingest():
+            service = IngestionService(bucket=LANDING_BUCKET)
+            try:
+                return service.ingest_all_tables(tables=list(source))
+            finally:
+                service.close()
+
+        def transform():
+            return TransformService(ingest_bucket=LANDING_BUCKET, processed_bucket=PROCESSED_BUCKET).run()
+
+        def load():
+            with WarehouseDBClient() as db:
+                service = LoadService(
+                    processed_bucket=PROCESSED_BUCKET,
+                    db=db,
+                    insert_method=args.insert_method,
+                    dim_mode=args.dim_mode,
+                    fact_mode=args.fact_mode,
+                    # dim_mode="swap" swaps each dim on its own connection
+                    db_factory=WarehouseDBClient,
+                )
+                return service.load_all_tables()
+
+        ingest_stats, ingested = _stage("ingest", counter, ingest)
+        ingest_stats["rows"] = sum(r.get("row_count", 0) for r in ingested.values())
+        transform_stats, _ = _stage("transform", counter, transform)
+        transform_stats["rows"] = source_rows
+        load_stats, loaded = _stage("load", counter, load)
+        load_stats["rows"] = sum(r.get("rows", 0) for r in loaded["tables"])
+
+    results = []
+    for stats in (ingest_stats, transform_stats, load_stats):
+        stats["rows_per_sec"] = round(stats["rows"] / stats["seconds"]) if stats["seconds"] else None
+        results.append({"scale": scale, **stats})
+    return results
+
+
+def compare(results: list[dict], baseline: dict, threshold: float, metrics: list[str] | None = None) -> list[str]:
+    """
+    Returns one message per metric that is worse than the baseline by more than
+    threshold (a fraction: 0.25 = 25%). Only metrics are compared when given.
+    A stage / scale missing from the baseline is reported too, so a run at a new
+    scale cannot pass without comparing anything.
+    """
+    regressions = []
+    for row in results:
+        base = baseline.get(f"scale={row['scale']:g}", {}).get(row["stage"])
+        if not base:
+            regressions.append(f"scale={row['scale']:g} {row['stage']}: not in the baseline")
+            continue
+        for metric, worse in REGRESSION_METRICS.items():
+            if metrics is not None and metric not in metrics:
+                continue
+            current, previous = row.get(metric), base.get(metric)
+            if current is None or not previous:
+                continue
+            change = (current - previous) / previous
+            if (worse == "higher" and change > threshold) or (worse == "lower" and -change > threshold):
+                regressions.append(
+                    f"scale={row['scale']:g} {row['stage']} {metric}: {previous} -> {current} ({change:+.0%})"
+                )
+    return regressions
+
+
+def to_baseline(results: list[dict]) -> dict:
+    baseline: dict = {}
+    for row in results:
+        metrics = {metric: row[metric] for metric in ("rows", *REGRESSION_METRICS)}
+        baseline.setdefault(f"scale={row['scale']:g}", {})[row["stage"]] = metrics
+    return baseline
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the ingest -> transform -> load pipeline")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0], help="source data scale factors")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare with / write")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression as a fraction")
+    parser.add_argument("--write-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument(
+        "--metrics", nargs="+", choices=list(REGRESSION_METRICS), help="compare only these metrics (default: all)"
+    )
+    parser.add_argument("--insert-method", default="copy")
+    parser.add_argument("--dim-mode", default="merge")
+    parser.add_argument("--fact-mode", default="append")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args(argv)
+    # fail before the (slow) run rather than silently passing without a baseline
+    if not args.write_baseline and not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --write-baseline to create one")
+        sys.exit(1)
+
+    results = [row for scale in args.scales for row in run_pipeline(scale, args)]
+    print(pd.DataFrame(results).to_string(index=False))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.write_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(to_baseline(results), f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.threshold, args.metrics)
+    if regressions:
+        print("Regressions over threshold / missing from the baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"No regressions over {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Synthetic totesys-shaped source data for benchmarks.
+
+make_source_tables(scale) returns one DataFrame per source table, with the same
+columns and value formats the ingestion stage writes to the landing bucket.
+scale multiplies the high-volume tables (sales_order, purchase_order, payment,
+transaction, design); reference tables keep their real size.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Row counts at scale=1, roughly the size of the real source database
+BASE_ROWS = {
+    "currency": 3,
+    "department": 8,
+    "staff": 20,
+    "address": 30,
+    "counterparty": 20,
+    "payment_type": 4,
+    "design": 300,
+    "sales_order": 10_000,
+    "purchase_order": 2_000,
+    "transaction": 12_000,
+    "payment": 12_000,
+}
+
+SCALED_TABLES = {"design", "sales_order", "purchase_order", "transaction", "payment"}
+
+START = pd.Timestamp("2022-11-03 14:20:49")
+SPAN_SECONDS = 3 * 365 * 24 * 3600
+
+
+def row_counts(scale: float) -> dict[str, int]:
+    return {
+        table: max(1, int(rows * scale)) if table in SCALED_TABLES else rows
+        for table, rows in BASE_ROWS.items()
+    }
+
+
+def _timestamps(rng: np.random.Generator, n: int) -> tuple[pd.Series, pd.Series]:
+    created = START + pd.to_timedelta(np.sort(rng.integers(0, SPAN_SECONDS, n)), unit="s")
+    updated = created + pd.to_timedelta(rng.integers(0, 30 * 24 * 3600, n), unit="s")
+    fmt = "%Y-%m-%d %H:%M:%S.%f"
+    return pd.Series(created.strftime(fmt)), pd.Series(updated.strftime(fmt))
+
+
+def _dates(rng: np.random.Generator, created: pd.Series, max_days: int) -> pd.Series:
+    base = pd.to_datetime(created)
+    return (base + pd.to_timedelta(rng.integers(1, max_days, len(base)), unit="D")).dt.strftime("%Y-%m-%d")
+
+
+def _ids(n: int) -> np.ndarray:
+    return np.arange(1, n + 1)
+
+
+def make_source_tables(scale: float = 1.0, seed: int = 42) -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    n = row_counts(scale)
+    tables: dict[str, pd.DataFrame] = {}
+
+    def frame(table: str, columns: dict) -> pd.DataFrame:
+        created, updated = _timestamps(rng, n[table])
+        df = pd.DataFrame(columns)
+        df["created_at"] = created
+        df["last_updated"] = updated
+        return df
+
+    tables["currency"] = frame(
+        "currency",
+        {"currency_id": _ids(n["currency"]), "currency_code": ["GBP", "USD", "EUR"][: n["currency"]]},
+    )
+    tables["department"] = frame(
+        "department",
+        {
+            "department_id": _ids(n["department"]),
+            "department_name": [f"Department {i}" for i in range(n["department"])],
+            "location": rng.choice(["Leeds", "Manchester", "London"], n["department"]),
+            "manager": [f"Manager {i}" for i in range(n["department"])],
+        },
+    )
+    tables["staff"] = frame(
+        "staff",
+        {
+            "staff_id": _ids(n["staff"]),
+            "first_name": [f"First{i}" for i in range(n["staff"])],
+            "last_name": [f"Last{i}" for i in range(n["staff"])],
+            "department_id": rng.integers(1, n["department"] + 1, n["staff"]),
+            "email_address": [f"staff{i}@terrifictotes.com" for i in range(n["staff"])],
+        },
+    )
+    tables["address"] = frame(
+        "address",
+        {
+            "address_id": _ids(n["address"]),
+            "address_line_1": [f"{i} High Street" for i in range(n["address"])],
+            "address_line_2": rng.choice(["", "Flat 1", None], n["address"]),
+            "district": rng.choice(["North", "South", None], n["address"]),
+            "city": rng.choice(["Leeds", "York", "Bath"], n["address"]),
+            "postal_code": [f"AB{i} 1CD" for i in range(n["address"])],
+            "country": rng.choice(["UK", "France", "Germany"], n["address"]),
+            "phone": [f"0113 {i:06d}" for i in range(n["address"])],
+        },
+    )
+    tables["counterparty"] = frame(
+        "counterparty",
+        {
+            "counterparty_id": _ids(n["counterparty"]),
+            "counterparty_legal_name": [f"Counterparty {i} Ltd" for i in range(n["counterparty"])],
+            "legal_address_id": rng.integers(1, n["address"] + 1, n["counterparty"]),
+            "commercial_contact": [f"Contact {i}" for i in range(n["counterparty"])],
+            "delivery_contact": [f"Delivery {i}" for i in range(n["counterparty"])],
+        },
+    )
+    tables["payment_type"] = frame(
+        "payment_type",
+        {
+            "payment_type_id": _ids(n["payment_type"]),
+            "payment_type_name": ["SALES_RECEIPT", "SALES_REFUND", "PURCHASE_PAYMENT", "PURCHASE_REFUND"][: n["payment_type"]],
+        },
+    )
+    tables["design"] = frame(
+        "design",
+        {
+            "design_id": _ids(n["design"]),
+            "design_name": rng.choice(["Wooden", "Bronze", "Granite", "Steel"], n["design"]),
+            "file_location": "/usr/share/designs",
+            "file_name": [f"design-{i}.json" for i in range(n["design"])],
+        },
+    )
+
+    so = frame(
+        "sales_order",
+        {
+            "sales_order_id": _ids(n["sales_order"]),
+            "design_id": rng.integers(1, n["design"] + 1, n["sales_order"]),
+            "staff_id": rng.integers(1, n["staff"] + 1, n["sales_order"]),
+            "counterparty_id": rng.integers(1, n["counterparty"] + 1, n["sales_order"]),
+            "units_sold": rng.integers(1000, 100_000, n["sales_order"]),
+            "unit_price": np.round(rng.uniform(2, 4, n["sales_order"]), 2),
+            "currency_id": rng.integers(1, n["currency"] + 1, n["sales_order"]),
+            "agreed_delivery_location_id": rng.integers(1, n["address"] + 1, n["sales_order"]),
+        },
+    )
+    so["agreed_delivery_date"] = _dates(rng, so["created_at"], 30)
+    so["agreed_payment_date"] = _dates(rng, so["created_at"], 30)
+    tables["sales_order"] = so
+
+    po = frame(
+        "purchase_order",
+        {
+            "purchase_order_id": _ids(n["purchase_order"]),
+            "staff_id": rng.integers(1, n["staff"] + 1, n["purchase_order"]),
+            "counterparty_id": rng.integers(1, n["counterparty"] + 1, n["purchase_order"]),
+            "item_code": [f"ITEM{i % 500:04d}" for i in range(n["purchase_order"])],
+            "item_quantity": rng.integers(1, 1000, n["purchase_order"]),
+            "item_unit_price": np.round(rng.uniform(1, 1000, n["purchase_order"]), 2),
+            "currency_id": rng.integers(1, n["currency"] + 1, n["purchase_order"]),
+            "agreed_delivery_location_id": rng.integers(1, n["address"] + 1, n["purchase_order"]),
+        },
+    )
+    po["agreed_delivery_date"] = _dates(rng, po["created_at"], 30)
+    po["agreed_payment_date"] = _dates(rng, po["created_at"], 30)
+    tables["purchase_order"] = po
+
+    is_sale = rng.random(n["transaction"]) < n["sales_order"] / (n["sales_order"] + n["purchase_order"])
+    tables["transaction"] = frame(
+        "transaction",
+        {
+            "transaction_id": _ids(n["transaction"]),
+            "transaction_type": np.where(is_sale, "SALE", "PURCHASE"),
+            "sales_order_id": np.where(is_sale, rng.integers(1, n["sales_order"] + 1, n["transaction"]), None),
+            "purchase_order_id": np.where(~is_sale, rng.integers(1, n["purchase_order"] + 1, n["transaction"]), None),
+        },
+    )
+
+    pay = frame(
+        "payment",
+        {
+            "payment_id": _ids(n["payment"]),
+            "transaction_id": rng.integers(1, n["transaction"] + 1, n["payment"]),
+            "counterparty_id": rng.integers(1, n["counterparty"] + 1, n["payment"]),
+            "payment_amount": np.round(rng.uniform(10, 100_000, n["payment"]), 2),
+            "currency_id": rng.integers(1, n["currency"] + 1, n["payment"]),
+            "payment_type_id": rng.integers(1, n["payment_type"] + 1, n["payment"]),
+            "paid": rng.random(n["payment"]) < 0.5,
+            "company_ac_number": rng.integers(10_000_000, 99_999_999, n["payment"]),
+            "counterparty_ac_number": rng.integers(10_000_000, 99_999_999, n["payment"]),
+        },
+    )
+    pay["payment_date"] = _dates(rng, pay["created_at"], 60)
+    tables["payment"] = pay
+
+    return tables
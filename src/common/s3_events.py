@@ -0,0 +1,34 @@
+"""
+S3 object notifications as delivered to the pipeline Lambdas.
+
+The transformation Lambda is invoked directly by the landing bucket; the loading
+Lambda reads processed-zone notifications from SQS, where every message body is
+itself an S3 notification. extract_s3_records() flattens both shapes.
+"""
+
+import json
+import urllib.parse
+from typing import List, Optional, Tuple
+
+
+def extract_s3_records(event) -> List[Tuple[str, Optional[str]]]:
+    """
+    Returns (object_key, sqs_message_id) for every S3 object in the event, with the
+    key URL-decoded. message_id is None for direct S3 notifications.
+    """
+    found = []
+    for record in event.get("Records") or []:
+        if record.get("eventSource") == "aws:sqs":
+            message_id = record.get("messageId")
+            body = json.loads(record.get("body") or "{}")
+            # s3:TestEvent messages carry no Records
+            s3_records = body.get("Records", [])
+        else:
+            message_id = None
+            s3_records = [record]
+
+        for s3_record in s3_records:
+            raw_key = s3_record.get("s3", {}).get("object", {}).get("key")
+            if raw_key:
+                found.append((urllib.parse.unquote_plus(raw_key), message_id))
+    return found
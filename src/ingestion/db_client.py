@@ -209,6 +209,36 @@ class DatabaseClient:
             logger.exception(f"Failed to fetch incremental data from table '{table_name}','{e}'")
             raise
 
+    def fetch_window(self, table_name: str, start: datetime, end: datetime):
+        """
+        Fetches the rows whose timestamp column falls in [start, end), for windowed
+        backfills. Uses the same timestamp column as fetch_changes.
+        """
+        logger.info(f"Fetching window of '{table_name}' from '{start}' to '{end}'")
+
+        if not table_name.isidentifier():
+            raise ValueError(f"Unsafe table name: {table_name}")
+
+        timestamp_col = self.infer_timestamp_column(table_name)
+        if timestamp_col is None:
+            raise ValueError(f"Table '{table_name}' has no timestamp column to window on")
+
+        sql = f"""
+            SELECT *
+            FROM {table_name}
+            WHERE {timestamp_col} >= :start AND {timestamp_col} < :end
+            ORDER BY {timestamp_col} ASC;
+        """
+
+        try:
+            rows = self.run(sql, {"start": start, "end": end})
+            logger.info(f"Fetched {len(rows)} rows from '{table_name}' in window")
+            return rows
+
+        except Exception as e:
+            logger.exception(f"Failed to fetch window from table '{table_name}','{e}'")
+            raise
+
     def close(self):
         try:
             self.conn.close()
@@ -2,6 +2,8 @@ from ingestion.db_client import DatabaseClient
 from ingestion.s3_client import S3Client
 from datetime import datetime, timezone
 import logging
+from observability.memory import track
+from observability.tracing import span
 
 
 logger = logging.getLogger()
@@ -62,10 +64,13 @@ class IngestionService:
 
         try:
             # Get last checkpoint from S3
-            last_checkpoint = self.s3.get_checkpoint(table_name)
+            with span("checkpoint_read", table=table_name):
+                last_checkpoint = self.s3.get_checkpoint(table_name)
 
             # Fetch new/updated rows from DB since last checkpoint
-            changes = self.db.fetch_changes(table_name, since=last_checkpoint)
+            with span("db_fetch", table=table_name) as attrs:
+                changes = self.db.fetch_changes(table_name, since=last_checkpoint)
+                attrs["rows"] = len(changes)
 
             logger.info(f"Fetched {len(changes)} changed rows from table '{table_name}' since '{last_checkpoint}'")
             if not changes:
@@ -81,19 +86,7 @@ class IngestionService:
 
             logger.info(f"Incremental ingestion complete for table '{table_name}'. " f"Uploaded to S3 key: {s3_key}")
 
-            timestamp_col = self.db.infer_timestamp_column(table_name)
-            if timestamp_col is not None:
-                raw_checkpoint = max(row[timestamp_col] for row in changes)
-                if isinstance(raw_checkpoint, str):
-                    new_checkpoint = datetime.fromisoformat(raw_checkpoint)
-                else:
-                    new_checkpoint = raw_checkpoint
-                self.s3.write_checkpoint(table_name, timestamp=new_checkpoint)
-                logger.info(f"Updated checkpoint for table '{table_name}' to '{new_checkpoint}'")
-                checkpoint_str = new_checkpoint.isoformat()
-            else:
-                checkpoint_str = None
-                logger.info(f"[{table_name}] No timestamp column found; checkpoint not updated.")
+            checkpoint_str = self._advance_checkpoint(table_name, changes)
 
             # RETURN METADATA ONLY (no heavy payload)
             return {
@@ -107,6 +100,59 @@ class IngestionService:
             logger.exception(f"Incremental ingestion FAILED for table '{table_name}'. Error: {e}")
             raise
 
+    def extract_table(self, table_name: str, persist: bool = False, window: tuple[datetime, datetime] | None = None):
+        """
+        Fetches every row of a table regardless of the checkpoint (full rebuilds), or
+        only the rows in window=(start, end) (windowed backfills).
+        persist=True also uploads the rows and advances the checkpoint, as
+        ingest_table_changes does; it cannot be combined with window, since a
+        window's max timestamp could move the checkpoint backwards.
+        Returns the metadata plus "rows" and "columns".
+        """
+        if persist and window is not None:
+            raise ValueError(f"extract_table('{table_name}'): persist=True cannot be used with a window")
+        logger.info(f"Extracting table '{table_name}' (persist={persist}, window={window})")
+
+        with span("db_fetch", table=table_name) as attrs:
+            if window is not None:
+                rows = self.db.fetch_window(table_name, *window)
+            else:
+                rows = self.db.fetch_changes(table_name, since=None)
+            attrs["rows"] = len(rows)
+        # an empty table still needs its columns for the transform
+        columns = list(rows[0]) if rows else [col["column_name"] for col in self.db.get_columns(table_name)]
+
+        s3_key = None
+        checkpoint_str = None
+        if persist and rows:
+            s3_key = self.s3.write_json(table_name=table_name, data=rows)
+            checkpoint_str = self._advance_checkpoint(table_name, rows)
+
+        return {
+            "table": table_name,
+            "row_count": len(rows),
+            "s3_key": s3_key,
+            "checkpoint": checkpoint_str,
+            "columns": columns,
+            "rows": rows,
+        }
+
+    def _advance_checkpoint(self, table_name: str, rows: list[dict]) -> str | None:
+        timestamp_col = self.db.infer_timestamp_column(table_name)
+        if timestamp_col is None:
+            logger.info(f"[{table_name}] No timestamp column found; checkpoint not updated.")
+            return None
+
+        raw_checkpoint = max(row[timestamp_col] for row in rows)
+        if isinstance(raw_checkpoint, str):
+            new_checkpoint = datetime.fromisoformat(raw_checkpoint)
+        else:
+            new_checkpoint = raw_checkpoint
+        with span("checkpoint_write", table=table_name):
+            self.s3.write_checkpoint(table_name, timestamp=new_checkpoint)
+        logger.info(f"Updated checkpoint for table '{table_name}' to '{new_checkpoint}'")
+        return new_checkpoint.isoformat()
+
     def ingest_all_tables(self, tables: list[str] | None = None, limit: int = 50):
         """
         Ingests new rows from all tables in the database.
@@ -122,14 +168,17 @@ class IngestionService:
                 logger.info(f"Skipping internal table '{table}'")
                 continue
 
-            try:
-                # CHANGED LINE 142
-                result = self.ingest_table_changes(table)
-                results[table] = {"status": "success", **result}
-
-            except Exception as e:
-                logger.error(f"Failed to ingest table '{table}'")
-                results[table] = {"status": "error", "error": str(e)}
+            with track("ingestion", table) as memory:
+                try:
+                    # CHANGED LINE 142
+                    result = self.ingest_table_changes(table)
+                    results[table] = {"status": "success", **result}
+
+                except Exception as e:
+                    logger.error(f"Failed to ingest table '{table}'")
+                    results[table] = {"status": "error", "error": str(e)}
+            if memory:
+                results[table]["memory"] = memory
 
         logger.info("All-table ingestion completed.")
         return results
@@ -2,6 +2,7 @@ import json
 import logging
 import os
 from ingestion.ingest_service import IngestionService
+from observability.tracing import invocation
 
 
 logger = logging.getLogger()
@@ -9,6 +10,12 @@ logger.setLevel(logging.INFO)
 
 
 def lambda_handler(event, context):
+    # span timings are emitted as CloudWatch EMF when the invocation ends
+    with invocation("ingestion"):
+        return _handle(event, context)
+
+
+def _handle(event, context):
     logger.info(f"Lambda triggered with event: {event}")
     bucket = os.getenv("LANDING_BUCKET_NAME")
     if not bucket:
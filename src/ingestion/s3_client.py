@@ -3,6 +3,8 @@ import json
 from datetime import datetime, timezone
 import logging
 
+from observability.tracing import span
+
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -25,7 +27,10 @@ class S3Client:
         logger.info(f"Uploading JSON to S3 → bucket={self.bucket}, key={key}, rows={len(data)}")
 
         try:
-            self.s3.put_object(Bucket=self.bucket, Key=key, Body=json.dumps(data, default=str))
+            with span("json_serialize", table=table_name, rows=len(data)):
+                body = json.dumps(data, default=str)
+            with span("s3_put", table=table_name, bytes=len(body)):
+                self.s3.put_object(Bucket=self.bucket, Key=key, Body=body)
 
             logger.info(f"S3 upload successful → s3://{self.bucket}/{key}")
             return key
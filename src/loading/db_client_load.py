@@ -1,9 +1,13 @@
 import logging
 import os
 from contextlib import AbstractContextManager
-from typing import Any, List, Optional, Sequence, Tuple
+from io import BytesIO
+from typing import Any, Iterator, List, Optional, Sequence, Tuple, Union
 
+import pandas as pd
 import pg8000.dbapi
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 
 logger = logging.getLogger(__name__)
 logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
@@ -13,6 +17,7 @@ class WarehouseDBClient(AbstractContextManager):
     # Warehouse Postgres client (Loading Zone).
     # - Uses pg8000.dbapi for standard cursor/commit semantics
     # - Supports efficient cursor.executemany()
+    # - Bulk loads DataFrames / Arrow tables with COPY ... FROM STDIN (copy_from_df)
 
 
     def __init__(self):
@@ -66,6 +71,14 @@ class WarehouseDBClient(AbstractContextManager):
                 logger.exception("Error closing database connection: %s", e)
             self.conn = None
 
+    def commit(self) -> None:
+
+        # Commit the work so far and start a new transaction on the same connection.
+        # Lets a caller keep long bulk loads out of a short lock-holding transaction.
+        self._require_connection()
+        self.conn.commit()
+        logger.info("Transaction committed")
+
     def _require_connection(self) -> None:
         if self.conn is None:
             raise RuntimeError("Database connection is not established. Use 'with' context manager.")
@@ -125,4 +138,64 @@ class WarehouseDBClient(AbstractContextManager):
             logger.info("Fetched %s rows", len(results))
             return results
         finally:
-            cur.close() 
\ No newline at end of file
+            cur.close()
+
+    def copy_from_df(
+        self,
+        table: str,
+        data: Union[pd.DataFrame, pa.Table],
+        columns: Optional[List[str]] = None,
+        batch_rows: int = 50_000,
+    ) -> int:
+
+        # Bulk load rows with COPY "table" (cols) FROM STDIN (FORMAT csv).
+        # The frame is converted to Arrow once and streamed one record batch at a
+        # time through Arrow's CSV writer, so memory stays at one batch of CSV.
+        # NULL = unquoted empty field, empty string = "" (COPY csv defaults).
+        # Returns the number of rows copied.
+        #
+        # CSV rather than FORMAT binary on purpose: binary COPY has to send every value
+        # in the exact wire encoding of the target column (int4 vs int8, NUMERIC as
+        # base-10000 digit groups, DATE/TIME as offsets from 2000-01-01) and the server
+        # rejects any mismatch, while pg8000 ships no binary COPY encoder. Our frames do
+        # not carry the warehouse column types (pandas int64 for INT, float for NUMERIC),
+        # so CSV lets Postgres parse each field with the column's own input function.
+        # Arrow's C++ CSV writer keeps the encoding side off the Python interpreter.
+        self._require_connection()
+
+        arrow_table = self._to_arrow(data)
+        if columns is not None:
+            arrow_table = arrow_table.select(columns)
+        if arrow_table.num_rows == 0:
+            logger.info("No rows to COPY into %s; skipping.", table)
+            return 0
+
+        col_list = ", ".join(f'"{col}"' for col in arrow_table.column_names)
+        sql = f'COPY "{table}" ({col_list}) FROM STDIN WITH (FORMAT csv)'
+        logger.info("COPY %s rows into %s", arrow_table.num_rows, table)
+
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql, stream=self._csv_chunks(arrow_table, batch_rows))
+        finally:
+            cur.close()
+        return arrow_table.num_rows
+
+    @staticmethod
+    def _to_arrow(data: Union[pd.DataFrame, pa.Table]) -> pa.Table:
+        if isinstance(data, pa.Table):
+            return data
+        try:
+            return pa.Table.from_pandas(data, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # mixed-type object columns: let Postgres parse their text form
+            mixed = data.select_dtypes(include="object").columns
+            return pa.Table.from_pandas(data.astype({col: "string" for col in mixed}), preserve_index=False)
+
+    @staticmethod
+    def _csv_chunks(arrow_table: pa.Table, batch_rows: int) -> Iterator[bytes]:
+        options = pa_csv.WriteOptions(include_header=False)
+        for batch in arrow_table.to_batches(max_chunksize=batch_rows):
+            buffer = BytesIO()
+            pa_csv.write_csv(batch, buffer, options)
+            yield buffer.getvalue()
@@ -0,0 +1,64 @@
+import logging
+import os
+from typing import Any, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+
+
+class DimensionKeyMap:
+
+    # Natural id -> warehouse surrogate key for one dimension.
+    # - Two int64 numpy arrays sorted by natural id; lookups are one searchsorted per batch
+    # - high_water = largest surrogate key seen, so refreshes only fetch rows added since
+    # - Unknown / NULL natural ids resolve to NULL: there is no unknown-member row,
+    #   the facts' foreign keys on the natural ids already reject unknown ids
+
+    def __init__(self):
+        self.natural = np.empty(0, dtype=np.int64)
+        self.surrogate = np.empty(0, dtype=np.int64)
+        self.high_water: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.natural)
+
+    def update(self, rows: Iterable[Sequence[Any]]) -> int:
+
+        # Merges (natural_id, surrogate_key) rows into the map; a natural id seen
+        # again keeps its newest surrogate key. Returns the number of rows merged.
+        pairs = np.asarray(list(rows), dtype=np.int64).reshape(-1, 2)
+        if len(pairs) == 0:
+            return 0
+
+        natural = np.concatenate([self.natural, pairs[:, 0]])
+        surrogate = np.concatenate([self.surrogate, pairs[:, 1]])
+        # unique() keeps the first occurrence, so look at the pairs newest first
+        natural, first = np.unique(natural[::-1], return_index=True)
+        self.natural = natural
+        self.surrogate = surrogate[::-1][first]
+
+        batch_high = int(pairs[:, 1].max())
+        self.high_water = batch_high if self.high_water is None else max(self.high_water, batch_high)
+        return len(pairs)
+
+    def lookup(self, natural_ids: pd.Series) -> Tuple[pd.arrays.IntegerArray, np.ndarray]:
+
+        # Vectorized resolution of a column of natural ids.
+        # Returns (surrogate_keys, missing_mask): nullable Int64 keys, NULL for NULL
+        # and missing ids; missing_mask marks the non-NULL ids not in the map.
+        values = pd.to_numeric(natural_ids, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        known = ~np.isnan(values)
+        ids = np.where(known, values, 0).astype(np.int64)
+
+        keys = np.zeros(len(ids), dtype=np.int64)
+        if len(self.natural):
+            pos = np.searchsorted(self.natural, ids)
+            pos_clipped = np.minimum(pos, len(self.natural) - 1)
+            found = known & (self.natural[pos_clipped] == ids)
+            keys[found] = self.surrogate[pos_clipped[found]]
+        else:
+            found = np.zeros(len(ids), dtype=bool)
+        return pd.arrays.IntegerArray(keys, ~found), known & ~found
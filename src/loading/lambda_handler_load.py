@@ -1,9 +1,12 @@
 import json
 import logging
 import os
+from typing import Dict, List, Optional, Tuple
 
+from common.s3_events import extract_s3_records
 from loading.db_client_load import WarehouseDBClient
 from loading.load_service import LoadService
+from observability.tracing import invocation
 
 logger = logging.getLogger()
 logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
@@ -16,45 +19,115 @@ def _get_env(name: str) -> str:
     return value
 
 
+def _coalesce_by_table(s3_records: List[Tuple[str, Optional[str]]]) -> Dict[str, List[Optional[str]]]:
+
+    # {table: [sqs_message_id, ...]} for the parquet outputs in the event.
+    # Control objects (_index/, _load_checkpoints/, ...) never trigger a load.
+
+    tables: Dict[str, List[Optional[str]]] = {}
+    for key, message_id in s3_records:
+        table = key.split("/", 1)[0]
+        if not key.endswith(".parquet") or not table.startswith(("dim_", "fact_")):
+            logger.info("Ignoring non-output object key=%s", key)
+            continue
+        tables.setdefault(table, []).append(message_id)
+    return tables
+
+
 def lambda_handler(event, context):
-    
+    # span timings are emitted as CloudWatch EMF when the invocation ends
+    with invocation("loading"):
+        return _handle(event, context)
+
+
+def _handle(event, context):
+
     # Loading Lambda entry point.
+    # - {"table": "<name>"}          => load that table
+    # - S3 / SQS(S3) notifications   => load only the tables the objects belong to
+    # - anything else                => load every table discovered in the bucket
 
     # Expected env vars:
     #   - PROCESSED_BUCKET_NAME: S3 bucket with processed parquet outputs
 
-    
+
     logger.info("Load Lambda triggered. event=%s", json.dumps(event))
 
     processed_bucket = _get_env("PROCESSED_BUCKET_NAME")
     checkpoints_prefix = os.getenv("LOAD_CHECKPOINTS_PREFIX", "_load_checkpoints")
+    insert_method = os.getenv("LOAD_INSERT_METHOD", "copy")
+    dim_mode = os.getenv("LOAD_DIM_MODE", "snapshot")
+    fact_mode = os.getenv("LOAD_FACT_MODE", "append")
+    max_workers = int(os.getenv("LOAD_MAX_WORKERS", "1"))
+
+    is_dict = isinstance(event, dict)
+    from_sqs = is_dict and any(r.get("eventSource") == "aws:sqs" for r in event.get("Records") or [])
 
     try:
+        target_table = event.get("table") if is_dict else None
+        tables: Dict[str, List[Optional[str]]] = {}
+        s3_records: List[Tuple[str, Optional[str]]] = []
+
+        if not target_table and is_dict and event.get("Records"):
+            s3_records = extract_s3_records(event)
+            tables = _coalesce_by_table(s3_records)
+            if not tables:
+                return {
+                    "statusCode": 200,
+                    "body": json.dumps({"message": "Nothing to load", "records": len(s3_records)}),
+                }
+            logger.info("Detected tables %s from %s S3 records", sorted(tables), len(s3_records))
+
         with WarehouseDBClient() as db:
             service = LoadService(
                 processed_bucket=processed_bucket,
                 db=db,
                 checkpoints_prefix=checkpoints_prefix,
+                insert_method=insert_method,
+                dim_mode=dim_mode,
+                fact_mode=fact_mode,
+                db_factory=WarehouseDBClient,
+                max_workers=max_workers,
             )
 
-            target_table = None
-            
-            target_table = event.get("table") if isinstance(event, dict) else None
-
             if target_table:
                 logger.info("Loading single table=%s", target_table)
                 result = service.load_one_table(target_table)
+            elif tables:
+                result = service.load_tables(sorted(tables))
+                result["records"] = len(s3_records)
+                result["coalesced"] = len(s3_records) - len(tables)
             else:
                 logger.info("Loading all discovered tables from bucket=%s", processed_bucket)
                 result = service.load_all_tables()
 
-        return {
-            "statusCode": 200,
-            "body": json.dumps({"message": "Loading complete", "result": result}, default=str),
+        # parallel loads commit per table, so a failed table does not raise
+        consistent = result.get("consistent", True)
+        response = {
+            "statusCode": 200 if consistent else 500,
+            "body": json.dumps(
+                {"message": "Loading complete" if consistent else "Loading incomplete", "result": result},
+                default=str,
+            ),
         }
 
+        failed_messages = [
+            message_id
+            for entry in result.get("tables", [])
+            if entry.get("status") == "error" or entry.get("reason") == "dependency_failed"
+            for message_id in tables.get(entry.get("table"), [])
+            if message_id
+        ]
+        if failed_messages:
+            # SQS ReportBatchItemFailures: only the failed tables' messages are retried
+            response["batchItemFailures"] = [{"itemIdentifier": m} for m in dict.fromkeys(failed_messages)]
+        return response
+
     except Exception as e:
         logger.exception("Loading Lambda failed")
+        if from_sqs:
+            # let SQS retry the whole batch instead of dropping it
+            raise
         return {
             "statusCode": 500,
             "body": json.dumps({"message": "Loading failed", "error": str(e)}),
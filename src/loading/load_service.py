@@ -1,42 +1,201 @@
+import copy
 import json
 import logging
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
 from botocore.exceptions import ClientError
 
 import moto
-from loading.sql import CREATE_TABLE_SQL
+from loading.sql import (
+    ADD_COLUMNS,
+    CHECKPOINT_TABLE,
+    CHECKPOINT_TABLE_SQL,
+    CREATE_TABLE_SQL,
+    FACT_DIMENSION_KEYS,
+    PARTITION_KEYS,
+    PRIMARY_KEYS,
+    SURROGATE_KEYS,
+)
 
 
 import pandas as pd
 
 from loading.db_client_load import WarehouseDBClient
+from loading.key_map import DimensionKeyMap
 from loading.s3_client_load import S3LoadingClient
+from observability.memory import track
+from observability.tracing import span
 
 logger = logging.getLogger(__name__)
 logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
 
+# copy:        COPY ... FROM STDIN (default)
+# executemany: one INSERT per row, batched by cursor.executemany (fallback)
+# values:     multi-row INSERT ... VALUES (...), (...) sized to the bind parameter limit
+INSERT_METHODS = ("copy", "values", "executemany")
+
+# Postgres wire protocol carries the bind parameter count as an int16
+MAX_BIND_PARAMS = 32767
+
+# snapshot: TRUNCATE + INSERT the whole dim
+# merge:    stage the snapshot, then apply only inserts/updates/deletes (row hash diff)
+# swap:     load an UNLOGGED shadow table, index it, then rename it over the live table
+DIM_MODES = ("snapshot", "merge", "swap")
+
+# swap mode gives up instead of queueing behind a long dashboard query
+# (a queued ACCESS EXCLUSIVE request blocks every reader that arrives after it)
+SWAP_LOCK_TIMEOUT = "5s"
+
+# append: INSERT every new row (a re-sent key aborts the load on the PK)
+# merge:  stage each batch, then one INSERT ... ON CONFLICT (pk) DO UPDATE per batch
+FACT_MODES = ("append", "merge")
+
+# pg_advisory_xact_lock(LOAD_LOCK_CLASS, hashtext(table)): one loader per table.
+# Held until the loading transaction ends, so a concurrent invocation (SQS retry,
+# local run, backfill) of the same table waits instead of loading the same files.
+LOAD_LOCK_CLASS = 4041
+
+# Typed UTC timestamp written by the transformation stage on every fact
+WATERMARK_COLUMN = "last_updated"
+
+# Warehouse catalog {table: {column: data_type}} per (host, port, database).
+# Module level so a warm Lambda container reads information_schema only once.
+_CATALOG_CACHE: Dict[Tuple[Any, ...], Dict[str, Dict[str, str]]] = {}
+_CATALOG_LOCK = threading.Lock()
+# catalog keys whose checkpoint control table is known to exist
+_CHECKPOINT_TABLE_READY: Set[Tuple[Any, ...]] = set()
+
+# Dimension natural id -> surrogate key maps per (host, port, database, dim),
+# kept across warm invocations and refreshed incrementally.
+_KEY_MAPS: Dict[Tuple[Any, ...], DimensionKeyMap] = {}
+_KEY_MAP_LOCK = threading.Lock()
+
+CATALOG_SQL = (
+    "SELECT table_name, column_name, data_type "
+    "FROM information_schema.columns "
+    "WHERE table_schema = current_schema() AND table_name = ANY(%s) "
+    "ORDER BY table_name, ordinal_position;"
+)
+
+# indexes of a table, with the PRIMARY KEY / UNIQUE constraint each one backs (if any)
+SWAP_INDEX_SQL = (
+    "SELECT i.relname, pg_get_indexdef(i.oid), c.conname, c.contype "
+    "FROM pg_index x "
+    "JOIN pg_class i ON i.oid = x.indexrelid "
+    "LEFT JOIN pg_constraint c ON c.conindid = x.indexrelid AND c.conrelid = x.indrelid "
+    "WHERE x.indrelid = %s::regclass "
+    "ORDER BY i.relname;"
+)
+
+# foreign keys in other tables that reference a table (declared ones only: the
+# copies Postgres keeps on each partition follow their parent's constraint)
+SWAP_FK_SQL = (
+    "SELECT k.conrelid::regclass::text, k.conname, pg_get_constraintdef(k.oid), r.relkind "
+    "FROM pg_constraint k "
+    "JOIN pg_class r ON r.oid = k.conrelid "
+    "WHERE k.confrelid = %s::regclass AND k.contype = 'f' AND k.conparentid = 0 "
+    "ORDER BY k.conrelid::regclass::text, k.conname;"
+)
+
+# relkind of a table ('p' = partitioned) and the names of its partitions
+PARTITIONS_SQL = (
+    "SELECT p.relkind, c.relname "
+    "FROM pg_class p "
+    "LEFT JOIN pg_inherits i ON i.inhparent = p.oid "
+    "LEFT JOIN pg_class c ON c.oid = i.inhrelid "
+    "WHERE p.oid = %s::regclass;"
+)
+
+_INDEX_DEF_PATTERN = re.compile(r"^(CREATE (?:UNIQUE )?INDEX )\S+ ON (?:ONLY )?\S+", re.IGNORECASE)
+
+_REFERENCES_PATTERN = re.compile(r'REFERENCES\s+"?(\w+)"?', re.IGNORECASE)
+
+
+def table_dependencies(ddl: Optional[Dict[str, str]] = None) -> Dict[str, Set[str]]:
+    """
+    Tables each table references through FOREIGN KEY ... REFERENCES in its DDL
+    (loading/sql.py CREATE_TABLE_SQL by default).
+    """
+    ddl = CREATE_TABLE_SQL if ddl is None else ddl
+    return {
+        table: {ref for ref in _REFERENCES_PATTERN.findall(sql) if ref != table}
+        for table, sql in ddl.items()
+    }
+
+
+def dependency_levels(tables: List[str], ddl: Optional[Dict[str, str]] = None) -> List[List[str]]:
+    """
+    Groups tables into load levels (Kahn's algorithm): every table only references
+    tables in earlier levels, so the tables of one level can load concurrently.
+    References to tables outside `tables` are ignored.
+    """
+    deps = table_dependencies(ddl)
+    pending = {table: deps.get(table, set()) & set(tables) for table in tables}
+    levels: List[List[str]] = []
+
+    while pending:
+        ready = sorted(table for table, refs in pending.items() if not refs)
+        if not ready:
+            raise ValueError(f"Foreign key cycle between tables: {sorted(pending)}")
+        levels.append(ready)
+        for table in ready:
+            del pending[table]
+        for refs in pending.values():
+            refs.difference_update(ready)
+
+    return levels
+
 
 class LoadService:
    
     # Loading Zone:
     # - Discover tables from processed S3 (dim_* and fact_*)
-    # - dim_*  => snapshot load (TRUNCATE + INSERT)
-    # - fact_* => append only NEW rows (watermark filter) + checkpoint in S3
+    # - dim_*  => snapshot load (TRUNCATE + INSERT, row-hash merge, or shadow-table swap)
+    # - fact_* => append (or upsert by primary key) only NEW rows (watermark filter) + checkpoint
 
-    # Checkpoints (in processed bucket):
+    # Checkpoints (warehouse _load_checkpoints table; S3 for clients that cannot query):
      
     def __init__(
         self,
         processed_bucket: str,
         db: WarehouseDBClient,
         checkpoints_prefix: str = "_load_checkpoints",
+        insert_method: str = "copy",
+        dim_mode: str = "snapshot",
+        fact_mode: str = "append",
+        db_factory: Optional[Callable[[], WarehouseDBClient]] = None,
+        max_workers: int = 1,
     ):
         self.processed_bucket = processed_bucket
         self.s3_client = S3LoadingClient(bucket=processed_bucket)
         self.db = db
         self.checkpoints_prefix = checkpoints_prefix.rstrip("/")
+        if insert_method not in INSERT_METHODS:
+            raise ValueError(f"Unknown insert_method={insert_method}, expected one of {INSERT_METHODS}")
+        self.insert_method = insert_method
+        if dim_mode not in DIM_MODES:
+            raise ValueError(f"Unknown dim_mode={dim_mode}, expected one of {DIM_MODES}")
+        self.dim_mode = dim_mode
+        if fact_mode not in FACT_MODES:
+            raise ValueError(f"Unknown fact_mode={fact_mode}, expected one of {FACT_MODES}")
+        self.fact_mode = fact_mode
+        # parallel loading: each worker opens its own connection from db_factory
+        self.db_factory = db_factory
+        self.max_workers = max_workers
+        # fact checkpoints: read once per run, written once by flush_checkpoints()
+        self._checkpoints: Optional[Dict[str, Dict[str, Any]]] = None
+        self._dirty_checkpoints: Set[str] = set()
+        # partitioned facts: {table: existing partition names}, None when not partitioned
+        self._partition_cache: Dict[str, Optional[Set[str]]] = {}
+        # dims whose key map has been refreshed since their last load in this run
+        self._key_maps_fresh: Set[str] = set()
+        # facts whose key columns were left NULL because of dim_mode (warned once)
+        self._unresolved_key_tables: Set[str] = set()
         logger.info("Initialising LoadService with bucket=%s", processed_bucket)
 
 
@@ -65,15 +224,11 @@ class LoadService:
         logger.info("Discovered tables in S3: %s", tables)
         return tables
 
-    def _rank(self, table: str) -> Tuple[int, str]:
-        if table.startswith("dim_"):
-            return (0, table)
-        if table.startswith("fact_"):
-            return (1, table)
-        return (2, table)
-
-    def _order_tables(self, tables: List[str]) -> List[str]:
-        return sorted(tables, key=self._rank)
+    def _latest_run_keys(self, parquet_keys: List[str]) -> List[str]:
+        # Partitioned facts: one transform run writes the same file name into every
+        # partition it touched, so the latest run = all keys sharing the newest file name.
+        latest_name = parquet_keys[-1].rsplit("/", 1)[-1]
+        return [key for key in parquet_keys if key.rsplit("/", 1)[-1] == latest_name]
 
     def _should_truncate(self, table: str) -> bool:
         # dims snapshot; facts append
@@ -87,96 +242,617 @@ class LoadService:
   
 
     def load_all_tables(self) -> Dict[str, Any]:
-        tables = self._order_tables(self._discover_tables_from_s3())
-        results: List[Dict[str, Any]] = []
+        return self.load_tables(self._discover_tables_from_s3())
+
+    def load_tables(self, tables: List[str]) -> Dict[str, Any]:
+        # Loads only the given tables, in foreign key order
+        levels = dependency_levels(sorted(set(tables)))
+
+        if self.db_factory is None or self.max_workers <= 1:
+            # single connection, single transaction (swapped dims before it, see _swapped_dims)
+            ordered = [table for level in levels for table in level]
+            results = {table: self._load_table_on_own_connection(table) for table in self._swapped_dims(ordered)}
+            pending = [table for table in ordered if table not in results]
+            self._lock_tables(pending)
+            for table in pending:
+                results[table] = self._load_table(table)
+            self._commit()
+            return {"processed_bucket": self.processed_bucket, "tables": [results[table] for table in ordered]}
 
-        for table in tables:
-            results.append(self.load_one_table(table))
+        return self._load_levels_parallel(levels)
 
-        return {"processed_bucket": self.processed_bucket, "tables": results}
+    def _swapped_dims(self, tables: List[str]) -> List[str]:
+        # dim_mode="swap" commits while it loads (the shadow table, then the rename),
+        # which would commit every table loaded before it in a shared transaction.
+        # In a multi-table load each dim is therefore swapped first, on its own
+        # connection; the other tables keep their single transaction.
+        if self.dim_mode != "swap" or len(tables) <= 1:
+            return []
+        dims = [table for table in tables if not self._is_fact(table)]
+        if dims and self.db_factory is None:
+            raise ValueError(
+                "dim_mode='swap' commits each dim on its own: loading several tables needs db_factory"
+            )
+        return dims
+
+    def _load_levels_parallel(self, levels: List[List[str]]) -> Dict[str, Any]:
+        """
+        Loads each dependency level concurrently on a pool of connections, one
+        commit per table. A level only starts once the previous one has finished
+        (barrier), and tables whose referenced tables failed are skipped so no
+        fact is committed against a dim that did not load.
+        """
+        deps = table_dependencies()
+        results: Dict[str, Dict[str, Any]] = {}
+        failed: Set[str] = set()
+        # one checkpoint read for the whole run, shared (copied) by the workers
+        if self._checkpoints is None:
+            self._checkpoints = self._fetch_checkpoints()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for level in levels:
+                futures = {}
+                for table in level:
+                    blocked = deps.get(table, set()) & failed
+                    if blocked:
+                        logger.warning("Skip table=%s (dependencies failed: %s)", table, sorted(blocked))
+                        results[table] = {
+                            "table": table,
+                            "status": "skipped",
+                            "reason": "dependency_failed",
+                            "dependencies": sorted(blocked),
+                        }
+                        failed.add(table)
+                        continue
+                    futures[pool.submit(self._load_table_on_own_connection, table)] = table
+
+                for future in as_completed(futures):
+                    table = futures[future]
+                    try:
+                        results[table] = future.result()
+                    except Exception as e:
+                        logger.exception("Loading failed for table=%s", table)
+                        results[table] = {"table": table, "status": "error", "error": str(e)}
+                        failed.add(table)
+
+        return {
+            "processed_bucket": self.processed_bucket,
+            "tables": [results[table] for level in levels for table in level],
+            "consistent": not failed,
+        }
+
+    def _load_table_on_own_connection(self, table: str) -> Dict[str, Any]:
+        return self._on_own_connection(lambda worker: worker.load_one_table(table))
+
+    def _on_own_connection(self, load: Callable[["LoadService"], Dict[str, Any]]) -> Dict[str, Any]:
+        # load_one_table / load_frames commit the worker's rows and checkpoints;
+        # the client context rolls back on error
+        with self.db_factory() as db:
+            worker = copy.copy(self)
+            worker.db = db
+            worker._checkpoints = dict(self._checkpoints or {})
+            worker._dirty_checkpoints = set()
+            return load(worker)
 
     def load_one_table(self, table: str) -> Dict[str, Any]:
+        self._lock_tables([table])
+        result = self._load_table(table)
+        self._commit()
+        return result
+
+    def load_frame(self, table: str, df: pd.DataFrame, s3_keys: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Loads an output frame handed over in memory (local runs) instead of reading
+        its parquet back from S3. Dims use dim_mode, facts fact_mode.
+        s3_keys: parquet keys the same frame was also written to; a fact's checkpoint
+        records them as loaded so the S3-triggered loader does not load them again.
+        """
+        with track("loading", table) as memory:
+            if df is None or df.empty:
+                logger.warning("Skip table=%s (empty frame).", table)
+                result = {"table": table, "status": "skipped", "reason": "no_data"}
+            elif self._is_fact(table):
+                result = self._load_fact_frame(table, df)
+                if s3_keys:
+                    self._mark_keys_loaded(table, s3_keys, df)
+            else:
+                result = self._load_dim_frame(table, df)
+        if memory:
+            result["memory"] = memory
+        return result
+
+    def load_frames(self, frames: Dict[str, pd.DataFrame], s3_keys: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        # in-memory counterpart of load_tables: foreign key order, one transaction
+        s3_keys = s3_keys or {}
+        ordered = [table for level in dependency_levels(sorted(frames)) for table in level]
+        results = {
+            table: self._on_own_connection(lambda worker, table=table: worker.load_frames({table: frames[table]}))["tables"][0]
+            for table in self._swapped_dims(ordered)
+        }
+        pending = [table for table in ordered if table not in results]
+        self._lock_tables(pending)
+        for table in pending:
+            results[table] = self.load_frame(table, frames[table], s3_keys.get(table))
+        self._commit()
+        return {"processed_bucket": self.processed_bucket, "tables": [results[table] for table in ordered]}
+
+    def _mark_keys_loaded(self, table: str, keys: List[str], df: pd.DataFrame) -> None:
+        ckpt = self._read_checkpoint(table)
+        listed = self._list_keys(table)
+        loaded = self._loaded_keys(ckpt, listed) | set(keys)
+        last_ts = ckpt.get("last_loaded_ts")
+        batch_ts = self._max_watermark_iso(df)
+        if batch_ts and (last_ts is None or self._parse_ts(batch_ts) > self._parse_ts(last_ts)):
+            last_ts = batch_ts
+        self._write_checkpoint(table, listed, loaded, last_loaded_ts=last_ts)
+
+    def _lock_tables(self, tables: List[str]) -> None:
+        # always in name order, so two loaders of overlapping table sets cannot deadlock;
+        # clients that cannot query have no Postgres session to hold the lock in
+        if not hasattr(self.db, "fetchall"):
+            return
+        for table in sorted(set(tables)):
+            self.db.execute("SELECT pg_advisory_xact_lock(%s, hashtext(%s));", [LOAD_LOCK_CLASS, table])
+
+    def _load_table(self, table: str) -> Dict[str, Any]:
+        with track("loading", table) as memory:
+            result = self._load_table_files(table)
+        if memory:
+            result["memory"] = memory
+        return result
+
+    def _load_table_files(self, table: str) -> Dict[str, Any]:
         logger.info("Loading table=%s", table)
 
-        # 1) Find latest parquet key for this table
-        parquet_keys = self.s3_client.list_parquet_keys(table)
+        # 1) Parquet keys for this table (oldest -> newest)
+        parquet_keys = self._list_keys(table)
         if not parquet_keys:
             logger.warning("Skip table=%s (no parquet).", table)
             return {"table": table, "status": "skipped", "reason": "no_parquet"}
 
-        latest_key = parquet_keys[-1]
+        try:
+            if self._is_fact(table):
+                return self._load_fact_files(table, parquet_keys)
+            return self._load_dim_snapshot(table, parquet_keys)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("NoSuchKey", "404"):
+                # the transform owns the index; a retry reads its next version
+                logger.error("Output of table=%s listed in the index is missing: %s", table, e)
+            raise
 
-        # 2) Check checkpoint (for facts: skip if same parquet already loaded)
-        # 2) Checkpoint (facts only)
-        ckpt: Dict[str, Any] = {}
-        if self._is_fact(table):
-            ckpt = self._read_checkpoint(table)
+    def _list_keys(self, table: str) -> List[str]:
+        # the output index (one GET) when the client supports it, else a prefix listing
+        if hasattr(self.s3_client, "list_output_keys"):
+            return self.s3_client.list_output_keys(table)
+        return self.s3_client.list_parquet_keys(table)
 
-        if self._is_fact(table) and ckpt.get("last_loaded_key") == latest_key:
-            logger.info("Skip fact table=%s (already loaded key=%s).", table, latest_key)
-            return {"table": table, "status": "skipped", "reason": "already_loaded", "latest_key": latest_key}
+    def _load_dim_snapshot(self, table: str, parquet_keys: List[str]) -> Dict[str, Any]:
+        latest_key = parquet_keys[-1]
 
-        # 3) Read latest parquet
-        df = self.s3_client.read_parquet_to_df(latest_key)
+        # 2) Read latest parquet (all partition files written by the latest transform run)
+        run_keys = self._latest_run_keys(parquet_keys)
+        if len(run_keys) == 1:
+            df = self.s3_client.read_parquet_to_df(latest_key)
+        else:
+            logger.info("Reading %s partition files for table=%s", len(run_keys), table)
+            df = pd.concat([self.s3_client.read_parquet_to_df(key) for key in run_keys], ignore_index=True)
         if df is None or df.empty:
             logger.warning("Skip table=%s (empty parquet). key=%s", table, latest_key)
-            # checkpoint key so we don't reprocess the same empty file repeatedly
-            if self._is_fact(table):
-                self._write_checkpoint(table, last_loaded_key=latest_key, last_loaded_ts=ckpt.get("last_loaded_ts"))
             return {"table": table, "status": "skipped", "reason": "no_data", "latest_key": latest_key}
 
+        return {**self._load_dim_frame(table, df), "latest_key": latest_key}
+
+    def _load_dim_frame(self, table: str, df: pd.DataFrame) -> Dict[str, Any]:
         # Ensure NULLs handled (NaN/NaT -> None)
         df = df.where(pd.notnull(df), None)
 
-        # 4) Create table if needed (MVP only)
+        # 3) Create table if needed (MVP only)
         self.create_table_if_not_exists(table, df)
 
-        # 5) dim snapshot
-        if self._should_truncate(table):
-            self.truncate_table(table)
-            inserted = self._insert_df(table, df)
-            # dims don't need watermark; keep checkpoint optional (not required)
-            logger.info("Loaded dim snapshot table=%s rows=%s", table, inserted)
-            return {"table": table, "status": "loaded", "mode": "snapshot", "rows": inserted, "latest_key": latest_key}
-
-        # 6) fact delta: watermark filter (append only NEW rows)
-        df_to_insert = df
-        wm_name, wm_series = self._detect_watermark(df)
-        last_ts = ckpt.get("last_loaded_ts")
+        # 4) dim snapshot
+        if self.dim_mode == "merge":
+            changes = self.merge_snapshot(table, df)
+            # new members got surrogate keys: the next fact lookup refreshes the map
+            self._key_maps_fresh.discard(table)
+            logger.info("Merged dim snapshot table=%s rows=%s changes=%s", table, len(df), changes)
+            return {"table": table, "status": "loaded", "mode": "merge", "rows": len(df), "rows_changed": changes}
 
-        if wm_name and wm_series is not None and last_ts:
-            last_dt = self._parse_ts(last_ts)
-            before = len(df_to_insert)
-            df_to_insert = df_to_insert.loc[wm_series > last_dt].copy()
+        if self.dim_mode == "swap":
+            swap = self.swap_snapshot(table, df)
             logger.info(
-                "Filtered NEW rows for fact table=%s watermark=%s > %s: %s -> %s",
-                table, wm_name, last_ts, before, len(df_to_insert)
+                "Swapped dim snapshot table=%s rows=%s lock_hold_seconds=%.3f",
+                table, swap["rows"], swap["lock_hold_seconds"],
             )
+            return {"table": table, "status": "loaded", "mode": "swap", **swap}
 
-        inserted = self._insert_df(table, df_to_insert)
+        self.truncate_table(table)
+        inserted = self._insert_df(table, df)
+        # dims don't need watermark; keep checkpoint optional (not required)
+        logger.info("Loaded dim snapshot table=%s rows=%s", table, inserted)
+        return {"table": table, "status": "loaded", "mode": "snapshot", "rows": inserted}
 
-        # Update checkpoint:
-        # - Always update last_loaded_key to avoid reprocessing same file forever
-        # - Update last_loaded_ts ONLY if we actually inserted something
-        if inserted > 0:
-            new_last_ts = self._max_watermark_iso(df_to_insert)
-        else:
-            new_last_ts = ckpt.get("last_loaded_ts")
+    def _load_fact_files(self, table: str, parquet_keys: List[str]) -> Dict[str, Any]:
+        """
+        Loads every parquet file not yet recorded in the checkpoint, run by run in
+        listing order, so files from transform runs that landed between two loads
+        are not skipped. Files are streamed a row group at a time to bound memory,
+        fetching only the column chunks of the warehouse table's columns.
+        Rows at or below the watermark of the previous run are filtered out.
+        """
+        latest_key = parquet_keys[-1]
 
-        self._write_checkpoint(table, last_loaded_key=latest_key, last_loaded_ts=new_last_ts)
+        # 2) Checkpoint: which keys are already in the warehouse
+        ckpt = self._read_checkpoint(table)
+        loaded = self._loaded_keys(ckpt, parquet_keys)
+        pending = [key for key in parquet_keys if key not in loaded]
+        if not pending:
+            logger.info("Skip fact table=%s (already loaded key=%s).", table, latest_key)
+            return {"table": table, "status": "skipped", "reason": "already_loaded", "latest_key": latest_key}
+
+        logger.info("Loading %s pending parquet files for fact table=%s", len(pending), table)
+
+        last_ts = ckpt.get("last_loaded_ts")
+        wm_name: Optional[str] = None
+        table_ready = False
+        inserted = 0
+        changes = {"inserted": 0, "updated": 0}
+        # new monthly partitions, loaded detached and attached at the end: {name: month}
+        detached: Dict[str, pd.Period] = {}
+        # merge needs the whole key in the file (not a warehouse-generated serial)
+        merge_key = PRIMARY_KEYS.get(table) if self.fact_mode == "merge" else None
+        unknown_keys: Optional[int] = None
+        columns = self._projection(table)
+
+        for run_keys in self._group_runs(pending):
+            # one floor per run: partition files of the same run are disjoint
+            run_floor = self._parse_ts(last_ts) if last_ts else None
+
+            for key in run_keys:
+                loaded.add(key)
+                # each batch (row group) is inserted as soon as it is decoded;
+                # row groups entirely at or below the watermark are never fetched
+                for df in self._read_batches(key, after=run_floor, columns=columns):
+                    if df is None or df.empty:
+                        continue
+
+                    # Ensure NULLs handled (NaN/NaT -> None)
+                    df = df.where(pd.notnull(df), None)
+
+                    # 3) Create table if needed (MVP only)
+                    if not table_ready:
+                        self.create_table_if_not_exists(table, df)
+                        table_ready = True
+                        if merge_key and not set(merge_key) <= set(df.columns):
+                            logger.info("Appending fact table=%s: key %s not in parquet", table, merge_key)
+                            merge_key = None
+
+                    # 4) fact delta: watermark filter (append only NEW rows)
+                    name, wm_series = self._detect_watermark(df)
+                    wm_name = name or wm_name
+                    if name and wm_series is not None and run_floor is not None:
+                        before = len(df)
+                        df = df.loc[wm_series > run_floor].copy()
+                        logger.info(
+                            "Filtered NEW rows for fact table=%s key=%s watermark=%s > %s: %s -> %s",
+                            table, key, name, run_floor, before, len(df)
+                        )
+
+                    if self._resolves_surrogate_keys(table):
+                        df, unknown = self.resolve_surrogate_keys(table, df)
+                        unknown_keys = (unknown_keys or 0) + unknown
+
+                    rows, batch_changes = self._write_fact_batch(table, df, merge_key, detached)
+                    changes = {k: changes[k] + batch_changes[k] for k in changes}
+                    inserted += rows
+
+                    # last_loaded_ts only moves forward, and only when rows were inserted
+                    batch_ts = self._max_watermark_iso(df) if rows else None
+                    if batch_ts and (last_ts is None or self._parse_ts(batch_ts) > self._parse_ts(last_ts)):
+                        last_ts = batch_ts
+
+        if detached:
+            self.attach_partitions(table, detached)
+
+        # 5) Checkpoint: every listed key is loaded now, so it shrinks to latest_key
+        self._write_checkpoint(table, parquet_keys, loaded, last_loaded_ts=last_ts)
+
+        if not table_ready:
+            logger.warning("Skip table=%s (empty parquet). key=%s", table, latest_key)
+            return {"table": table, "status": "skipped", "reason": "no_data", "latest_key": latest_key}
 
         mode = "delta"
         if wm_name is None:
             mode = "append_no_watermark"
 
-        return {
+        result = {
             "table": table,
             "status": "loaded",
             "mode": mode,
             "rows": inserted,
+            "files": len(pending),
             "latest_key": latest_key,
             "watermark": wm_name,
         }
+        if merge_key:
+            result["mode"] = "merge"
+            result["rows_changed"] = changes
+        if detached:
+            result["partitions_attached"] = sorted(detached)
+        if unknown_keys is not None:
+            result["unknown_dimension_keys"] = unknown_keys
+        return result
+
+    def _write_fact_batch(
+        self,
+        table: str,
+        df: pd.DataFrame,
+        merge_key: Optional[Sequence[str]],
+        detached: Dict[str, pd.Period],
+    ) -> Tuple[int, Dict[str, int]]:
+        # routes one batch to its partitions; returns (rows written, merge changes)
+        rows = 0
+        changes = {"inserted": 0, "updated": 0}
+        for target, part in self._route_batch(table, df, detached):
+            if merge_key:
+                batch_changes = self.merge_fact_batch(target, part, merge_key)
+                changes = {k: changes[k] + batch_changes[k] for k in changes}
+                rows += len(part)
+            else:
+                rows += self._insert_df(target, part)
+        return rows, changes
+
+    def _load_fact_frame(self, table: str, df: pd.DataFrame) -> Dict[str, Any]:
+        # one in-memory frame: no checkpoint read and no watermark filter
+        df = df.where(pd.notnull(df), None)
+        self.create_table_if_not_exists(table, df)
+
+        merge_key = PRIMARY_KEYS.get(table) if self.fact_mode == "merge" else None
+        if merge_key and not set(merge_key) <= set(df.columns):
+            logger.info("Appending fact table=%s: key %s not in frame", table, merge_key)
+            merge_key = None
+
+        unknown_keys: Optional[int] = None
+        if self._resolves_surrogate_keys(table):
+            df, unknown_keys = self.resolve_surrogate_keys(table, df)
+
+        detached: Dict[str, pd.Period] = {}
+        rows, changes = self._write_fact_batch(table, df, merge_key, detached)
+        if detached:
+            self.attach_partitions(table, detached)
+
+        wm_name, _ = self._detect_watermark(df)
+        result = {
+            "table": table,
+            "status": "loaded",
+            "mode": "merge" if merge_key else "append",
+            "rows": rows,
+            "watermark": wm_name,
+        }
+        if merge_key:
+            result["rows_changed"] = changes
+        if detached:
+            result["partitions_attached"] = sorted(detached)
+        if unknown_keys is not None:
+            result["unknown_dimension_keys"] = unknown_keys
+        return result
+
+    # Surrogate keys
+
+    def _resolves_surrogate_keys(self, table: str) -> bool:
+        # only once the fact has its *_key columns, and only for merge loads: they
+        # keep a dim member's surrogate key stable (snapshot / swap re-insert every row)
+        if table not in FACT_DIMENSION_KEYS or not hasattr(self.db, "fetchall"):
+            return False
+        columns = _CATALOG_CACHE.get(self._catalog_key(), {}).get(table, {})
+        key_columns = [key_col for _, _, key_col in FACT_DIMENSION_KEYS[table]]
+        if not all(key_col in columns for key_col in key_columns):
+            return False
+        if self.dim_mode != "merge":
+            if table not in self._unresolved_key_tables:
+                self._unresolved_key_tables.add(table)
+                logger.warning(
+                    "table=%s: dim_mode=%s re-keys the dims on every load, so %s are left NULL (use dim_mode=merge)",
+                    table, self.dim_mode, key_columns,
+                )
+            return False
+        return True
+
+    def resolve_surrogate_keys(self, table: str, df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+        """
+        Adds the fact's surrogate key columns, looked up from each dimension's
+        cached key map in one vectorized pass per column (no per-row queries).
+        A miss refreshes the map once (members merged by another loader since);
+        ids still missing get a NULL key, and the foreign key on the natural id
+        rejects the row. Returns (frame, number of unknown lookups).
+        """
+        resolved: Dict[str, Any] = {}
+        unknown = 0
+        for natural_col, dim, key_col in FACT_DIMENSION_KEYS[table]:
+            if natural_col not in df.columns:
+                continue
+            keys, missing = self._key_map(dim).lookup(df[natural_col])
+            if missing.any():
+                self._key_maps_fresh.discard(dim)
+                keys, missing = self._key_map(dim).lookup(df[natural_col])
+            # plain ints and None, which every insert method accepts
+            column = pd.Series(keys, index=df.index).astype(object)
+            resolved[key_col] = column.where(column.notna(), None)
+            if missing.any():
+                unknown += int(missing.sum())
+                logger.warning(
+                    "table=%s: %s %s values not in %s, key left NULL",
+                    table, int(missing.sum()), natural_col, dim,
+                )
+        return df.assign(**resolved), unknown
+
+    def _key_map(self, dim: str) -> DimensionKeyMap:
+        # refreshed at most once per run, and again after the dim is loaded
+        natural_col, key_col = SURROGATE_KEYS[dim]
+        cache_key = self._catalog_key() + (dim,)
+        with _KEY_MAP_LOCK:
+            key_map = _KEY_MAPS.setdefault(cache_key, DimensionKeyMap())
+            if dim in self._key_maps_fresh:
+                return key_map
+
+            if key_map.high_water is None:
+                rows = self.db.fetchall(
+                    f'SELECT "{natural_col}", "{key_col}" FROM "{dim}" WHERE "{key_col}" IS NOT NULL;'
+                )
+            else:
+                # identity keys only grow: fetch the members added since the last refresh
+                rows = self.db.fetchall(
+                    f'SELECT "{natural_col}", "{key_col}" FROM "{dim}" WHERE "{key_col}" > %s;',
+                    [key_map.high_water],
+                )
+            added = key_map.update(rows)
+            self._key_maps_fresh.add(dim)
+            logger.info("Refreshed key map dim=%s: %s new members, %s total", dim, added, len(key_map))
+            return key_map
+
+    # Partitioned facts
+
+    def _partitions(self, table: str) -> Optional[Set[str]]:
+        # existing partitions, read once per run; None when the table is not partitioned
+        if table not in PARTITION_KEYS or not hasattr(self.db, "fetchall"):
+            return None
+        if table not in self._partition_cache:
+            rows = self.db.fetchall(PARTITIONS_SQL, [table])
+            if rows and rows[0][0] == "p":
+                self._partition_cache[table] = {name for _, name in rows if name}
+            else:
+                # created before partitioning was introduced
+                logger.info("Fact table=%s is not partitioned; loading into the table itself", table)
+                self._partition_cache[table] = None
+        return self._partition_cache[table]
+
+    def _route_batch(
+        self, table: str, df: pd.DataFrame, detached: Dict[str, pd.Period]
+    ) -> List[Tuple[str, pd.DataFrame]]:
+        """
+        Splits a fact batch by monthly partition. Rows for existing partitions go to
+        the parent table (Postgres routes them). Rows for a month without a partition
+        go to a detached table of the same shape, created on first use and attached
+        by attach_partitions() once the whole fact has been loaded, so readers never
+        see a half-loaded month and the parent is not locked during the load.
+        """
+        partitions = self._partitions(table)
+        column = PARTITION_KEYS.get(table)
+        if partitions is None or column not in df.columns:
+            return [(table, df)]
+
+        months = pd.to_datetime(df[column], errors="coerce").dt.to_period("M")
+        targets: List[Tuple[str, pd.DataFrame]] = []
+        in_new_month = pd.Series(False, index=df.index)
+        for month in sorted(months.dropna().unique()):
+            name = self._partition_name(table, month)
+            if name in partitions:
+                continue
+            if name not in detached:
+                self._create_detached_partition(table, name)
+                detached[name] = month
+            mask = months == month
+            in_new_month |= mask
+            targets.append((name, df.loc[mask]))
+
+        if not in_new_month.all():
+            targets.insert(0, (table, df.loc[~in_new_month]))
+        return targets
+
+    @staticmethod
+    def _partition_name(table: str, month: pd.Period) -> str:
+        return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+    def _create_detached_partition(self, table: str, name: str) -> None:
+        # same columns, defaults (shared BIGSERIAL sequence), checks and indexes as
+        # the parent, so ATTACH reuses the indexes instead of building them.
+        # Created and attached in the same transaction, so a failed load leaves no
+        # table behind; if another loader attached this month since _partitions()
+        # was read, CREATE fails and the load is retried instead of dropping it.
+        logger.info("Creating detached partition %s for table=%s", name, table)
+        with span("ddl", table=table):
+            self.db.execute(
+                f'CREATE TABLE "{name}" '
+                f'(LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES);'
+            )
+
+    def attach_partitions(self, table: str, detached: Dict[str, pd.Period]) -> None:
+        """
+        Attaches loaded monthly tables to a partitioned fact. A CHECK constraint
+        matching the partition bounds is added first, so ATTACH PARTITION (which only
+        takes SHARE UPDATE EXCLUSIVE on the parent) skips its validation scan.
+        """
+        column = PARTITION_KEYS[table]
+        partitions = self._partition_cache.get(table)
+        for name, month in sorted(detached.items()):
+            start = month.start_time.date().isoformat()
+            end = (month + 1).start_time.date().isoformat()
+            bounds = f"{name}_bounds"
+            col = f'"{column}"'
+            check = f"{col} IS NOT NULL AND {col} >= DATE '{start}' AND {col} < DATE '{end}'"
+            with span("ddl", table=table):
+                self.db.execute(f'ALTER TABLE "{name}" ADD CONSTRAINT "{bounds}" CHECK ({check});')
+                self.db.execute(
+                    f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" ' + f"FOR VALUES FROM ('{start}') TO ('{end}');"
+                )
+                self.db.execute(f'ALTER TABLE "{name}" DROP CONSTRAINT "{bounds}";')
+            if partitions is not None:
+                partitions.add(name)
+            logger.info("Attached partition %s to table=%s [%s, %s)", name, table, start, end)
+
+    def _read_batches(
+        self,
+        key: str,
+        after: Optional[datetime] = None,
+        columns: Optional[List[str]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        # row-group streaming when the client supports it, else the whole file;
+        # columns (the warehouse table's) limits the ranged GETs to those chunks
+        if hasattr(self.s3_client, "iter_parquet_batches"):
+            skip_until = (WATERMARK_COLUMN, after) if after is not None else None
+            yield from self.s3_client.iter_parquet_batches(key, columns=columns, skip_until=skip_until)
+        else:
+            yield self.s3_client.read_parquet_to_df(key)
+
+    def _projection(self, table: str) -> Optional[List[str]]:
+        # warehouse columns of the table from the cached catalog (None: read every column)
+        if not hasattr(self.db, "fetchall"):
+            return None
+        return list(self.ensure_schema().get(table, {})) or None
+
+    def _loaded_keys(self, ckpt: Dict[str, Any], parquet_keys: List[str]) -> Set[str]:
+        # Index keys are in write order and the transform only appends to (or removes
+        # from) the index, so a checkpoint stores the end of the loaded prefix
+        # (last_loaded_key) and the few loaded keys past it (loaded_after), not the
+        # whole history. Checkpoints from before that listed every key (loaded_keys).
+        if "loaded_keys" in ckpt:
+            return set(ckpt["loaded_keys"]) & set(parquet_keys)
+
+        loaded = set(ckpt.get("loaded_after", [])) & set(parquet_keys)
+        last_key = ckpt.get("last_loaded_key")
+        if last_key in parquet_keys:
+            loaded.update(parquet_keys[: parquet_keys.index(last_key) + 1])
+        elif last_key is not None:
+            # replaced by a full transform rewrite: older keys are read again and
+            # their rows dropped by the watermark filter (or merged idempotently)
+            logger.warning("Checkpoint key %s is no longer in the output index", last_key)
+        return loaded
+
+    @staticmethod
+    def _checkpoint_keys(parquet_keys: List[str], loaded: Set[str]) -> Tuple[Optional[str], List[str]]:
+        # (last key of the loaded prefix of parquet_keys, loaded keys after it)
+        prefix = 0
+        while prefix < len(parquet_keys) and parquet_keys[prefix] in loaded:
+            prefix += 1
+        last_key = parquet_keys[prefix - 1] if prefix else None
+        return last_key, [key for key in parquet_keys[prefix:] if key in loaded]
+
+    def _group_runs(self, parquet_keys: List[str]) -> List[List[str]]:
+        # one transform run = every partition file sharing the same file name
+        runs: Dict[str, List[str]] = {}
+        for key in parquet_keys:
+            runs.setdefault(key.rsplit("/", 1)[-1], []).append(key)
+        return list(runs.values())
 
    
     # DB helpers (MVP)
@@ -189,9 +865,88 @@ class LoadService:
             raise KeyError(
                 f"No typed DDL found for table={table}. "
                 "Add it to loading/sql.py CREATE_TABLE_SQL.")
-    
-        logger.info("Ensuring table exists (typed DDL): %s", table)
-        self.db.execute(ddl)
+
+        if not hasattr(self.db, "fetchall"):
+            # clients that cannot query the catalog: idempotent DDL round trips
+            logger.info("Ensuring table exists (typed DDL): %s", table)
+            with span("ddl", table=table):
+                self.db.execute(ddl)
+                for column, col_type in ADD_COLUMNS.get(table, {}).items():
+                    self.db.execute(f'ALTER TABLE "{table}" ADD COLUMN IF NOT EXISTS "{column}" {col_type};')
+            return
+
+        catalog = self.ensure_schema()
+        self._check_schema_drift(table, df, catalog.get(table, {}))
+
+    def ensure_schema(self) -> Dict[str, Dict[str, str]]:
+        """
+        Makes sure every table in CREATE_TABLE_SQL exists, using the cached catalog.
+        Missing tables (and ADD_COLUMNS missing from existing tables) are created
+        in one DO block, in foreign key order; the catalog is then re-read once.
+        Returns the catalog {table: {column: data_type}}.
+        """
+        with _CATALOG_LOCK:
+            cache_key = self._catalog_key()
+            catalog = _CATALOG_CACHE.get(cache_key)
+            if catalog is None:
+                catalog = self._read_catalog(list(CREATE_TABLE_SQL))
+                _CATALOG_CACHE[cache_key] = catalog
+
+            statements = self._bootstrap_statements(catalog)
+            if not statements:
+                return catalog
+
+            logger.info("Bootstrapping warehouse schema with %s statements", len(statements))
+            body = "\n".join(statement.strip().rstrip(";") + ";" for statement in statements)
+            with span("ddl", statements=len(statements)):
+                self.db.execute(f"DO $bootstrap$\nBEGIN\n{body}\nEND\n$bootstrap$;")
+
+            catalog.update(self._read_catalog(list(CREATE_TABLE_SQL)))
+            for table in CREATE_TABLE_SQL:
+                # never re-run the bootstrap for a table in this container
+                catalog.setdefault(table, {})
+                for column, col_type in ADD_COLUMNS.get(table, {}).items():
+                    catalog[table].setdefault(column, col_type.lower())
+            return catalog
+
+    def _bootstrap_statements(self, catalog: Dict[str, Dict[str, str]]) -> List[str]:
+        missing = [table for table in CREATE_TABLE_SQL if table not in catalog]
+        statements = [CREATE_TABLE_SQL[table] for level in dependency_levels(missing) for table in level]
+        for table, columns in ADD_COLUMNS.items():
+            if table not in catalog:
+                continue
+            for column, col_type in columns.items():
+                if column not in catalog[table]:
+                    statements.append(f'ALTER TABLE "{table}" ADD COLUMN IF NOT EXISTS "{column}" {col_type}')
+        return statements
+
+    def _catalog_key(self) -> Tuple[Any, ...]:
+        return (getattr(self.db, "host", None), getattr(self.db, "port", None), getattr(self.db, "database", None))
+
+    def _read_catalog(self, tables: List[str]) -> Dict[str, Dict[str, str]]:
+        catalog: Dict[str, Dict[str, str]] = {}
+        for table_name, column_name, data_type in self.db.fetchall(CATALOG_SQL, [tables]):
+            catalog.setdefault(table_name, {})[column_name] = data_type
+        logger.info("Read warehouse catalog: %s of %s tables present", len(catalog), len(tables))
+        return catalog
+
+    def _check_schema_drift(self, table: str, df: pd.DataFrame, columns: Dict[str, str]) -> None:
+        # Compares the parquet columns with the cached warehouse columns (no query).
+        if df is None or not columns:
+            return
+        not_in_warehouse = [col for col in df.columns if col not in columns]
+        # surrogate keys are assigned by the warehouse / resolved by the loader
+        generated = {key_col for _, key_col in SURROGATE_KEYS.values()}
+        generated.update(key_col for _, _, key_col in FACT_DIMENSION_KEYS.get(table, []))
+        not_in_parquet = [col for col in columns if col not in df.columns and col not in generated]
+        if not_in_parquet:
+            logger.warning("Schema drift table=%s: warehouse columns missing from parquet: %s", table, not_in_parquet)
+        if not_in_warehouse:
+            # the warehouse may have changed under the cache: re-read it next time
+            _CATALOG_CACHE.pop(self._catalog_key(), None)
+            raise ValueError(
+                f"Schema drift table={table}: parquet columns not in warehouse table: {not_in_warehouse}"
+            )
 
 
     def truncate_table(self, table: str) -> None:
@@ -199,13 +954,210 @@ class LoadService:
         logger.info("Truncating table: %s", table)
         self.db.execute(truncate_sql)
 
+    def merge_snapshot(self, table: str, df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Applies a full snapshot as a diff instead of TRUNCATE + INSERT:
+        1) bulk load the snapshot into a TEMP staging table
+        2) INSERT ... ON CONFLICT (pk) DO UPDATE, only where the md5 of the row's
+           non-key columns differs from the warehouse row
+        3) DELETE warehouse rows whose key is not in the snapshot
+        Readers never see an empty table and unchanged rows are not rewritten.
+        Returns {"inserted", "updated", "deleted"}.
+        """
+        key = PRIMARY_KEYS.get(table)
+        if not key:
+            raise KeyError(f"No primary key for table={table}. Add it to loading/sql.py PRIMARY_KEYS.")
+
+        columns = list(df.columns)
+        staging = self._stage_df(table, df)
+        changes = self._upsert_from_staging(table, staging, columns, key)
+        changes["deleted"] = self._delete_missing_from_staging(table, staging, key)
+        return changes
+
+    def swap_snapshot(self, table: str, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Replaces a dim without holding its lock for the length of the load:
+        1) COPY the snapshot into an UNLOGGED shadow table (no WAL, no indexes yet)
+        2) build the live table's indexes / PK / UNIQUE constraints on the shadow,
+           then SET LOGGED so it survives a crash - and commit
+        3) in one short transaction: drop the facts' foreign keys to the dim, drop the
+           live table, rename the shadow into place and re-add the foreign keys
+           NOT VALID (metadata only; validated afterwards without blocking readers)
+        Commits as it goes, so it needs a transaction of its own: multi-table loads
+        swap their dims on a separate connection first (_swapped_dims).
+        Returns {"rows", "lock_hold_seconds"}.
+        """
+        shadow = f"_swap_{table}"
+        indexes = self.db.fetchall(SWAP_INDEX_SQL, [table])
+        foreign_keys = self.db.fetchall(SWAP_FK_SQL, [table])
+
+        # 1) bulk load outside any lock on the live table
+        self.db.execute(f'DROP TABLE IF EXISTS "{shadow}";')
+        self.db.execute(
+            f'CREATE UNLOGGED TABLE "{shadow}" '
+            f'(LIKE "{table}" INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS);'
+        )
+        rows = self._insert_df(shadow, df)
+
+        # 2) indexes are built once over the loaded rows, under temporary names
+        renames: List[str] = []
+        for index_name, index_def, constraint, contype in indexes:
+            swap_index = f"{index_name}_swap"
+            self.db.execute(_INDEX_DEF_PATTERN.sub(rf'\1"{swap_index}" ON "{shadow}"', index_def) + ";")
+            if contype in ("p", "u"):
+                kind = "PRIMARY KEY" if contype == "p" else "UNIQUE"
+                self.db.execute(
+                    f'ALTER TABLE "{shadow}" ADD CONSTRAINT "{constraint}_swap" {kind} USING INDEX "{swap_index}";'
+                )
+                renames.append(f'ALTER TABLE "{table}" RENAME CONSTRAINT "{constraint}_swap" TO "{constraint}";')
+            else:
+                renames.append(f'ALTER INDEX "{swap_index}" RENAME TO "{index_name}";')
+        self.db.execute(f'ALTER TABLE "{shadow}" SET LOGGED;')
+        self._commit_swap_step(table)
+
+        # 3) the only statements that lock the live table
+        started = time.perf_counter()
+        self.db.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}';")
+        for fact, fk_name, _, _ in foreign_keys:
+            self.db.execute(f'ALTER TABLE {fact} DROP CONSTRAINT "{fk_name}";')
+        self.db.execute(f'DROP TABLE "{table}";')
+        self.db.execute(f'ALTER TABLE "{shadow}" RENAME TO "{table}";')
+        for statement in renames:
+            self.db.execute(statement)
+        for fact, fk_name, fk_def, relkind in foreign_keys:
+            # partitioned tables cannot hold a NOT VALID foreign key; theirs is checked here
+            not_valid = "" if relkind == "p" else " NOT VALID"
+            self.db.execute(f'ALTER TABLE {fact} ADD CONSTRAINT "{fk_name}" {fk_def}{not_valid};')
+        self._commit_swap_step(table)
+        lock_hold_seconds = time.perf_counter() - started
+
+        # VALIDATE takes SHARE UPDATE EXCLUSIVE, so readers and writers carry on
+        for fact, fk_name, _, relkind in foreign_keys:
+            if relkind != "p":
+                self.db.execute(f'ALTER TABLE {fact} VALIDATE CONSTRAINT "{fk_name}";')
+        return {"rows": rows, "lock_hold_seconds": round(lock_hold_seconds, 6)}
+
+    def _commit_swap_step(self, table: str) -> None:
+        # swap runs in its own transaction (see _swapped_dims): committing here never
+        # commits another table's rows; the commit releases the table lock, so retake it
+        if hasattr(self.db, "commit"):
+            self.db.commit()
+        self._lock_tables([table])
+
+    def _commit(self) -> None:
+        # Buffered fact checkpoints go out with the rows they describe: the control
+        # table upsert inside the transaction, S3 checkpoints (clients without the
+        # control table) only once the commit succeeded, so a failed commit never
+        # leaves a checkpoint ahead of the warehouse.
+        in_transaction = self._uses_checkpoint_table()
+        if in_transaction:
+            self.flush_checkpoints()
+        if hasattr(self.db, "commit"):
+            self.db.commit()
+        if not in_transaction:
+            self.flush_checkpoints()
+
+    def merge_fact_batch(self, table: str, df: pd.DataFrame, key: List[str]) -> Dict[str, int]:
+        """
+        Applies one batch of fact rows as a set-based upsert: the batch is COPYed
+        into a TEMP staging table, then one INSERT ... ON CONFLICT (pk) DO UPDATE
+        inserts new keys and updates re-sent ones. Within the batch only the
+        latest version of a key is applied, and a warehouse row is never
+        overwritten by an older version. Returns {"inserted", "updated"}.
+        """
+        staging = self._stage_df(table, df)
+        return self._upsert_from_staging(table, staging, list(df.columns), key, version_column=WATERMARK_COLUMN)
+
+    def _stage_df(self, table: str, df: pd.DataFrame) -> str:
+        # TEMP tables are session-local and never WAL-logged; dropped at commit.
+        # Only the frame's columns, with their warehouse types and no constraints:
+        # a LIKE copy would keep NOT NULL on identity keys the frame does not carry.
+        staging = f"_stg_{table}"
+        col_list = ", ".join(f'"{col}"' for col in df.columns)
+        self.db.execute(f'DROP TABLE IF EXISTS "{staging}";')
+        self.db.execute(
+            f'CREATE TEMP TABLE "{staging}" ON COMMIT DROP AS SELECT {col_list} FROM "{table}" WITH NO DATA;'
+        )
+        self._insert_df(staging, df)
+        return staging
+
+    def _upsert_from_staging(
+        self,
+        table: str,
+        staging: str,
+        columns: List[str],
+        key: List[str],
+        version_column: Optional[str] = None,
+    ) -> Dict[str, int]:
+        col_list = ", ".join(f'"{col}"' for col in columns)
+        key_list = ", ".join(f'"{col}"' for col in key)
+        non_key = [col for col in columns if col not in key]
+        if version_column not in non_key:
+            version_column = None
+
+        if non_key:
+            assignments = ", ".join(f'"{col}" = EXCLUDED."{col}"' for col in non_key)
+            current_hash = "md5(ROW(" + ", ".join(f't."{col}"' for col in non_key) + ")::text)"
+            incoming_hash = "md5(ROW(" + ", ".join(f'EXCLUDED."{col}"' for col in non_key) + ")::text)"
+            conflict = f"DO UPDATE SET {assignments} WHERE {current_hash} IS DISTINCT FROM {incoming_hash}"
+            if version_column:
+                conflict += f' AND COALESCE(EXCLUDED."{version_column}" >= t."{version_column}", true)'
+        else:
+            conflict = "DO NOTHING"
+
+        if version_column:
+            # ON CONFLICT cannot touch the same row twice in one statement
+            select = (
+                f'SELECT DISTINCT ON ({key_list}) {col_list} FROM "{staging}" '
+                f'ORDER BY {key_list}, "{version_column}" DESC NULLS LAST'
+            )
+        else:
+            select = f'SELECT {col_list} FROM "{staging}"'
+
+        # Rows written = rows RETURNed; a written key that the pre-upsert snapshot
+        # (which the outer query sees) lacks was inserted. Unlike xmax = 0 this
+        # also works through the parent of a partitioned table.
+        existed = " AND ".join(f'p."{col}" = u."{col}"' for col in key)
+        sql = (
+            "WITH upserted AS ("
+            f'INSERT INTO "{table}" AS t ({col_list}) '
+            f"{select} "
+            f"ON CONFLICT ({key_list}) {conflict} "
+            f"RETURNING {key_list}) "
+            f'SELECT count(*) FILTER (WHERE NOT EXISTS (SELECT 1 FROM "{table}" AS p WHERE {existed})), count(*) '
+            "FROM upserted AS u;"
+        )
+        ((inserted, written),) = self.db.fetchall(sql)
+        return {"inserted": int(inserted), "updated": int(written) - int(inserted)}
+
+    def _delete_missing_from_staging(self, table: str, staging: str, key: List[str]) -> int:
+        match = " AND ".join(f's."{col}" = t."{col}"' for col in key)
+        sql = (
+            f'DELETE FROM "{table}" AS t '
+            f'WHERE NOT EXISTS (SELECT 1 FROM "{staging}" AS s WHERE {match}) '
+            "RETURNING 1;"
+        )
+        return len(self.db.fetchall(sql))
+
     def _insert_df(self, table: str, df: pd.DataFrame) -> int:
         """
         Bulk insert DataFrame rows into table. Returns inserted row count.
+        Uses COPY FROM STDIN when the client supports it, multi-row VALUES
+        when insert_method="values", else executemany.
         """
         if df is None or df.empty:
             return 0
 
+        with span("insert", table=table, rows=len(df), method=self.insert_method):
+            return self._insert_rows(table, df)
+
+    def _insert_rows(self, table: str, df: pd.DataFrame) -> int:
+        if self.insert_method == "copy" and hasattr(self.db, "copy_from_df"):
+            return self.db.copy_from_df(table, df)
+
+        if self.insert_method == "values":
+            return self._insert_values(table, df)
+
         columns = list(df.columns)
         col_list = ", ".join([f'"{col}"' for col in columns])
         placeholders = ", ".join(["%s"] * len(columns))
@@ -215,6 +1167,33 @@ class LoadService:
         self.db.executemany(sql, params, chunk_size=1000)
         return len(params)
 
+    def _insert_values(self, table: str, df: pd.DataFrame) -> int:
+        """
+        One INSERT per batch of rows instead of one server execution per row.
+        Rows per statement = MAX_BIND_PARAMS // column count, so wide tables get
+        smaller batches and no statement exceeds the parameter limit.
+        """
+        columns = list(df.columns)
+        rows_per_stmt = max(1, MAX_BIND_PARAMS // len(columns))
+        col_list = ", ".join([f'"{col}"' for col in columns])
+        row_placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+
+        def values_sql(n_rows: int) -> str:
+            return f'INSERT INTO "{table}" ({col_list}) VALUES ' + ", ".join([row_placeholders] * n_rows) + ";"
+
+        rows = list(df.itertuples(index=False, name=None))
+        full_batch_sql = values_sql(rows_per_stmt) if len(rows) >= rows_per_stmt else None
+        logger.info(
+            "Inserting %s rows into %s with multi-row VALUES (%s rows/statement)",
+            len(rows), table, rows_per_stmt,
+        )
+        for i in range(0, len(rows), rows_per_stmt):
+            batch = rows[i:i + rows_per_stmt]
+            # full batches reuse one SQL text so the driver can reuse its prepared statement
+            sql = full_batch_sql if len(batch) == rows_per_stmt else values_sql(len(batch))
+            self.db.execute(sql, [value for row in batch for value in row])
+        return len(rows)
+
    
     # Watermark detection
    
@@ -226,14 +1205,21 @@ class LoadService:
         """
         cols = set(df.columns)
 
-        # Best: last_updated_date + last_updated_time
+        # Best: typed last_updated timestamp (plain vectorized comparison)
+        if WATERMARK_COLUMN in cols and pd.api.types.is_datetime64_any_dtype(df[WATERMARK_COLUMN]):
+            wm = df[WATERMARK_COLUMN]
+            wm = wm.dt.tz_localize("UTC") if wm.dt.tz is None else wm.dt.tz_convert("UTC")
+            if wm.notna().any():
+                return WATERMARK_COLUMN, wm
+
+        # Next: last_updated_date + last_updated_time (files written before last_updated was typed)
         if {"last_updated_date", "last_updated_time"}.issubset(cols):
             dt_str = df["last_updated_date"].astype(str) + " " + df["last_updated_time"].astype(str)
             wm = pd.to_datetime(dt_str, errors="coerce", utc=True)
             if wm.notna().any():
                 return "last_updated_date+time", wm
 
-        # Next best: single timestamp column
+        # Then: single timestamp column
         for c in ["last_updated", "updated_at", "created_at", "payment_date"]:
             if c in cols:
                 wm = pd.to_datetime(df[c], errors="coerce", utc=True)
@@ -254,7 +1240,8 @@ class LoadService:
         if hasattr(max_dt, "to_pydatetime"):
             max_dt = max_dt.to_pydatetime()
 
-        max_dt = max_dt.astimezone(timezone.utc).replace(microsecond=0)
+        # keep sub-second precision: a truncated watermark would reload rows of the same second
+        max_dt = max_dt.astimezone(timezone.utc)
         return max_dt.isoformat().replace("+00:00", "Z")
 
     def _parse_ts(self, ts: str) -> datetime:
@@ -267,15 +1254,105 @@ class LoadService:
         return datetime.fromisoformat(ts).astimezone(timezone.utc)
 
  
-    # Checkpoints in S3 (facts)
- 
+    # Checkpoints (facts)
+    # - warehouse control table (_load_checkpoints) when the client can query:
+    #   upserted in the load transaction, so it commits or rolls back with the rows
+    # - else one S3 object per table under checkpoints_prefix
+    # Read once per run; legacy S3 checkpoints are migrated on first read.
+
+
+    def _uses_checkpoint_table(self) -> bool:
+        return hasattr(self.db, "fetchall")
+
+    def _ensure_checkpoint_table(self) -> None:
+        cache_key = self._catalog_key()
+        if cache_key not in _CHECKPOINT_TABLE_READY:
+            self.db.execute(CHECKPOINT_TABLE_SQL)
+            _CHECKPOINT_TABLE_READY.add(cache_key)
+
+    def _fetch_checkpoints(self) -> Dict[str, Dict[str, Any]]:
+        if not self._uses_checkpoint_table():
+            return {}
+        self._ensure_checkpoint_table()
+        checkpoints: Dict[str, Dict[str, Any]] = {}
+        for table, payload in self.db.fetchall(f'SELECT table_name, checkpoint FROM "{CHECKPOINT_TABLE}";'):
+            checkpoints[table] = json.loads(payload) if isinstance(payload, str) else payload
+        logger.info("Read %s fact checkpoints from %s", len(checkpoints), CHECKPOINT_TABLE)
+        return checkpoints
+
+    def _read_checkpoint(self, table: str) -> Dict[str, Any]:
+        """
+        Checkpoint for a fact table from the per-run cache. Returns {} if not found.
+        """
+        if self._checkpoints is None:
+            with span("checkpoint_read"):
+                self._checkpoints = self._fetch_checkpoints()
+        if table not in self._checkpoints:
+            with span("checkpoint_read", table=table):
+                self._checkpoints[table] = self._read_s3_checkpoint(table)
+        return dict(self._checkpoints[table])
+
+    def _write_checkpoint(
+        self,
+        table: str,
+        parquet_keys: List[str],
+        loaded: Set[str],
+        last_loaded_ts: Optional[str],
+    ) -> None:
+        # buffered; persisted by flush_checkpoints()
+        if self._checkpoints is None:
+            self._checkpoints = {}
+        last_loaded_key, loaded_after = self._checkpoint_keys(parquet_keys, loaded)
+        self._checkpoints[table] = {
+            "last_loaded_key": last_loaded_key,
+            "last_loaded_ts": last_loaded_ts,
+            "loaded_after": loaded_after,
+            "updated_at": datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z"),
+        }
+        self._dirty_checkpoints.add(table)
+        logger.info(
+            "Checkpoint table=%s key=%s ts=%s loaded_after=%s", table, last_loaded_key, last_loaded_ts, len(loaded_after)
+        )
+
+    def flush_checkpoints(self) -> None:
+        """
+        Persists every checkpoint changed in this run: one upsert into the control
+        table, or one S3 PUT per table without it. Loads call it through _commit(),
+        which orders it around the warehouse commit.
+        """
+        if not self._dirty_checkpoints:
+            return
+        with span("checkpoint_write", tables=len(self._dirty_checkpoints)):
+            self._flush_checkpoints()
+
+    def _flush_checkpoints(self) -> None:
+        tables = sorted(self._dirty_checkpoints)
+
+        if self._uses_checkpoint_table():
+            self._ensure_checkpoint_table()
+            values = ", ".join(["(%s, CAST(%s AS JSONB), now())"] * len(tables))
+            params: List[Any] = []
+            for table in tables:
+                params.extend([table, json.dumps(self._checkpoints[table])])
+            self.db.execute(
+                f'INSERT INTO "{CHECKPOINT_TABLE}" (table_name, checkpoint, updated_at) VALUES {values} '
+                "ON CONFLICT (table_name) DO UPDATE "
+                "SET checkpoint = EXCLUDED.checkpoint, updated_at = EXCLUDED.updated_at;",
+                params,
+            )
+        else:
+            for table in tables:
+                self._write_s3_checkpoint(table, self._checkpoints[table])
+
+        logger.info("Flushed checkpoints for tables=%s", tables)
+        self._dirty_checkpoints.clear()
 
     def _checkpoint_key(self, table: str) -> str:
         return f"{self.checkpoints_prefix}/{table}.json"
 
-    def _read_checkpoint(self, table: str) -> Dict[str, Any]:
+    def _read_s3_checkpoint(self, table: str) -> Dict[str, Any]:
         """
-        Read checkpoint JSON. Returns {} if not found.
+        Read checkpoint JSON from S3. Returns {} if not found.
         Raises on other errors (so you see IAM/JSON issues).
         """
         key = self._checkpoint_key(table)
@@ -291,17 +1368,12 @@ class LoadService:
             logger.exception("Failed to read checkpoint table=%s key=%s", table, key)
             raise
 
-    def _write_checkpoint(self, table: str, last_loaded_key: str, last_loaded_ts: Optional[str]) -> None:
+    def _write_s3_checkpoint(self, table: str, payload: Dict[str, Any]) -> None:
         key = self._checkpoint_key(table)
-        payload = {
-            "last_loaded_key": last_loaded_key,
-            "last_loaded_ts": last_loaded_ts,
-            "updated_at": datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z"),
-        }
         self.s3_client.s3.put_object(
             Bucket=self.processed_bucket,
             Key=key,
             Body=json.dumps(payload).encode("utf-8"),
             ContentType="application/json",
         )
-        logger.info("Wrote checkpoint table=%s key=%s ts=%s", table, last_loaded_key, last_loaded_ts)
+        logger.info("Wrote checkpoint table=%s key=%s", table, key)
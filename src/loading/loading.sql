@@ -4,6 +4,7 @@
 --dim_date
 CREATE TABLE IF NOT EXISTS dim_date (
     date_id INTEGER PRIMARY KEY,
+    date_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
     date DATE NOT NULL UNIQUE,
     year INTEGER NOT NULL,
     month INTEGER NOT NULL,
@@ -16,6 +17,7 @@ CREATE TABLE IF NOT EXISTS dim_date (
 --dim_staff
 CREATE TABLE IF NOT EXISTS dim_staff (
     staff_id INTEGER PRIMARY KEY,
+    staff_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
     first_name TEXT NOT NULL,
     last_name TEXT NOT NULL,
     department_name TEXT NOT NULL,
@@ -25,6 +27,7 @@ CREATE TABLE IF NOT EXISTS dim_staff (
 --dim_counterparty
 CREATE TABLE IF NOT EXISTS dim_counterparty (
     counterparty_id INTEGER PRIMARY KEY,
+    counterparty_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
     counterparty_legal_name TEXT NOT NULL,
     counterparty_legal_address_line_1 TEXT,
     counterparty_legal_address_line_2 TEXT,
@@ -37,11 +40,13 @@ CREATE TABLE IF NOT EXISTS dim_counterparty (
 --dim_currency
 CREATE TABLE IF NOT EXISTS dim_currency (
     currency_id INTEGER PRIMARY KEY,
+    currency_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
     currency_code TEXT NOT NULL UNIQUE
 );
 --dim_design
 CREATE TABLE IF NOT EXISTS dim_design (
     design_id INTEGER PRIMARY KEY,
+    design_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
     design_name TEXT NOT NULL,
     file_location TEXT,
     file_name TEXT
@@ -49,6 +54,7 @@ CREATE TABLE IF NOT EXISTS dim_design (
 --dim_location
 CREATE TABLE IF NOT EXISTS dim_location (
     location_id INTEGER PRIMARY KEY,
+    location_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
     address_line_1 TEXT NOT NULL,
     address_line_2 TEXT,
     district TEXT,
@@ -60,11 +66,13 @@ CREATE TABLE IF NOT EXISTS dim_location (
 -- dim_payment_type
 CREATE TABLE IF NOT EXISTS dim_payment_type (
     payment_type_id INTEGER PRIMARY KEY,
+    payment_type_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
     payment_type_name TEXT NOT NULL UNIQUE
 );
 --dim_transaction
 CREATE TABLE IF NOT EXISTS dim_transaction (
     transaction_id INTEGER PRIMARY KEY,
+    transaction_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
     transaction_type TEXT NOT NULL,
     sales_order_id INTEGER,
     purchase_order_id INTEGER
@@ -74,11 +82,12 @@ CREATE TABLE IF NOT EXISTS dim_transaction (
 -- =========================
 -- fact_sales_order
 CREATE TABLE IF NOT EXISTS fact_sales_order (
-    sales_order_id INTEGER PRIMARY KEY,
+    sales_order_id INTEGER NOT NULL,
     created_date DATE NOT NULL,
     created_time TIME NOT NULL,
     last_updated_date DATE NOT NULL,
     last_updated_time TIME NOT NULL,
+    last_updated TIMESTAMPTZ,
     sales_staff_id INTEGER NOT NULL,
     sales_counterparty_id INTEGER NOT NULL,
     design_id INTEGER NOT NULL,
@@ -86,6 +95,14 @@ CREATE TABLE IF NOT EXISTS fact_sales_order (
     agreed_delivery_location_id INTEGER NOT NULL,
     units_sold INTEGER NOT NULL,
     unit_price NUMERIC(10, 2) NOT NULL,
+    agreed_payment_date DATE NOT NULL,
+    agreed_delivery_date DATE NOT NULL,
+    sales_staff_key BIGINT,
+    sales_counterparty_key BIGINT,
+    design_key BIGINT,
+    currency_key BIGINT,
+    agreed_delivery_location_key BIGINT,
+    PRIMARY KEY (sales_order_id, created_date),
     CONSTRAINT fk_sales_staff
         FOREIGN KEY (sales_staff_id)
         REFERENCES dim_staff(staff_id),
@@ -101,15 +118,18 @@ CREATE TABLE IF NOT EXISTS fact_sales_order (
     CONSTRAINT fk_sales_location
         FOREIGN KEY (agreed_delivery_location_id)
         REFERENCES dim_location(location_id)
-);
+) PARTITION BY RANGE (created_date);
+CREATE INDEX IF NOT EXISTS fact_sales_order_created_date_brin ON fact_sales_order USING brin (created_date);
+CREATE INDEX IF NOT EXISTS fact_sales_order_last_updated_brin ON fact_sales_order USING brin (last_updated);
 -- fact_purchase_order
 CREATE TABLE IF NOT EXISTS fact_purchase_order(
-    purchase_record_id INTEGER PRIMARY KEY,
+    purchase_record_id BIGSERIAL,
     purchase_order_id INTEGER NOT NULL,
     created_date DATE NOT NULL,
     created_time TIME NOT NULL,
     last_updated_date DATE NOT NULL,
     last_updated_time TIME NOT NULL,
+    last_updated TIMESTAMPTZ,
     staff_id INTEGER NOT NULL,
     counterparty_id INTEGER NOT NULL,
     currency_id INTEGER NOT NULL,
@@ -119,6 +139,11 @@ CREATE TABLE IF NOT EXISTS fact_purchase_order(
     agreed_delivery_date DATE NOT NULL,
     agreed_payment_date DATE NOT NULL,
     agreed_delivery_location_id INTEGER NOT NULL,
+    staff_key BIGINT,
+    counterparty_key BIGINT,
+    currency_key BIGINT,
+    agreed_delivery_location_key BIGINT,
+    PRIMARY KEY (purchase_record_id, created_date),
     CONSTRAINT fk_purchase_order_staff
         FOREIGN KEY (staff_id)
         REFERENCES dim_staff(staff_id),
@@ -131,10 +156,13 @@ CREATE TABLE IF NOT EXISTS fact_purchase_order(
     CONSTRAINT fk_purchase_order_location
         FOREIGN KEY (agreed_delivery_location_id)
         REFERENCES dim_location(location_id)
-);
+) PARTITION BY RANGE (created_date);
+CREATE INDEX IF NOT EXISTS fact_purchase_order_created_date_brin ON fact_purchase_order USING brin (created_date);
+CREATE INDEX IF NOT EXISTS fact_purchase_order_last_updated_brin ON fact_purchase_order USING brin (last_updated);
+CREATE INDEX IF NOT EXISTS fact_purchase_order_agreed_delivery_date_brin ON fact_purchase_order USING brin (agreed_delivery_date);
 -- fact_payment
 CREATE TABLE IF NOT EXISTS fact_payment (
-    payment_id INTEGER PRIMARY KEY,
+    payment_id INTEGER NOT NULL,
     transaction_id INTEGER NOT NULL,
     counterparty_id INTEGER NOT NULL,
     currency_id INTEGER NOT NULL,
@@ -142,6 +170,11 @@ CREATE TABLE IF NOT EXISTS fact_payment (
     payment_date DATE NOT NULL,
     payment_amount NUMERIC(12,2) NOT NULL,
     paid BOOLEAN NOT NULL,
+    last_updated TIMESTAMPTZ,
+    counterparty_key BIGINT,
+    currency_key BIGINT,
+    payment_type_key BIGINT,
+    PRIMARY KEY (payment_id, payment_date),
     CONSTRAINT fk_purchase_order_counterparty
         FOREIGN KEY (counterparty_id)
         REFERENCES dim_counterparty(counterparty_id),
@@ -151,4 +184,6 @@ CREATE TABLE IF NOT EXISTS fact_payment (
     CONSTRAINT fk_payment_type
         FOREIGN KEY (payment_type_id)
         REFERENCES dim_payment_type(payment_type_id)
-);
\ No newline at end of file
+) PARTITION BY RANGE (payment_date);
+CREATE INDEX IF NOT EXISTS fact_payment_payment_date_brin ON fact_payment USING brin (payment_date);
+CREATE INDEX IF NOT EXISTS fact_payment_last_updated_brin ON fact_payment USING brin (last_updated);
\ No newline at end of file
@@ -1,26 +1,166 @@
+import io
+import json
 import logging
 import os
+import re
+from datetime import date, datetime, timezone
 from io import BytesIO
-from typing import List, Optional
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
 import pandas as pd
+import pyarrow.parquet as pq
 import boto3
 
+from observability.tracing import span
+
 
 
 logger = logging.getLogger(__name__)
 logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
 
+# Hive-style partition path written by the transformation stage for fact tables
+PARTITION_PATTERN = re.compile(r"/year=(\d{4})/month=(\d{2})/day=(\d{2})/")
+
+# Per-table output index maintained by the transformation stage (_index/<table>.json)
+INDEX_PREFIX = "_index"
+
+# Tail bytes fetched with the first ranged GET; covers the footer of typical files
+FOOTER_PREFETCH_BYTES = 64 * 1024
+
+
+class S3RangeReader(io.RawIOBase):
+
+    # Seekable read-only file over an S3 object, backed by ranged GETs.
+    # - opening fetches the last FOOTER_PREFETCH_BYTES (parquet footer) in one GET
+    # - prefetch(start, end) fetches one byte range (e.g. a row group) in one GET
+    # - reads outside the cached ranges fall back to an exact ranged GET
+    # Only the footer and the current prefetched range are kept in memory.
+
+    def __init__(self, s3, bucket: str, key: str, footer_bytes: Optional[int] = None):
+        super().__init__()
+        footer_bytes = footer_bytes or FOOTER_PREFETCH_BYTES
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.requests = 0
+        self._pos = 0
+
+        response = self._get(f"bytes=-{footer_bytes}")
+        footer = response["Body"].read()
+        content_range = response.get("ContentRange")
+        self.size = int(content_range.rsplit("/", 1)[-1]) if content_range else len(footer)
+        self._footer: Tuple[int, bytes] = (self.size - len(footer), footer)
+        self._window: Tuple[int, bytes] = (0, b"")
+
+    def _get(self, byte_range: str):
+        self.requests += 1
+        return self.s3.get_object(Bucket=self.bucket, Key=self.key, Range=byte_range)
+
+    def _fetch(self, start: int, end: int) -> bytes:
+        # end is exclusive; HTTP ranges are inclusive
+        return self._get(f"bytes={start}-{end - 1}")["Body"].read()
+
+    def _cached(self, start: int, end: int) -> Optional[bytes]:
+        for offset, data in (self._footer, self._window):
+            if offset <= start and end <= offset + len(data):
+                return data[start - offset:end - offset]
+        return None
+
+    def prefetch(self, start: int, end: int) -> None:
+        end = min(end, self.size)
+        if start >= end or self._cached(start, end) is not None:
+            return
+        self._window = (start, self._fetch(start, end))
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        end = self.size if size is None or size < 0 else min(self.size, self._pos + size)
+        if self._pos >= end:
+            return b""
+        data = self._cached(self._pos, end)
+        if data is None:
+            data = self._fetch(self._pos, end)
+        self._pos = end
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def row_group_at_or_below(row_group: pq.RowGroupMetaData, column: str, value: Any) -> bool:
+    # True when the row group's max statistic for column is <= value.
+    # Missing column/statistics never skip. Naive timestamps are taken as UTC.
+    for i in range(row_group.num_columns):
+        chunk = row_group.column(i)
+        if chunk.path_in_schema != column:
+            continue
+        stats = chunk.statistics
+        if stats is None or not stats.has_min_max:
+            return False
+        col_max = stats.max
+        if isinstance(col_max, datetime) and isinstance(value, datetime):
+            if col_max.tzinfo is None:
+                col_max = col_max.replace(tzinfo=timezone.utc)
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+        try:
+            return col_max <= value
+        except TypeError:
+            return False
+    return False
+
+
+def row_group_byte_range(row_group: pq.RowGroupMetaData, columns: Optional[Sequence[str]] = None) -> Tuple[int, int]:
+    # [start, end) bytes covering the (projected) column chunks of one row group
+    starts, ends = [], []
+    for i in range(row_group.num_columns):
+        chunk = row_group.column(i)
+        if columns is not None and chunk.path_in_schema.split(".")[0] not in columns:
+            continue
+        start = chunk.data_page_offset
+        if chunk.has_dictionary_page and chunk.dictionary_page_offset:
+            start = min(start, chunk.dictionary_page_offset)
+        starts.append(start)
+        ends.append(start + chunk.total_compressed_size)
+    if not starts:
+        return 0, 0
+    return min(starts), max(ends)
+
 class S3LoadingClient:
     def __init__(self, bucket: str):
         self.bucket_name = bucket
         self.s3 = boto3.client("s3")
         logger.info("Initialising S3LoadingClient. bucket=%s", self.bucket_name)
 
-    def list_parquet_keys(self, table_name: str) -> List[str]:
+    def list_parquet_keys(
+        self,
+        table_name: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> List[str]:
 
 
         # Returns parquet keys under: <table_name>/
         # Sorted by LastModified ascending (oldest -> newest).
+        # start_date/end_date (inclusive) prune year=/month=/day= partitions;
+        # un-partitioned keys are only returned when no range is given.
 
         prefix = f"{table_name}/"
         paginator = self.s3.get_paginator("list_objects_v2")
@@ -34,22 +174,118 @@ class S3LoadingClient:
             if obj["Key"].endswith(".parquet")
             and not obj["Key"].endswith("/")]
 
+        if start_date is not None or end_date is not None:
+            parquet_objects = [
+                obj for obj in parquet_objects
+                if self._in_date_range(self.partition_date(obj["Key"]), start_date, end_date)]
+
         sorted_objects = sorted(parquet_objects, key=lambda x: x["LastModified"])
         keys = [obj["Key"] for obj in sorted_objects]
         logger.info("Found %s parquet files under prefix=%s in bucket=%s", len(keys), prefix, self.bucket_name)
         
         return keys
     
+    def list_output_keys(self, table_name: str) -> List[str]:
+
+        # Output keys oldest -> newest from the table index (one GET, no listing).
+        # The index is owned by the transform (update_index); without one this
+        # falls back to list_parquet_keys and leaves the index to the next transform run.
+
+        keys = self.read_index(table_name)
+        if keys is None:
+            logger.warning("No output index for table=%s; listing the table prefix", table_name)
+            keys = self.list_parquet_keys(table_name)
+        return keys
+
+    def _index_key(self, table_name: str) -> str:
+        return f"{INDEX_PREFIX}/{table_name}.json"
+
+    def read_index(self, table_name: str) -> Optional[List[str]]:
+        try:
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=self._index_key(table_name))
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        keys = json.loads(response["Body"].read().decode("utf-8")).get("keys", [])
+        logger.info("Read output index table=%s keys=%s", table_name, len(keys))
+        return keys
+
+    @staticmethod
+    def partition_date(key: str) -> Optional[date]:
+        # Date of a year=/month=/day= partition key, None for un-partitioned keys
+        match = PARTITION_PATTERN.search(key)
+        if not match:
+            return None
+        year, month, day = (int(part) for part in match.groups())
+        return date(year, month, day)
+
+    @staticmethod
+    def _in_date_range(value: Optional[date], start_date: Optional[date], end_date: Optional[date]) -> bool:
+        if value is None:
+            return False
+        if start_date is not None and value < start_date:
+            return False
+        if end_date is not None and value > end_date:
+            return False
+        return True
+
     def read_parquet_to_df(self, key: str) -> pd.DataFrame:
         logger.info("Reading parquet from s3://%s/%s", self.bucket_name, key)
-        response = self.s3.get_object(Bucket=self.bucket_name, Key=key)
-        body_bytes = response["Body"].read()
+        with span("s3_get") as attrs:
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=key)
+            body_bytes = response["Body"].read()
+            attrs["bytes"] = len(body_bytes)
         buffer = BytesIO(body_bytes)
-        
-        df = pd.read_parquet(buffer)
+
+        with span("parquet_decode"):
+            df = pd.read_parquet(buffer)
         logger.info("Loaded parquet rows=%s cols=%s key=%s", len(df), len(df.columns), key)
         return df
     
+    def iter_parquet_batches(
+        self,
+        key: str,
+        columns: Optional[List[str]] = None,
+        skip_until: Optional[Tuple[str, Any]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        # Stream a parquet object one row group at a time:
+        # one ranged GET for the footer, then one ranged GET per row group
+        # covering only the projected columns. Memory ~ one decoded row group.
+        # skip_until=(column, value) skips row groups whose max statistic for
+        # column is <= value, without fetching them.
+        # Projected columns missing from the file are left out (older outputs);
+        # file columns outside the projection are never fetched.
+        reader = S3RangeReader(self.s3, self.bucket_name, key)
+        with span("s3_get"):
+            parquet_file = pq.ParquetFile(reader)
+        metadata = parquet_file.metadata
+        if columns is not None:
+            names = parquet_file.schema_arrow.names
+            skipped_columns = [col for col in names if col not in columns]
+            if skipped_columns:
+                logger.warning("Not loading parquet columns outside the projection key=%s: %s", key, skipped_columns)
+            columns = [col for col in columns if col in names]
+        logger.info(
+            "Streaming parquet s3://%s/%s row_groups=%s rows=%s columns=%s",
+            self.bucket_name, key, metadata.num_row_groups, metadata.num_rows, columns or "all",
+        )
+
+        skipped = 0
+        for i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(i)
+            if skip_until is not None and row_group_at_or_below(row_group, *skip_until):
+                skipped += 1
+                continue
+            with span("s3_get"):
+                reader.prefetch(*row_group_byte_range(row_group, columns))
+            with span("parquet_decode", rows=row_group.num_rows):
+                batch = parquet_file.read_row_group(i, columns=columns).to_pandas()
+            yield batch
+
+        logger.info(
+            "Streamed parquet key=%s with %s GET requests (%s row groups skipped by statistics)",
+            key, reader.requests, skipped,
+        )
+
     def read_latest_parquet(self, table_name: str) -> Optional[pd.DataFrame]:
         #find latest parqet file for a table and read it to df
 
@@ -60,3 +296,20 @@ class S3LoadingClient:
 
         latest_key = keys[-1]
         return self.read_parquet_to_df(latest_key)
+
+    def read_partitions_to_df(
+        self,
+        table_name: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> Optional[pd.DataFrame]:
+        # Read every date partition of a table within [start_date, end_date] into one df
+
+        keys = [
+            key for key in self.list_parquet_keys(table_name, start_date=start_date, end_date=end_date)
+            if self.partition_date(key) is not None]
+        if not keys:
+            logger.warning("No partitions found for table '%s' in range %s..%s", table_name, start_date, end_date)
+            return None
+
+        return pd.concat([self.read_parquet_to_df(key) for key in keys], ignore_index=True)
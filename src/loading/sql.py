@@ -4,6 +4,7 @@ CREATE_TABLE_SQL = {
     "dim_date": """
     CREATE TABLE IF NOT EXISTS dim_date (
         date_id INTEGER PRIMARY KEY,
+        date_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
         date DATE NOT NULL UNIQUE,
         year INTEGER NOT NULL,
         month INTEGER NOT NULL,
@@ -18,6 +19,7 @@ CREATE_TABLE_SQL = {
     "dim_staff": """
     CREATE TABLE IF NOT EXISTS dim_staff (
         staff_id INTEGER PRIMARY KEY,
+        staff_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
         first_name TEXT NOT NULL,
         last_name TEXT NOT NULL,
         department_name TEXT NOT NULL,
@@ -29,6 +31,7 @@ CREATE_TABLE_SQL = {
     "dim_counterparty": """
     CREATE TABLE IF NOT EXISTS dim_counterparty (
         counterparty_id INTEGER PRIMARY KEY,
+        counterparty_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
         counterparty_legal_name TEXT NOT NULL,
         counterparty_legal_address_line_1 TEXT,
         counterparty_legal_address_line_2 TEXT,
@@ -43,6 +46,7 @@ CREATE_TABLE_SQL = {
     "dim_currency": """
     CREATE TABLE IF NOT EXISTS dim_currency (
         currency_id INTEGER PRIMARY KEY,
+        currency_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
         currency_code TEXT NOT NULL UNIQUE
     );
     """,
@@ -50,6 +54,7 @@ CREATE_TABLE_SQL = {
     "dim_design": """
     CREATE TABLE IF NOT EXISTS dim_design (
         design_id INTEGER PRIMARY KEY,
+        design_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
         design_name TEXT NOT NULL,
         file_location TEXT,
         file_name TEXT
@@ -59,6 +64,7 @@ CREATE_TABLE_SQL = {
     "dim_location": """
     CREATE TABLE IF NOT EXISTS dim_location (
         location_id INTEGER PRIMARY KEY,
+        location_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
         address_line_1 TEXT NOT NULL,
         address_line_2 TEXT,
         district TEXT,
@@ -72,6 +78,7 @@ CREATE_TABLE_SQL = {
     "dim_payment_type": """
     CREATE TABLE IF NOT EXISTS dim_payment_type (
         payment_type_id INTEGER PRIMARY KEY,
+        payment_type_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
         payment_type_name TEXT NOT NULL UNIQUE
     );
     """,
@@ -79,6 +86,7 @@ CREATE_TABLE_SQL = {
     "dim_transaction": """
     CREATE TABLE IF NOT EXISTS dim_transaction (
         transaction_id INTEGER PRIMARY KEY,
+        transaction_key BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE,
         transaction_type TEXT NOT NULL,
         sales_order_id INTEGER,
         purchase_order_id INTEGER
@@ -87,11 +95,12 @@ CREATE_TABLE_SQL = {
 
     "fact_sales_order": """
     CREATE TABLE IF NOT EXISTS fact_sales_order (
-        sales_order_id INTEGER PRIMARY KEY,
+        sales_order_id INTEGER NOT NULL,
         created_date DATE NOT NULL,
         created_time TIME NOT NULL,
         last_updated_date DATE NOT NULL,
         last_updated_time TIME NOT NULL,
+        last_updated TIMESTAMPTZ,
         sales_staff_id INTEGER NOT NULL,
         sales_counterparty_id INTEGER NOT NULL,
         design_id INTEGER NOT NULL,
@@ -99,6 +108,14 @@ CREATE_TABLE_SQL = {
         agreed_delivery_location_id INTEGER NOT NULL,
         units_sold INTEGER NOT NULL,
         unit_price NUMERIC(10, 2) NOT NULL,
+        agreed_payment_date DATE NOT NULL,
+        agreed_delivery_date DATE NOT NULL,
+        sales_staff_key BIGINT,
+        sales_counterparty_key BIGINT,
+        design_key BIGINT,
+        currency_key BIGINT,
+        agreed_delivery_location_key BIGINT,
+        PRIMARY KEY (sales_order_id, created_date),
         CONSTRAINT fk_sales_staff
             FOREIGN KEY (sales_staff_id)
             REFERENCES dim_staff(staff_id),
@@ -114,17 +131,22 @@ CREATE_TABLE_SQL = {
         CONSTRAINT fk_sales_location
             FOREIGN KEY (agreed_delivery_location_id)
             REFERENCES dim_location(location_id)
-    );
+    ) PARTITION BY RANGE (created_date);
+    CREATE INDEX IF NOT EXISTS fact_sales_order_created_date_brin
+        ON fact_sales_order USING brin (created_date);
+    CREATE INDEX IF NOT EXISTS fact_sales_order_last_updated_brin
+        ON fact_sales_order USING brin (last_updated);
     """,
 
     "fact_purchase_order": """
     CREATE TABLE IF NOT EXISTS fact_purchase_order (
-        purchase_record_id BIGSERIAL PRIMARY KEY,
+        purchase_record_id BIGSERIAL,
         purchase_order_id INTEGER NOT NULL,
         created_date DATE NOT NULL,
         created_time TIME NOT NULL,
         last_updated_date DATE NOT NULL,
         last_updated_time TIME NOT NULL,
+        last_updated TIMESTAMPTZ,
         staff_id INTEGER NOT NULL,
         counterparty_id INTEGER NOT NULL,
         currency_id INTEGER NOT NULL,
@@ -134,6 +156,11 @@ CREATE_TABLE_SQL = {
         agreed_delivery_date DATE NOT NULL,
         agreed_payment_date DATE NOT NULL,
         agreed_delivery_location_id INTEGER NOT NULL,
+        staff_key BIGINT,
+        counterparty_key BIGINT,
+        currency_key BIGINT,
+        agreed_delivery_location_key BIGINT,
+        PRIMARY KEY (purchase_record_id, created_date),
         CONSTRAINT fk_purchase_staff
             FOREIGN KEY (staff_id)
             REFERENCES dim_staff(staff_id),
@@ -146,12 +173,18 @@ CREATE_TABLE_SQL = {
         CONSTRAINT fk_purchase_location
             FOREIGN KEY (agreed_delivery_location_id)
             REFERENCES dim_location(location_id)
-    );
+    ) PARTITION BY RANGE (created_date);
+    CREATE INDEX IF NOT EXISTS fact_purchase_order_created_date_brin
+        ON fact_purchase_order USING brin (created_date);
+    CREATE INDEX IF NOT EXISTS fact_purchase_order_last_updated_brin
+        ON fact_purchase_order USING brin (last_updated);
+    CREATE INDEX IF NOT EXISTS fact_purchase_order_agreed_delivery_date_brin
+        ON fact_purchase_order USING brin (agreed_delivery_date);
     """,
 
     "fact_payment": """
     CREATE TABLE IF NOT EXISTS fact_payment (
-        payment_id INTEGER PRIMARY KEY,
+        payment_id INTEGER NOT NULL,
         transaction_id INTEGER NOT NULL,
         counterparty_id INTEGER NOT NULL,
         currency_id INTEGER NOT NULL,
@@ -159,6 +192,11 @@ CREATE_TABLE_SQL = {
         payment_date DATE NOT NULL,
         payment_amount NUMERIC(12,2) NOT NULL,
         paid BOOLEAN NOT NULL,
+        last_updated TIMESTAMPTZ,
+        counterparty_key BIGINT,
+        currency_key BIGINT,
+        payment_type_key BIGINT,
+        PRIMARY KEY (payment_id, payment_date),
         CONSTRAINT fk_payment_counterparty
             FOREIGN KEY (counterparty_id)
             REFERENCES dim_counterparty(counterparty_id),
@@ -168,6 +206,125 @@ CREATE_TABLE_SQL = {
         CONSTRAINT fk_payment_type
             FOREIGN KEY (payment_type_id)
             REFERENCES dim_payment_type(payment_type_id)
-    );
+    ) PARTITION BY RANGE (payment_date);
+    CREATE INDEX IF NOT EXISTS fact_payment_payment_date_brin
+        ON fact_payment USING brin (payment_date);
+    CREATE INDEX IF NOT EXISTS fact_payment_last_updated_brin
+        ON fact_payment USING brin (last_updated);
     """,
 }
+
+
+# Columns added after a table's first release: {table: {column: type}}.
+# CREATE TABLE IF NOT EXISTS leaves existing tables alone, so the loader adds
+# these to tables that predate them.
+ADD_COLUMNS = {
+    "dim_date": {"date_key": "BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE"},
+    "dim_staff": {"staff_key": "BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE"},
+    "dim_counterparty": {"counterparty_key": "BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE"},
+    "dim_currency": {"currency_key": "BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE"},
+    "dim_design": {"design_key": "BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE"},
+    "dim_location": {"location_key": "BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE"},
+    "dim_payment_type": {"payment_type_key": "BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE"},
+    "dim_transaction": {"transaction_key": "BIGINT GENERATED BY DEFAULT AS IDENTITY UNIQUE"},
+    "fact_sales_order": {
+        "last_updated": "TIMESTAMPTZ",
+        "agreed_payment_date": "DATE",
+        "agreed_delivery_date": "DATE",
+        "sales_staff_key": "BIGINT",
+        "sales_counterparty_key": "BIGINT",
+        "design_key": "BIGINT",
+        "currency_key": "BIGINT",
+        "agreed_delivery_location_key": "BIGINT",
+    },
+    "fact_purchase_order": {
+        "last_updated": "TIMESTAMPTZ",
+        "staff_key": "BIGINT",
+        "counterparty_key": "BIGINT",
+        "currency_key": "BIGINT",
+        "agreed_delivery_location_key": "BIGINT",
+    },
+    "fact_payment": {
+        "last_updated": "TIMESTAMPTZ",
+        "counterparty_key": "BIGINT",
+        "currency_key": "BIGINT",
+        "payment_type_key": "BIGINT",
+    },
+}
+
+
+# Warehouse surrogate keys: {dim: (natural id column, surrogate key column)}.
+# Assigned by the warehouse (identity) and kept across merge loads.
+SURROGATE_KEYS = {
+    "dim_date": ("date_id", "date_key"),
+    "dim_staff": ("staff_id", "staff_key"),
+    "dim_counterparty": ("counterparty_id", "counterparty_key"),
+    "dim_currency": ("currency_id", "currency_key"),
+    "dim_design": ("design_id", "design_key"),
+    "dim_location": ("location_id", "location_key"),
+    "dim_payment_type": ("payment_type_id", "payment_type_key"),
+    "dim_transaction": ("transaction_id", "transaction_key"),
+}
+
+
+# Fact foreign keys resolved to surrogate keys by the loader:
+# {fact: [(natural id column, dim, surrogate key column on the fact)]}.
+# The FOREIGN KEY constraints stay on the natural ids (unknown ids are rejected,
+# there is no unknown-member row); the *_key columns are filled by merge loads only.
+FACT_DIMENSION_KEYS = {
+    "fact_sales_order": [
+        ("sales_staff_id", "dim_staff", "sales_staff_key"),
+        ("sales_counterparty_id", "dim_counterparty", "sales_counterparty_key"),
+        ("design_id", "dim_design", "design_key"),
+        ("currency_id", "dim_currency", "currency_key"),
+        ("agreed_delivery_location_id", "dim_location", "agreed_delivery_location_key"),
+    ],
+    "fact_purchase_order": [
+        ("staff_id", "dim_staff", "staff_key"),
+        ("counterparty_id", "dim_counterparty", "counterparty_key"),
+        ("currency_id", "dim_currency", "currency_key"),
+        ("agreed_delivery_location_id", "dim_location", "agreed_delivery_location_key"),
+    ],
+    "fact_payment": [
+        ("counterparty_id", "dim_counterparty", "counterparty_key"),
+        ("currency_id", "dim_currency", "currency_key"),
+        ("payment_type_id", "dim_payment_type", "payment_type_key"),
+    ],
+}
+
+
+# Primary key columns per table, used as the conflict target for merge loads.
+PRIMARY_KEYS = {
+    "dim_date": ["date_id"],
+    "dim_staff": ["staff_id"],
+    "dim_counterparty": ["counterparty_id"],
+    "dim_currency": ["currency_id"],
+    "dim_design": ["design_id"],
+    "dim_location": ["location_id"],
+    "dim_payment_type": ["payment_type_id"],
+    "dim_transaction": ["transaction_id"],
+    "fact_sales_order": ["sales_order_id", "created_date"],
+    "fact_purchase_order": ["purchase_record_id", "created_date"],
+    "fact_payment": ["payment_id", "payment_date"],
+}
+
+
+# Facts are range partitioned by month on this column: {table: column}.
+# The loader creates missing monthly partitions as rows for them arrive.
+PARTITION_KEYS = {
+    "fact_sales_order": "created_date",
+    "fact_purchase_order": "created_date",
+    "fact_payment": "payment_date",
+}
+
+
+# Fact load checkpoints, written in the same transaction as the loaded rows.
+CHECKPOINT_TABLE = "_load_checkpoints"
+
+CHECKPOINT_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS "{CHECKPOINT_TABLE}" (
+    table_name TEXT PRIMARY KEY,
+    checkpoint JSONB NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
@@ -0,0 +1,284 @@
+"""
+Time-windowed, parallel, resumable backfill / reprocessing of the warehouse.
+
+A date range is split into windows on the fact source tables' timestamp column
+(the column fetch_changes uses). The run has three kinds of steps:
+    1. "dimensions": every dimension except dim_date, built from the full source
+       tables and merged once, before any fact (facts reference them)
+    2. one step per window, in a pool of worker processes: fetch the window's
+       sales_order / purchase_order / payment rows, build the facts in memory
+       (see runner.py) and merge them into the warehouse
+    3. "dim_date": built from the distinct days every window reported, so its
+       date_ids are the same as a full build over the whole history
+
+Dimensions and facts are merged (upserts on the primary key), so windows can
+run in any order and a window that is run twice leaves the same rows: the
+result is what the incremental path produces for the same source data.
+fact_purchase_order has a generated key, so its re-loaded versions are deleted
+before they are inserted again (REPLACE_KEYS).
+Window loads hold a transaction-scoped advisory lock, so two windows never
+create or attach the same monthly fact partition at the same time; ingestion
+and transformation still run in parallel.
+
+The backfill is warehouse-only: it writes no landing or processed-zone objects
+and no ingestion or load checkpoints (its reads bypass them). The incremental
+pipeline therefore resumes from its own checkpoints afterwards and may load the
+backfilled rows again. A merging loader (fact_mode="merge", as runner.py uses)
+leaves the same rows, except fact_purchase_order: its generated key cannot be
+matched, so re-read purchase orders are inserted again (REPLACE_KEYS only
+applies here). With the append fact mode every re-read fact row is duplicated,
+so point the incremental checkpoints past the backfilled range first.
+
+Progress is a local JSON file rewritten after every step. A step is only
+recorded as done once its load has committed; re-running the same command
+skips done steps and retries the rest.
+
+Usage (from the repo root; DB_* and WAREHOUSE_* env vars as for runner.py):
+    PYTHONPATH=src python -m local_pipeline.backfill --start 2022-01-01 --end 2025-01-01 \\
+        --window-days 30 --workers 4 --progress backfill_progress.json
+"""
+
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from ingestion.ingest_service import IngestionService
+from loading.db_client_load import WarehouseDBClient
+from loading.load_service import LoadService
+from local_pipeline.runner import SKIP_TABLES, raw_frame
+from transformation.transform_service import FACT_SOURCE, OUTPUT_NAME, TransformService, build_dim_date
+
+logger = logging.getLogger()
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+
+# raw tables read per window, and the outputs built from them
+WINDOWED_TABLES = sorted(set(FACT_SOURCE.values()))
+
+DIMENSIONS_STEP = "dimensions"
+DIM_DATE_STEP = "dim_date"
+
+# built once from the full source tables; dim_date is built from the windows
+DIMENSION_OUTPUTS = [name for name in OUTPUT_NAME.values() if name.startswith("dim_") and name != DIM_DATE_STEP]
+
+# pg_advisory_xact_lock key taken by every backfill load
+BACKFILL_LOCK_ID = 804_050
+
+# Facts keyed by a warehouse-generated id (BIGSERIAL) cannot be merged: a load
+# first deletes the row versions it is about to insert again, matched on these columns
+REPLACE_KEYS = {"fact_purchase_order": ["purchase_order_id", "last_updated"]}
+
+
+def make_windows(start: datetime, end: datetime, days: int) -> List[Tuple[datetime, datetime]]:
+    # [start, end) cut into consecutive windows of `days` days; the last one may be shorter
+    if end <= start:
+        raise ValueError(f"Backfill end {end} must be after start {start}")
+    if days < 1:
+        raise ValueError(f"window days must be >= 1, got {days}")
+    windows = []
+    lower = start
+    while lower < end:
+        upper = min(lower + timedelta(days=days), end)
+        windows.append((lower, upper))
+        lower = upper
+    return windows
+
+
+def window_id(window: Tuple[datetime, datetime]) -> str:
+    return f"{window[0].isoformat()}/{window[1].isoformat()}"
+
+
+class BackfillProgress:
+    """
+    Per-step progress in a JSON file: {"steps": {step_id: {"status", ...}}}.
+    Written to a temp file and renamed, so a crash never leaves half a file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.steps = json.load(f).get("steps", {})
+            logger.info(f"Resuming backfill: {len(self.done())} steps already done in {path}")
+
+    def done(self) -> List[str]:
+        return [step for step, entry in self.steps.items() if entry.get("status") == "done"]
+
+    def is_done(self, step: str) -> bool:
+        return self.steps.get(step, {}).get("status") == "done"
+
+    def record(self, step: str, entry: Dict[str, Any]) -> None:
+        self.steps[step] = {**entry, "recorded_at": datetime.now(timezone.utc).isoformat()}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"steps": self.steps}, f, indent=2, default=str)
+        os.replace(tmp, self.path)
+
+
+def _load(frames: Dict[str, pd.DataFrame], insert_method: str) -> Dict[str, Any]:
+    # one transaction per step: committed (and only then recorded) or rolled back
+    with WarehouseDBClient() as db:
+        db.execute("SELECT pg_advisory_xact_lock(%s);", [BACKFILL_LOCK_ID])
+        service = LoadService(
+            processed_bucket=None,
+            db=db,
+            insert_method=insert_method,
+            dim_mode="merge",
+            fact_mode="merge",
+        )
+        _delete_reloaded_versions(service, frames)
+        return service.load_frames(frames)
+
+
+def _delete_reloaded_versions(service: LoadService, frames: Dict[str, pd.DataFrame]) -> None:
+    for table, key in REPLACE_KEYS.items():
+        df = frames.get(table)
+        if df is None or df.empty:
+            continue
+        service.ensure_schema()
+        staging = service._stage_df(table, df[key])
+        match = " AND ".join(f't."{col}" = s."{col}"' for col in key)
+        service.db.execute(f'DELETE FROM "{table}" AS t USING "{staging}" AS s WHERE {match};')
+
+
+def _loaded_rows(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {entry["table"]: entry.get("rows", 0) for entry in result["tables"]}
+
+
+def load_dimensions(insert_method: str) -> Dict[str, Any]:
+    ingestion = IngestionService(bucket=None)
+    try:
+        tables = [t for t in ingestion.db.list_tables() if t not in SKIP_TABLES and t not in WINDOWED_TABLES]
+        frames = {}
+        for table in tables:
+            extracted = ingestion.extract_table(table)
+            frames[table] = raw_frame(extracted["rows"], extracted["columns"])
+    finally:
+        ingestion.close()
+
+    outputs = TransformService(None, None, mode="full").build_outputs(frames, names=DIMENSION_OUTPUTS)
+    return {"loaded": _loaded_rows(_load(outputs, insert_method))}
+
+
+def run_window(start: str, end: str, insert_method: str) -> Dict[str, Any]:
+    """
+    Worker: ingests, transforms and loads the fact rows of one window.
+    Returns the rows per output and the distinct days seen (for dim_date).
+    """
+    window = (datetime.fromisoformat(start), datetime.fromisoformat(end))
+    ingestion = IngestionService(bucket=None)
+    try:
+        frames = {}
+        for table in WINDOWED_TABLES:
+            extracted = ingestion.extract_table(table, window=window)
+            frames[table] = raw_frame(extracted["rows"], extracted["columns"])
+    finally:
+        ingestion.close()
+
+    transform = TransformService(None, None, mode="full")
+    # a fact whose source has no rows in this window has nothing to build
+    names = [OUTPUT_NAME[method] for method, source in FACT_SOURCE.items() if not frames[source].empty]
+    outputs = transform.build_outputs(frames, names=names) if names else {}
+    days = transform.source_dates().sort_values()
+
+    loaded = _load(outputs, insert_method) if outputs else {"tables": []}
+    return {
+        "source_rows": {table: len(df) for table, df in frames.items()},
+        "loaded": _loaded_rows(loaded),
+        "days": [day.date().isoformat() for day in days],
+    }
+
+
+def load_dim_date(days: List[str], insert_method: str) -> Dict[str, Any]:
+    dim_date = build_dim_date(pd.to_datetime(pd.Series(sorted(set(days))), utc=True))
+    return {"loaded": _loaded_rows(_load({DIM_DATE_STEP: dim_date}, insert_method))}
+
+
+def run_backfill(
+    start: datetime,
+    end: datetime,
+    window_days: int = 30,
+    workers: int = 4,
+    progress_path: str = "backfill_progress.json",
+    insert_method: str = "copy",
+) -> Dict[str, Any]:
+    """
+    Backfills [start, end) window by window; see the module docstring.
+    Returns {"windows", "ran", "skipped", "failed"}; failed windows are left for
+    the next run of the same command.
+    """
+    progress = BackfillProgress(progress_path)
+    windows = make_windows(start, end, window_days)
+    ran: List[str] = []
+    failed: List[str] = []
+
+    if not progress.is_done(DIMENSIONS_STEP):
+        logger.info("Backfill: loading dimensions")
+        progress.record(DIMENSIONS_STEP, {"status": "done", **load_dimensions(insert_method)})
+        ran.append(DIMENSIONS_STEP)
+
+    pending = [window for window in windows if not progress.is_done(window_id(window))]
+    logger.info(f"Backfill: {len(pending)} of {len(windows)} windows to run with {workers} workers")
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(run_window, lower.isoformat(), upper.isoformat(), insert_method): window_id((lower, upper))
+            for lower, upper in pending
+        }
+        for future in as_completed(futures):
+            step = futures[future]
+            try:
+                progress.record(step, {"status": "done", **future.result()})
+                ran.append(step)
+                logger.info(f"Backfill window {step} done")
+            except Exception as e:
+                logger.exception(f"Backfill window {step} failed")
+                progress.record(step, {"status": "error", "error": str(e)})
+                failed.append(step)
+
+    if not failed and (ran or not progress.is_done(DIM_DATE_STEP)):
+        # every window has reported its days: build dim_date once over all of them
+        # (including windows of earlier runs recorded in the same progress file)
+        days = [day for entry in progress.steps.values() for day in entry.get("days", [])]
+        progress.record(DIM_DATE_STEP, {"status": "done", **load_dim_date(days, insert_method)})
+        ran.append(DIM_DATE_STEP)
+
+    skipped = [step for step in progress.done() if step not in ran]
+    return {"windows": len(windows), "ran": ran, "skipped": skipped, "failed": failed}
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Backfill the warehouse window by window")
+    parser.add_argument("--start", type=_parse_date, required=True, help="first timestamp (inclusive), ISO format")
+    parser.add_argument("--end", type=_parse_date, default=datetime.now(), help="last timestamp (exclusive)")
+    parser.add_argument("--window-days", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=4, help="worker processes")
+    parser.add_argument("--progress", default="backfill_progress.json", help="progress file; reused to resume")
+    parser.add_argument("--insert-method", default="copy")
+    args = parser.parse_args(argv)
+
+    summary = run_backfill(
+        start=args.start,
+        end=args.end,
+        window_days=args.window_days,
+        workers=args.workers,
+        progress_path=args.progress,
+        insert_method=args.insert_method,
+    )
+    print(json.dumps(summary, indent=2))
+    if summary["failed"]:
+        raise SystemExit(f"{len(summary['failed'])} windows failed; re-run the same command to resume")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Runs ingestion -> transformation -> loading in one process, for backfills and
+full warehouse rebuilds.
+
+Instead of three Lambdas chained by S3 notifications, the stages hand frames to
+each other in memory:
+    - ingestion fetches every row of each source table (checkpoints are ignored)
+    - the rows become raw DataFrames with the same columns and value types the
+      transform would read back from the landing JSON
+    - TransformService.build_outputs builds and validates every output
+    - LoadService.load_frames loads them in foreign key order, in one transaction
+
+With --persist the artifacts are still written as the Lambdas write them: raw JSON
+and ingestion checkpoints to the landing bucket, parquet to the processed bucket,
+and the written fact keys are recorded in the load checkpoints so the
+S3-triggered loader does not load them a second time.
+
+Connections come from the usual env vars (DB_* for the source, WAREHOUSE_* for
+the warehouse). Usage (from the repo root):
+    PYTHONPATH=src python -m local_pipeline.runner --dim-mode merge --fact-mode merge
+    PYTHONPATH=src python -m local_pipeline.runner --persist \\
+        --landing-bucket <landing> --processed-bucket <processed>
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from ingestion.ingest_service import IngestionService
+from loading.db_client_load import WarehouseDBClient
+from loading.load_service import LoadService
+from observability.tracing import InMemorySink, invocation
+from transformation.transform_service import TransformService
+
+logger = logging.getLogger()
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+
+# source tables that are never ingested
+SKIP_TABLES = ("_prisma_migrations",)
+
+_JSON_NATIVE = (str, int, float, bool, list, dict)
+
+
+def _json_value(value: Any) -> Any:
+    # what json.dumps(default=str) followed by json.loads gives back
+    return value if value is None or isinstance(value, _JSON_NATIVE) else str(value)
+
+
+def raw_frame(rows: List[Dict[str, Any]], columns: List[str]) -> pd.DataFrame:
+    """
+    Builds the DataFrame the transform would get from S3TransformationClient.read_table:
+    datetimes, dates and decimals become the strings written to the landing JSON,
+    so the builders see identical values on both paths. Column by column, and only
+    columns holding non-JSON values are converted.
+    """
+    data = {}
+    for col in columns:
+        values = [row.get(col) for row in rows]
+        sample = next((v for v in values if v is not None), None)
+        if sample is not None and not isinstance(sample, _JSON_NATIVE):
+            values = [_json_value(v) for v in values]
+        data[col] = values
+    return pd.DataFrame(data, columns=columns)
+
+
+def _timed(stages: Dict[str, float], name: str, fn):
+    start = time.perf_counter()
+    try:
+        return fn()
+    finally:
+        stages[name] = round(time.perf_counter() - start, 3)
+
+
+def run_local_pipeline(
+    tables: Optional[List[str]] = None,
+    persist: bool = False,
+    landing_bucket: Optional[str] = None,
+    processed_bucket: Optional[str] = None,
+    dim_mode: str = "merge",
+    fact_mode: str = "merge",
+    insert_method: str = "copy",
+) -> Dict[str, Any]:
+    """
+    Rebuilds the warehouse from the source database in this process.
+    tables: source tables to ingest (default: every table in the source schema).
+    Returns per-stage seconds, per-table row counts, the validation report of each
+    output, the load result and the total time spent in each span (db_fetch,
+    make_*, insert, ...).
+    """
+    if persist and not (landing_bucket and processed_bucket):
+        raise ValueError("persist=True needs landing_bucket and processed_bucket")
+
+    stages: Dict[str, float] = {}
+    sink = InMemorySink()
+    with invocation("local_pipeline", sink=sink):
+        ingestion = IngestionService(bucket=landing_bucket)
+        try:
+            source_tables = [t for t in (tables or ingestion.db.list_tables()) if t not in SKIP_TABLES]
+
+            def ingest() -> Dict[str, pd.DataFrame]:
+                frames = {}
+                for table in source_tables:
+                    extracted = ingestion.extract_table(table, persist=persist)
+                    frames[table] = raw_frame(extracted["rows"], extracted["columns"])
+                return frames
+
+            frames = _timed(stages, "ingest", ingest)
+        finally:
+            ingestion.close()
+
+        transform = TransformService(ingest_bucket=landing_bucket, processed_bucket=processed_bucket, mode="full")
+        outputs = _timed(stages, "transform", lambda: transform.build_outputs(frames))
+        written = _timed(stages, "write", lambda: transform.write_outputs(outputs)) if persist else {}
+
+        def load() -> Dict[str, Any]:
+            with WarehouseDBClient() as db:
+                service = LoadService(
+                    processed_bucket=processed_bucket,
+                    db=db,
+                    insert_method=insert_method,
+                    dim_mode=dim_mode,
+                    fact_mode=fact_mode,
+                    # dim_mode="swap" swaps each dim on its own connection
+                    db_factory=WarehouseDBClient,
+                )
+                s3_keys = {name: entry["s3_keys"] for name, entry in written.items()}
+                return service.load_frames(outputs, s3_keys=s3_keys)
+
+        loaded = _timed(stages, "load", load)
+
+    span_seconds: Dict[str, float] = {}
+    for span in sink.spans:
+        span_seconds[span.name] = round(span_seconds.get(span.name, 0.0) + span.seconds, 3)
+
+    return {
+        "stages": stages,
+        "source_rows": {table: len(df) for table, df in frames.items()},
+        "output_rows": {name: len(df) for name, df in outputs.items()},
+        "validation": transform.output_validation,
+        "persisted": {name: entry["s3_keys"] for name, entry in written.items()},
+        "load": loaded,
+        "spans": span_seconds,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run ingest -> transform -> load in one process")
+    parser.add_argument("--tables", nargs="+", help="source tables to ingest (default: all)")
+    parser.add_argument("--persist", action="store_true", help="also write raw JSON / parquet / checkpoints to S3")
+    parser.add_argument("--landing-bucket", default=os.getenv("LANDING_BUCKET_NAME"))
+    parser.add_argument("--processed-bucket", default=os.getenv("PROCESSED_BUCKET_NAME"))
+    parser.add_argument("--dim-mode", default="merge")
+    parser.add_argument("--fact-mode", default="merge")
+    parser.add_argument("--insert-method", default="copy")
+    parser.add_argument("--json", help="also write the run summary to this JSON file")
+    args = parser.parse_args(argv)
+
+    summary = run_local_pipeline(
+        tables=args.tables,
+        persist=args.persist,
+        landing_bucket=args.landing_bucket,
+        processed_bucket=args.processed_bucket,
+        dim_mode=args.dim_mode,
+        fact_mode=args.fact_mode,
+        insert_method=args.insert_method,
+    )
+    passed = {name: report["passed"] for name, report in summary["validation"].items()}
+    print(json.dumps({**{key: summary[key] for key in ("stages", "output_rows", "spans")}, "validation": passed}, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
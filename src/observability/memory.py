@@ -0,0 +1,195 @@
+"""
+Opt-in memory high-water marks per table and stage.
+
+Enabled with the MEMORY_PROFILE env var:
+    - unset / "0" / "off": nothing is measured, track() yields an empty dict
+    - "rss":         peak resident memory of the process while the block ran
+    - "tracemalloc": also the Python allocation peak and the top allocating lines
+                     (MEMORY_PROFILE_TOP, default 5); noticeably slower
+
+track(stage, table) fills the dict it yields when the block ends; callers put it
+in their result dicts as "memory". Every measurement is also logged as one
+CloudWatch EMF line (PeakRSS, RSSDelta in MB, dimensioned by Stage and Table), so
+lambda_memory_size can be sized from the per-table peaks.
+
+Peak RSS is reset at the start of each block on Linux (/proc/self/clear_refs), so
+it is the peak of that block; elsewhere it is the process-lifetime peak. Blocks
+nest (ingest_all_tables -> per table, load run -> per table): before a reset the
+peak so far is carried into every open block, so an outer block still reports
+the peak over its whole span. The tracemalloc peak is carried the same way.
+Memory is per process: with parallel loader workers the blocks overlap.
+"""
+
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from observability.tracing import DEFAULT_NAMESPACE
+
+logger = logging.getLogger()
+
+MODES = ("rss", "tracemalloc")
+DEFAULT_TOP = 5
+
+_MB = 1024 * 1024
+
+# peaks carried over resets, one entry per open track() block (any thread)
+_open_blocks: List[Dict[str, float]] = []
+_open_blocks_lock = threading.Lock()
+
+
+def profile_mode() -> Optional[str]:
+    mode = os.getenv("MEMORY_PROFILE", "").strip().lower()
+    if mode in ("", "0", "off", "false"):
+        return None
+    if mode not in MODES:
+        logger.warning(f"Unknown MEMORY_PROFILE={mode!r}; expected one of {MODES}. Using 'rss'")
+        return "rss"
+    return mode
+
+
+def _read_status_kb(field: str) -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    # Linux: writing 5 to clear_refs resets VmHWM to the current RSS
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def current_rss_mb() -> Optional[float]:
+    kb = _read_status_kb("VmRSS")
+    return round(kb / 1024, 1) if kb is not None else None
+
+
+def peak_rss_mb() -> float:
+    kb = _read_status_kb("VmHWM")
+    if kb is not None:
+        return round(kb / 1024, 1)
+    # process-lifetime peak elsewhere (kB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (_MB if sys.platform == "darwin" else 1024), 1)
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    return [
+        {
+            "where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_mb": round(stat.size / _MB, 2),
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+def emit_metrics(stage: str, table: str, stats: Dict[str, Any], stream=None) -> None:
+    metrics = [{"Name": "PeakRSS", "Unit": "Megabytes"}]
+    document: Dict[str, Any] = {"Stage": stage, "Table": table, "PeakRSS": stats["peak_rss_mb"]}
+    if stats.get("rss_delta_mb") is not None:
+        metrics.append({"Name": "RSSDelta", "Unit": "Megabytes"})
+        document["RSSDelta"] = stats["rss_delta_mb"]
+    if "traced_peak_mb" in stats:
+        metrics.append({"Name": "TracedPeak", "Unit": "Megabytes"})
+        document["TracedPeak"] = stats["traced_peak_mb"]
+    document["_aws"] = {
+        "Timestamp": int(time.time() * 1000),
+        "CloudWatchMetrics": [
+            {
+                "Namespace": os.getenv("METRICS_NAMESPACE", DEFAULT_NAMESPACE),
+                "Dimensions": [["Stage", "Table"]],
+                "Metrics": metrics,
+            }
+        ],
+    }
+    stream = stream or sys.stdout
+    stream.write(json.dumps(document, default=str) + "\n")
+    stream.flush()
+
+
+def _open_block(tracing: bool) -> Dict[str, float]:
+    # Carry the peaks so far into the open blocks, then reset them for the new one.
+    with _open_blocks_lock:
+        rss_peak = peak_rss_mb()
+        traced_peak = tracemalloc.get_traced_memory()[1] if tracing else 0
+        for block in _open_blocks:
+            block["rss"] = max(block["rss"], rss_peak)
+            block["traced"] = max(block["traced"], traced_peak)
+        reset_peak_rss()
+        if tracing:
+            tracemalloc.reset_peak()
+        block = {"rss": 0.0, "traced": 0}
+        _open_blocks.append(block)
+        return block
+
+
+def _close_block(block: Dict[str, float], tracing: bool) -> Tuple[float, int]:
+    # Returns (peak RSS MB, traced peak bytes) over the block, including nested resets.
+    with _open_blocks_lock:
+        _open_blocks.remove(block)
+        traced_peak = tracemalloc.get_traced_memory()[1] if tracing else 0
+        return max(block["rss"], peak_rss_mb()), max(block["traced"], traced_peak)
+
+
+@contextmanager
+def track(stage: str, table: str) -> Iterator[Dict[str, Any]]:
+    """
+    Measures memory around the block when MEMORY_PROFILE is set. Yields a dict
+    that is filled (peak_rss_mb, rss_delta_mb, and with tracemalloc traced_peak_mb
+    and top_allocations) when the block ends, even if it raises.
+    """
+    stats: Dict[str, Any] = {}
+    mode = profile_mode()
+    if mode is None:
+        yield stats
+        return
+
+    started_tracing = False
+    if mode == "tracemalloc" and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracing = True
+    block = _open_block(tracing=mode == "tracemalloc")
+    rss_start = current_rss_mb()
+
+    try:
+        yield stats
+    finally:
+        try:
+            rss_peak, traced_peak = _close_block(block, tracing=mode == "tracemalloc")
+            if mode == "tracemalloc":
+                stats["traced_peak_mb"] = round(traced_peak / _MB, 2)
+                stats["top_allocations"] = _top_allocations(
+                    tracemalloc.take_snapshot(), int(os.getenv("MEMORY_PROFILE_TOP", DEFAULT_TOP))
+                )
+                if started_tracing:
+                    tracemalloc.stop()
+
+            rss_end = current_rss_mb()
+            stats["peak_rss_mb"] = rss_peak
+            stats["rss_delta_mb"] = (
+                round(rss_end - rss_start, 1) if rss_start is not None and rss_end is not None else None
+            )
+            logger.info(f"Memory {stage}/{table}: peak_rss_mb={stats['peak_rss_mb']} delta={stats['rss_delta_mb']}")
+            emit_metrics(stage, table, stats)
+        except Exception:
+            # profiling must never fail the stage
+            logger.exception(f"Failed to record memory for {stage}/{table}")
@@ -0,0 +1,181 @@
+"""
+Per-invocation span timings for the pipeline Lambdas.
+
+Code wraps the steps worth timing (DB fetch, S3 get/put, parquet encode/decode,
+make_* builders, DDL, inserts, checkpoint I/O) in span("name"). A Lambda handler
+runs its body inside invocation("<stage>"); at the end of the invocation the
+recorded spans are aggregated per name and handed to a sink:
+    - EMFSink (default): one CloudWatch Embedded Metric Format document per span
+      name, printed to stdout, so CloudWatch Logs turns it into metrics
+    - InMemorySink: keeps the raw spans, for tests and local runs
+
+Outside invocation() span() only times nothing and records nothing.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger()
+
+DEFAULT_NAMESPACE = "ETLPipeline"
+
+# EMF allows at most 100 values per metric in one document
+EMF_MAX_VALUES = 100
+
+
+@dataclass
+class Span:
+    name: str
+    seconds: float
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: bool = False
+
+
+class InMemorySink:
+    """
+    Collects every emitted invocation: [(service, spans)].
+    """
+
+    def __init__(self):
+        self.invocations: List[tuple[str, List[Span]]] = []
+
+    def emit(self, service: str, spans: List[Span], dimensions: Dict[str, str]) -> None:
+        self.invocations.append((service, list(spans)))
+
+    @property
+    def spans(self) -> List[Span]:
+        return [span for _, spans in self.invocations for span in spans]
+
+    def names(self) -> List[str]:
+        return [span.name for span in self.spans]
+
+
+class EMFSink:
+    """
+    Writes one EMF JSON line per span name: Duration (ms, one value per call up to
+    EMF_MAX_VALUES) and Calls / Errors counts, dimensioned by Service and Span.
+    """
+
+    def __init__(self, namespace: Optional[str] = None, stream=None):
+        self.namespace = namespace or os.getenv("METRICS_NAMESPACE", DEFAULT_NAMESPACE)
+        self.stream = stream
+
+    def emit(self, service: str, spans: List[Span], dimensions: Dict[str, str]) -> None:
+        stream = self.stream or sys.stdout
+        for document in self.documents(service, spans, dimensions):
+            stream.write(json.dumps(document, default=str) + "\n")
+        stream.flush()
+
+    def documents(self, service: str, spans: List[Span], dimensions: Dict[str, str]) -> List[Dict[str, Any]]:
+        by_name: Dict[str, List[Span]] = {}
+        for span in spans:
+            by_name.setdefault(span.name, []).append(span)
+
+        timestamp = int(time.time() * 1000)
+        documents = []
+        for name, calls in by_name.items():
+            durations = [round(span.seconds * 1000, 3) for span in calls]
+            if len(durations) > EMF_MAX_VALUES:
+                # keep the total exact: fold the tail into the last value
+                durations = durations[: EMF_MAX_VALUES - 1] + [round(sum(durations[EMF_MAX_VALUES - 1:]), 3)]
+            documents.append(
+                {
+                    "_aws": {
+                        "Timestamp": timestamp,
+                        "CloudWatchMetrics": [
+                            {
+                                "Namespace": self.namespace,
+                                "Dimensions": [["Service", "Span"]],
+                                "Metrics": [
+                                    {"Name": "Duration", "Unit": "Milliseconds"},
+                                    {"Name": "Calls", "Unit": "Count"},
+                                    {"Name": "Errors", "Unit": "Count"},
+                                ],
+                            }
+                        ],
+                    },
+                    "Service": service,
+                    "Span": name,
+                    "Duration": durations,
+                    "Calls": len(calls),
+                    "Errors": sum(1 for span in calls if span.error),
+                    **dimensions,
+                }
+            )
+        return documents
+
+
+class Tracer:
+    """
+    Span buffer for one invocation. Thread safe: parallel loader workers record
+    into the same tracer.
+    """
+
+    def __init__(self, service: str, sink=None):
+        self.service = service
+        self.sink = sink if sink is not None else EMFSink()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def flush(self, **dimensions: str) -> None:
+        with self._lock:
+            spans, self.spans = self.spans, []
+        if not spans:
+            return
+        try:
+            self.sink.emit(self.service, spans, dimensions)
+        except Exception:
+            # metrics must never fail the invocation
+            logger.exception("Failed to emit span metrics")
+
+
+_current: Optional[Tracer] = None
+
+
+@contextmanager
+def invocation(service: str, sink=None, **dimensions: str) -> Iterator[Tracer]:
+    """
+    Records the spans of one Lambda invocation and emits them when it ends,
+    whether the body returns or raises.
+    """
+    global _current
+    previous, _current = _current, Tracer(service, sink)
+    tracer = _current
+    try:
+        yield tracer
+    finally:
+        _current = previous
+        tracer.flush(**dimensions)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Times the block as a span. Yields the attribute dict so the block can add to
+    it (e.g. rows=len(df)) once the numbers are known.
+    """
+    tracer = _current
+    if tracer is None:
+        yield attributes
+        return
+
+    start = time.perf_counter()
+    error = False
+    try:
+        yield attributes
+    except BaseException:
+        error = True
+        raise
+    finally:
+        tracer.record(Span(name, time.perf_counter() - start, attributes, error))
@@ -3,13 +3,21 @@ import json
 import logging
 # import pandas
 from transformation.transform_service import TransformService
-import urllib.parse
+from observability.tracing import invocation
+from common.s3_events import extract_s3_records
 
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+
 def lambda_handler(event, context):
+    # span timings are emitted as CloudWatch EMF when the invocation ends
+    with invocation("transformation"):
+        return _handle(event, context)
+
+
+def _handle(event, context):
     logger.info(f"Transformation Lambda triggered with event={event}")
 
     try:
@@ -19,46 +27,74 @@ def lambda_handler(event, context):
 
         if not landing_bucket or not processed_bucket:
             raise ValueError("Missing LANDING_BUCKET or PROCESSED_BUCKET env vars")
-        
+
         # Extract S3 event info
         records = event.get("Records")
         if not records:
             raise ValueError("No Records found in event")
-        
-        
-        raw_key = records[0].get("s3", {}).get("object", {}).get("key")
 
-        if not raw_key:
+        s3_records = extract_s3_records(event)
+
+        if not s3_records:
             raise ValueError("No S3 object key found in event")
-        
-        source_key = urllib.parse.unquote_plus(raw_key)
 
-        if source_key.startswith("checkpoint/"):
-            logger.info (f"Skipping checkpoint file{source_key}")
+        # Coalesce: one transform per table, however many raw files arrived for it
+        tables: dict[str, list[str | None]] = {}
+        skipped = []
+        for source_key, message_id in s3_records:
+            if source_key.startswith("checkpoint"):
+                logger.info (f"Skipping checkpoint file{source_key}")
+                skipped.append(source_key)
+                continue
+            tables.setdefault(source_key.split("/")[0], []).append(message_id)
+
+        if not tables:
             return {
                 "statusCode": 200,
-                "body": json.dumps({"status": "skipped", "reason": "checkpoint", "key":source_key}),
+                "body": json.dumps({"status": "skipped", "reason": "checkpoint", "keys": skipped}),
             }
-    
-        table_name = source_key.split("/")[0]
 
-        logger.info(f"Detected table '{table_name}' from S3 key '{source_key}'")
+        coalesced = len(s3_records) - len(skipped) - len(tables)
+        logger.info(f"Detected tables {list(tables)} from {len(s3_records)} S3 records ({coalesced} coalesced)")
 
         service = TransformService(
             ingest_bucket=landing_bucket,
             processed_bucket=processed_bucket
         )
 
-        result = service.run_single_table(table_name)
+        results = {}
+        failed_messages = []
+        for table_name, message_ids in tables.items():
+            try:
+                results[table_name] = service.run_single_table(table_name)
+            except Exception as e:
+                logger.exception(f"Transformation failed for table '{table_name}'")
+                results[table_name] = {"table": table_name, "status": "error", "error": str(e)}
+                failed_messages.extend(m for m in message_ids if m)
 
+        failed = [t for t, r in results.items() if r.get("status") == "error"]
+        result = {
+            "status": "partial_failure" if failed else "success",
+            "records": len(s3_records),
+            "skipped": len(skipped),
+            "coalesced": coalesced,
+            "tables": results,
+        }
         logger.info(f"Transformation result: {result}")
 
-        return {
-            "statusCode": 200, 
-            "body": json.dumps(result)}
+        response = {
+            "statusCode": 500 if failed else 200,
+            "body": json.dumps(result, default=str)}
+        if failed_messages:
+            # SQS ReportBatchItemFailures: only the failed tables' messages are retried
+            response["batchItemFailures"] = [{"itemIdentifier": m} for m in dict.fromkeys(failed_messages)]
+        return response
 
     except Exception as e:
         logger.exception("Transformation Lambda failed")
+        if any(r.get("eventSource") == "aws:sqs" for r in event.get("Records") or []):
+            # let SQS retry the whole batch instead of dropping it
+            raise
 
         return {
             "statusCode": 500,
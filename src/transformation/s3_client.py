@@ -1,4 +1,5 @@
 import json
+import hashlib
 import boto3
 import pandas as pd
 from uuid import uuid4
@@ -6,9 +7,28 @@ from io import BytesIO
 from datetime import datetime, timezone
 import logging
 
+from observability.tracing import span
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Hive default partition name (same as Spark/Athena) for rows with no partition date
+DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Parquet writer settings used when no per-table profile is given (pyarrow defaults)
+DEFAULT_STORAGE_PROFILE = {
+    "compression": "snappy",
+    "compression_level": None,
+    "row_group_size": None,
+    "use_dictionary": True,
+    "sort_by": None,
+    "write_statistics": True,
+    "write_page_index": False,
+}
+
+# Per-table output index read by the loading stage instead of listing the table prefix
+INDEX_PREFIX = "_index"
+
 class S3TransformationClient:
     def __init__(self, bucket: str):
         self.bucket = bucket
@@ -17,42 +37,251 @@ class S3TransformationClient:
 
     def read_json(self, key: str):
         logger.info(f"Reading raw JSON from s3://{self.bucket}/{key}")
-        obj = self.s3.get_object(Bucket=self.bucket, Key=key)
-        raw_data = obj["Body"].read().decode("utf-8")
-        return json.loads(raw_data)
+        with span("s3_get") as attrs:
+            obj = self.s3.get_object(Bucket=self.bucket, Key=key)
+            raw_data = obj["Body"].read().decode("utf-8")
+            attrs["bytes"] = len(raw_data)
+        with span("json_deserialize"):
+            return json.loads(raw_data)
 
     def read_table(self, table_name: str) -> pd.DataFrame:
         """
         Reads ALL raw_*.json files for a table and returns a DataFrame.
         """
-        prefix = f"{table_name}/"
-        response = self.s3.list_objects_v2(
-            Bucket=self.bucket,
-            Prefix=prefix,
-        )
-        if "Contents" not in response:
+        keys = self.list_raw_keys(table_name)
+        if not keys:
             raise FileNotFoundError(f"No raw data for table '{table_name}'")
+        df = self.read_keys(keys)
+        if df.empty:
+            raise ValueError(f"No rows found for table '{table_name}'")
+        return df
+
+    def list_raw_keys(self, table_name: str, start_after: str | None = None) -> list[str]:
+        """
+        Lists raw JSON keys for a table in key order (raw_<timestamp>.json sorts by time).
+        start_after skips everything up to and including that key.
+        """
+        params = {"Bucket": self.bucket, "Prefix": f"{table_name}/"}
+        if start_after:
+            params["StartAfter"] = start_after
+        paginator = self.s3.get_paginator("list_objects_v2")
+        keys = []
+        for page in paginator.paginate(**params):
+            keys.extend(obj["Key"] for obj in page.get("Contents", []) if obj["Key"].endswith(".json"))
+        return sorted(keys)
+
+    def read_parquet(self, key: str) -> pd.DataFrame:
+        logger.info(f"Reading parquet from s3://{self.bucket}/{key}")
+        with span("s3_get") as attrs:
+            body = self.s3.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+            attrs["bytes"] = len(body)
+        with span("parquet_decode"):
+            return pd.read_parquet(BytesIO(body))
+
+    def read_latest_output(self, table_name: str) -> pd.DataFrame | None:
+        """
+        The newest snapshot of a single-file output (a dim), or None if none was written yet.
+        """
+        keys = self.read_index(table_name)
+        if keys is None:
+            keys = self._list_output_keys(table_name)
+        return self.read_parquet(keys[-1]) if keys else None
+
+    def read_keys(self, keys: list[str]) -> pd.DataFrame:
         rows: list[dict] = []
-        for obj in response["Contents"]:
-            key = obj["Key"]
-            if not key.endswith(".json"):
-                continue
+        for key in keys:
             rows.extend(self.read_json(key))
-        if not rows:
-            raise ValueError(f"No rows found for table '{table_name}'")
         return pd.DataFrame(rows)
 
-   
+    def read_state(self, name: str) -> dict:
+        """
+        Reads _transform_state/<name>.json, or {} if it does not exist yet.
+        """
+        key = f"_transform_state/{name}.json"
+        try:
+            return self.read_json(key)
+        except self.s3.exceptions.NoSuchKey:
+            logger.info(f"No transform state at s3://{self.bucket}/{key}")
+            return {}
+
+    def write_state(self, name: str, payload: dict):
+        key = f"_transform_state/{name}.json"
+        self._put_json(key, payload)
+        return key
+
+    def write_manifest(self, run_name: str, payload: dict):
+        key = f"_transform_runs/{run_name}.json"
+        self._put_json(key, payload)
+        logger.info(f"Run manifest written → s3://{self.bucket}/{key}")
+        return key
 
+    def _put_json(self, key: str, payload: dict):
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=json.dumps(payload, default=str),
+            ContentType="application/json",
+        )
 
-    def write_parquet(self, table_name: str, df: pd.DataFrame):
+    def read_index(self, table_name: str) -> list[str] | None:
+        """
+        Output keys of a table in write order, from _index/<table>.json (None if missing).
+        """
+        try:
+            return self.read_json(f"{INDEX_PREFIX}/{table_name}.json").get("keys", [])
+        except self.s3.exceptions.NoSuchKey:
+            return None
+
+    def update_index(self, table_name: str, added: list[str], removed: list[str] | None = None):
+        """
+        Appends the keys written by this run to the table's index and drops deleted ones,
+        so the loader finds the current outputs with one GET instead of a full listing.
+        A missing index is seeded from a listing of the table prefix (one-off repair).
+        """
+        if not added and not removed:
+            return None
+        keys = self.read_index(table_name)
+        if keys is None:
+            keys = self._list_output_keys(table_name)
+        dropped = set(removed or []) | set(added)
+        keys = [key for key in keys if key not in dropped] + list(added)
+        key = f"{INDEX_PREFIX}/{table_name}.json"
+        self._put_json(key, {
+            "table": table_name,
+            "keys": keys,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        })
+        return key
+
+    def write_parquet(self, table_name: str, df: pd.DataFrame, profile: dict | None = None):
         timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H-%M-%S")
         run_id= uuid4().hex
         key = f"{table_name}/processed_{timestamp}_{run_id}.parquet"
         # key = f"{table_name}/latest.parquet"
-        buffer = BytesIO()
-        df.to_parquet(buffer, index=False)
-        buffer.seek(0)
-        self.s3.put_object(Bucket=self.bucket, Key=key, Body=buffer.read())
+        body = self._to_parquet_bytes(df, profile)
+        with span("s3_put", table=table_name, bytes=len(body)):
+            self.s3.put_object(Bucket=self.bucket, Key=key, Body=body)
+        self.update_index(table_name, [key])
         logger.info(f"Parquet written → s3://{self.bucket}/{key}")
         return key
+
+    def write_partitioned_parquet(
+        self,
+        table_name: str,
+        df: pd.DataFrame,
+        partition_col: str,
+        profile: dict | None = None,
+        delta: bool = False,
+    ) -> list[str]:
+        """
+        Writes df as Hive-style date partitions:
+            <table>/year=YYYY/month=MM/day=DD/processed_<ts>_<run_id>.parquet
+
+        A partition is only rewritten when its content changed: the new parquet bytes
+        are compared (MD5) with the ETag of the single file already in that partition.
+        The swap is ordered so a reader never sees a partition without data: all new
+        files are put first, then the table index (_index/<table>.json) is switched to
+        them in one update, and only then are the replaced files deleted, together with
+        partitions that no longer receive any rows. Returns the keys written in this run.
+
+        delta=True appends delta_<ts>_<run_id>.parquet files next to the existing ones
+        instead (df only holds new rows, nothing is compared or deleted).
+        """
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H-%M-%S")
+        run_id = uuid4().hex
+        file_prefix = "delta" if delta else "processed"
+        existing = {} if delta else self._list_partition_objects(table_name)
+
+        dates = pd.to_datetime(df[partition_col], format="mixed", errors="coerce")
+        partition_paths = dates.dt.strftime("year=%Y/month=%m/day=%d").fillna(f"year={DEFAULT_PARTITION}")
+
+        written: list[str] = []
+        deleted: list[str] = []
+        unchanged = 0
+        for path, part in df.groupby(partition_paths, sort=True):
+            body = self._to_parquet_bytes(part.reset_index(drop=True), profile)
+            current = existing.get(path, [])
+            if len(current) == 1 and current[0]["ETag"].strip('"') == hashlib.md5(body, usedforsecurity=False).hexdigest():
+                unchanged += 1
+                continue
+
+            key = f"{table_name}/{path}/{file_prefix}_{timestamp}_{run_id}.parquet"
+            with span("s3_put", table=table_name, bytes=len(body)):
+                self.s3.put_object(Bucket=self.bucket, Key=key, Body=body)
+            written.append(key)
+            deleted.extend(obj["Key"] for obj in current)
+
+        # partitions without rows in this run are stale (full rewrite only)
+        for path in set(existing) - set(partition_paths.unique()):
+            deleted.extend(obj["Key"] for obj in existing[path])
+
+        self.update_index(table_name, written, deleted)
+        for key in deleted:
+            self.s3.delete_object(Bucket=self.bucket, Key=key)
+
+        logger.info(
+            f"Partitioned parquet for {table_name} by {partition_col}: "
+            f"{len(written)} partitions written, {unchanged} unchanged, "
+            f"{len(deleted)} files deleted → s3://{self.bucket}/{table_name}/"
+        )
+        return written
+
+    def _list_output_keys(self, table_name: str) -> list[str]:
+        """
+        Parquet keys under <table>/, oldest first (LastModified).
+        """
+        paginator = self.s3.get_paginator("list_objects_v2")
+        objects = []
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{table_name}/"):
+            objects.extend(obj for obj in page.get("Contents", []) if obj["Key"].endswith(".parquet"))
+        logger.info(f"Seeding output index for {table_name} from {len(objects)} listed objects")
+        return [obj["Key"] for obj in sorted(objects, key=lambda obj: obj["LastModified"])]
+
+    def _list_partition_objects(self, table_name: str) -> dict[str, list[dict]]:
+        """
+        Returns {"year=YYYY/month=MM/day=DD": [object, ...]} for the existing partition files of a table.
+        """
+        prefix = f"{table_name}/year="
+        paginator = self.s3.get_paginator("list_objects_v2")
+        partitions: dict[str, list[dict]] = {}
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                if not obj["Key"].endswith(".parquet"):
+                    continue
+                path = obj["Key"][len(table_name) + 1:].rsplit("/", 1)[0]
+                partitions.setdefault(path, []).append(obj)
+        return partitions
+
+    def _to_parquet_bytes(self, df: pd.DataFrame, profile: dict | None = None) -> bytes:
+        with span("parquet_encode", rows=len(df)):
+            return to_parquet_bytes(df, profile)
+
+
+def to_parquet_bytes(df: pd.DataFrame, profile: dict | None = None) -> bytes:
+    """
+    Encodes df as parquet using a storage profile (codec + level, row-group size,
+    dictionary columns, sort order and column/page statistics).
+    Keys missing from profile fall back to DEFAULT_STORAGE_PROFILE.
+    """
+    settings = {**DEFAULT_STORAGE_PROFILE, **(profile or {})}
+    sort_by = [col for col in (settings["sort_by"] or []) if col in df.columns]
+    if sort_by:
+        df = df.sort_values(sort_by, kind="stable")
+
+    use_dictionary = settings["use_dictionary"]
+    if isinstance(use_dictionary, list):
+        use_dictionary = [col for col in use_dictionary if col in df.columns]
+
+    buffer = BytesIO()
+    df.to_parquet(
+        buffer,
+        index=False,
+        engine="pyarrow",
+        compression=settings["compression"],
+        compression_level=settings["compression_level"],
+        row_group_size=settings["row_group_size"],
+        use_dictionary=use_dictionary,
+        write_statistics=settings["write_statistics"],
+        write_page_index=settings["write_page_index"],
+    )
+    return buffer.getvalue()
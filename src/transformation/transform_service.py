@@ -3,7 +3,13 @@ import pandas as pd
 
 from typing import Dict
 import logging
+import os
+from datetime import datetime, timezone
+from uuid import uuid4
+from observability.memory import track
+from observability.tracing import span
 from transformation.s3_client import S3TransformationClient
+from transformation.validation import OUTPUT_CONTRACTS, validate_output
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
@@ -39,22 +45,185 @@ OUTPUT_NAME = {
 }
 
 
+# Fact outputs are written as Hive-style year=/month=/day= partitions on this column
+PARTITION_COLUMN = {
+    "fact_sales_order": "created_date",
+    "fact_purchase_order": "created_date",
+    "fact_payment": "payment_date",
+}
+
+
+# Raw source table behind each fact builder. In "delta" mode these are read
+# incrementally (only raw files not consumed by a previous run).
+FACT_SOURCE = {
+    "make_fact_sales_order": "sales_order",
+    "make_fact_payment": "payment",
+    "make_fact_purchase_order": "purchase_order",
+}
+
+# Date columns of each fact source that dim_date covers
+DATE_COLUMNS = {
+    "payment": ["created_at", "last_updated", "payment_date"],
+    "sales_order": ["created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date"],
+    "purchase_order": ["created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date"],
+}
+
+TRANSFORM_MODES = ("full", "delta")
+
+# off: skip contracts, warn: record + log violations, strict: raise before the write
+VALIDATION_MODES = ("off", "warn", "strict")
+
+
+# Parquet storage profile per output (see benchmarks/parquet_profiles.py for the numbers).
+# Small dims: zstd, one row group. Facts: zstd, bounded row groups sorted on the
+# columns the loader filters by, with page indexes so readers can skip pages.
+_DIM_PROFILE = {"compression": "zstd", "compression_level": 3}
+_FACT_PROFILE = {
+    "compression": "zstd",
+    "compression_level": 3,
+    "row_group_size": 128_000,
+    "write_statistics": True,
+    "write_page_index": True,
+}
+
+STORAGE_PROFILES = {
+    "dim_currency": _DIM_PROFILE,
+    "dim_staff": _DIM_PROFILE,
+    "dim_location": _DIM_PROFILE,
+    "dim_counterparty": _DIM_PROFILE,
+    "dim_design": _DIM_PROFILE,
+    "dim_payment_type": _DIM_PROFILE,
+    "dim_transaction": {**_DIM_PROFILE, "row_group_size": 128_000, "use_dictionary": ["transaction_type"]},
+    "dim_date": {**_DIM_PROFILE, "sort_by": ["date"], "use_dictionary": ["day_name", "month_name"]},
+    "fact_sales_order": {
+        **_FACT_PROFILE,
+        "sort_by": ["last_updated"],
+        "use_dictionary": ["sales_staff_id", "sales_counterparty_id", "currency_id", "design_id", "agreed_delivery_location_id"],
+    },
+    "fact_purchase_order": {
+        **_FACT_PROFILE,
+        "sort_by": ["last_updated"],
+        "use_dictionary": ["staff_id", "counterparty_id", "item_code", "currency_id", "agreed_delivery_location_id"],
+    },
+    "fact_payment": {
+        **_FACT_PROFILE,
+        "sort_by": ["last_updated"],
+        "use_dictionary": ["counterparty_id", "currency_id", "payment_type_id", "paid"],
+    },
+}
+
+
+
+def _written_facts(results: list[dict]) -> dict:
+    # run_single_table results -> {output: {"rows", "s3_keys"}} for the fact outputs written
+    return {r["output"]: {"rows": r["rows"], "s3_keys": r["s3_keys"]} for r in results if "s3_keys" in r}
+
+
+def build_dim_date(days: pd.Series) -> pd.DataFrame:
+    """
+    dim_date from a Series of UTC day timestamps. date_id follows date order, so
+    the same set of days always gets the same ids, however it was collected.
+    """
+    days = days.drop_duplicates().sort_values()
+    dates = pd.DataFrame({"date": days.dt.date})
+    dt = pd.to_datetime(dates["date"], format="mixed", errors="coerce")  # guaranteed datetime64[ns]
+    dates["year"] = dt.dt.year
+    dates["month"] = dt.dt.month
+    dates["day"] = dt.dt.day
+    dates["day_of_week"] = dt.dt.day_of_week
+    dates["day_name"] = dt.dt.day_name()
+    dates["month_name"] = dt.dt.month_name()
+    dates["quarter"] = dt.dt.quarter
+    dates.insert(0, "date_id", range(1, len(dates) + 1))
+    return dates
 
 
 class TransformService:
     """
     Transform service tightly coupled to S3TransformationClient
+
+    mode="full"  rebuilds every output from the whole raw history (backfills).
+    mode="delta" builds facts only from raw files that arrived since the last
+                 delta run and appends them as delta parquet + a run manifest.
+    Defaults to the TRANSFORM_MODE env var, then "full".
+
+    Every output is checked against its OUTPUT_CONTRACTS entry before it is written
+    (TRANSFORM_VALIDATION=off|warn|strict, default warn). TRANSFORM_VALIDATION_SAMPLE_ROWS
+    checks a sample instead of the whole frame for larger outputs.
     """
-    def __init__(self, ingest_bucket: str, processed_bucket: str):
+    def __init__(self, ingest_bucket: str, processed_bucket: str, mode: str | None = None):
         self.ingest_s3 = S3TransformationClient(ingest_bucket)
         self.processed_s3 = S3TransformationClient(processed_bucket)
         self._cache: Dict[str, pd.DataFrame] = {}
-        logger.info(f"TransformService initialised. ingest={ingest_bucket}, processed={processed_bucket}")
+        self._delta_cache: Dict[str, pd.DataFrame] = {}
+        self._consumed_keys: Dict[str, list[str]] = {}
+        # outputs already written by this instance, so a batch of tables builds dim_date etc. once
+        self._written_outputs: set[str] = set()
+        # per-builder memory stats from build_outputs (MEMORY_PROFILE only)
+        self.output_memory: Dict[str, dict] = {}
+        # per-output validation reports from build_outputs (not set when validation is off)
+        self.output_validation: Dict[str, dict] = {}
+        self.mode = mode or os.getenv("TRANSFORM_MODE", "full")
+        if self.mode not in TRANSFORM_MODES:
+            raise ValueError(f"Unknown transform mode '{self.mode}', expected one of {TRANSFORM_MODES}")
+        self.validation = os.getenv("TRANSFORM_VALIDATION", "warn")
+        if self.validation not in VALIDATION_MODES:
+            raise ValueError(f"Unknown validation mode '{self.validation}', expected one of {VALIDATION_MODES}")
+        self.validation_sample_rows = int(os.getenv("TRANSFORM_VALIDATION_SAMPLE_ROWS", "0")) or None
+        logger.info(f"TransformService initialised. ingest={ingest_bucket}, processed={processed_bucket}, mode={self.mode}")
     def _get_ingest_table(self, table_name: str) -> pd.DataFrame:
         if table_name not in self._cache:
             logger.info(f"Fetching ingest table: {table_name}")
             self._cache[table_name] = self.ingest_s3.read_table(table_name)
         return self._cache[table_name]
+
+    def _get_ingest_delta(self, table_name: str) -> pd.DataFrame:
+        """
+        Rows from raw files newer than the table's last consumed key (see _commit_delta_state).
+        """
+        if table_name not in self._delta_cache:
+            state = self.processed_s3.read_state(table_name)
+            keys = self.ingest_s3.list_raw_keys(table_name, start_after=state.get("last_consumed_key"))
+            logger.info(f"Fetching ingest delta: {table_name} ({len(keys)} new raw files)")
+            self._consumed_keys[table_name] = keys
+            self._delta_cache[table_name] = self.ingest_s3.read_keys(keys)
+        return self._delta_cache[table_name]
+
+    def _get_fact_source(self, table_name: str) -> pd.DataFrame:
+        if self.mode == "delta":
+            return self._get_ingest_delta(table_name)
+        return self._get_ingest_table(table_name)
+
+    def _validate(self, output_name: str, method_name: str, df: pd.DataFrame) -> dict | None:
+        """
+        Checks an output against its contract. Returns the report (None when validation
+        is off or the output has no contract); raises TransformValidationError in strict mode.
+        """
+        contract = OUTPUT_CONTRACTS.get(output_name)
+        if self.validation == "off" or contract is None:
+            return None
+
+        source = FACT_SOURCE.get(method_name)
+        source_count = len(self._get_fact_source(source)) if source else None
+        report = validate_output(
+            df,
+            contract,
+            output_name,
+            source_count=source_count,
+            sample_rows=self.validation_sample_rows,
+            raise_on_error=self.validation == "strict",
+        )
+        if not report["passed"]:
+            failed = {name: check["violations"] for name, check in report["checks"].items() if check["violations"]}
+            logger.warning(f"Validation violations for {output_name}: {failed}")
+        return report
+
+    def _has_input(self, method_name: str) -> bool:
+        # Delta mode: a fact with no new raw files has nothing to build
+        source = FACT_SOURCE.get(method_name)
+        if self.mode != "delta" or source is None:
+            return True
+        return not self._get_ingest_delta(source).empty
     
     # Dimensions
     def make_dim_currency(self) -> pd.DataFrame:
@@ -66,7 +235,11 @@ class TransformService:
     def make_dim_staff(self) -> pd.DataFrame:
         logger.info("Creating dim_staff")
         staff = self._get_ingest_table("staff").drop_duplicates(subset=["staff_id"], keep="last")
-        department = self._get_ingest_table("department").drop_duplicates(subset=["department_id"], keep="last")
+        department = (
+            self._get_ingest_table("department")
+            .drop_duplicates(subset=["department_id"], keep="last")
+            .set_index("department_id")  # join on the id, not the row position
+        )
         dim = staff.join(department, on="department_id", rsuffix="_dept")
         return dim[
             [
@@ -146,36 +319,36 @@ class TransformService:
 
     def make_dim_date(self) -> pd.DataFrame:
         logger.info("Creating dim_date")
-        payments = self._get_ingest_table("payment")
-        purchases = self._get_ingest_table("purchase_order")
-        sales = self._get_ingest_table("sales_order")
-        logger.info("Getting dates from payment")
-        payment_dates = pd.melt(
-            payments[["created_at", "last_updated", "payment_date"]]
-        )["value"]
-        logger.info("Getting dates from sales_order")
-        sales_dates = pd.melt(
-            sales[["created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date"]]
-        )["value"]
-        logger.info("Getting dates from purchase_order")
-        purchase_dates = pd.melt(
-            purchases[["created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date"]]
-        )["value"]
+        days = self.source_dates()
+        if self.mode == "delta":
+            # only the new raw files were read: add their days to the published dim_date
+            existing = self.processed_s3.read_latest_output("dim_date")
+            if existing is not None:
+                known = pd.to_datetime(existing["date"], utc=True)
+                if days.isin(known).all():
+                    logger.info("No new days for dim_date")
+                    return pd.DataFrame()
+                days = pd.concat([known, days], ignore_index=True)
+        return build_dim_date(days)
+
+    def source_dates(self) -> pd.Series:
+        """
+        Every distinct day (UTC) mentioned by the payment, sales and purchase rows
+        (in delta mode, by the rows of their new raw files).
+        """
+        collected = []
+        for table, columns in DATE_COLUMNS.items():
+            rows = self._get_fact_source(table)
+            if rows.empty:
+                continue
+            logger.info(f"Getting dates from {table}")
+            collected.append(pd.melt(rows[columns])["value"])
         logger.info("Collating dates")
-        total_dates = pd.concat([payment_dates, sales_dates, purchase_dates], ignore_index=True)
+        if not collected:
+            return pd.Series(dtype="datetime64[ns, UTC]")
+        total_dates = pd.concat(collected, ignore_index=True)
         total_dates = pd.to_datetime(total_dates, format="mixed", errors="coerce", utc=True)
-        total_dates = total_dates.dropna().dt.normalize().drop_duplicates().sort_values()
-        dates = pd.DataFrame({"date": total_dates.dt.date})
-        dt = pd.to_datetime(dates["date"], format="mixed", errors="coerce")  # guaranteed datetime64[ns]
-        dates["year"] = dt.dt.year
-        dates["month"] = dt.dt.month
-        dates["day"] = dt.dt.day
-        dates["day_of_week"] = dt.dt.day_of_week
-        dates["day_name"] = dt.dt.day_name()
-        dates["month_name"] = dt.dt.month_name()
-        dates["quarter"] = dt.dt.quarter
-        dates.insert(0, "date_id", range(1, len(dates) + 1))
-        return dates
+        return total_dates.dropna().dt.normalize().drop_duplicates()
     
 
     def make_dim_transaction(self) -> pd.DataFrame:
@@ -213,7 +386,7 @@ class TransformService:
     def make_fact_sales_order(self) -> pd.DataFrame:
         table_name = "fact_sales_order"
         logger.info(f"Creating {table_name}")
-        sales_order = self._get_ingest_table("sales_order")
+        sales_order = self._get_fact_source("sales_order")
         # source_count = len(sales_order)
         sales_order["created_date"] = pd.to_datetime(
             sales_order["created_at"],format="mixed", errors="coerce").dt.date
@@ -223,6 +396,9 @@ class TransformService:
             sales_order["last_updated"],format="mixed", errors="coerce").dt.date
         sales_order["last_updated_time"] = pd.to_datetime(
             sales_order["last_updated"],format="mixed", errors="coerce").dt.time
+        # typed UTC timestamp: loader watermark + parquet row-group statistics
+        sales_order["last_updated"] = pd.to_datetime(
+            sales_order["last_updated"], format="mixed", errors="coerce", utc=True)
         sales_order["agreed_payment_date"] = pd.to_datetime(
             sales_order["agreed_payment_date"], format="mixed",errors="coerce").dt.date
         sales_order["agreed_delivery_date"] = pd.to_datetime(
@@ -233,6 +409,7 @@ class TransformService:
                 "created_time",
                 "last_updated_date",
                 "last_updated_time",
+                "last_updated",
                 "staff_id",
                 "counterparty_id",
                 "units_sold",
@@ -255,8 +432,9 @@ class TransformService:
 
     def make_fact_payment(self) -> pd.DataFrame:
         logger.info("Creating fact_payment")
-        payment = self._get_ingest_table("payment")
+        payment = self._get_fact_source("payment")
         payment["payment_date"] = pd.to_datetime(payment["payment_date"],format="mixed", errors="coerce").dt.date
+        payment["last_updated"] = pd.to_datetime(payment["last_updated"], format="mixed", errors="coerce", utc=True)
         return payment[
             [
                 "payment_id",
@@ -267,16 +445,17 @@ class TransformService:
                 "payment_type_id",
                 "payment_date",
                 "paid",
+                "last_updated",
             ]
         ]
     
 
     def make_fact_purchase_order(self) -> pd.DataFrame:
         logger.info("Creating fact_purchase_order")
-        po = self._get_ingest_table("purchase_order")
+        po = self._get_fact_source("purchase_order")
         # Parse timestamps
         po["created_at"] = pd.to_datetime(po["created_at"],format="mixed", errors="coerce")
-        po["last_updated"] = pd.to_datetime(po["last_updated"], format="mixed", errors="coerce")
+        po["last_updated"] = pd.to_datetime(po["last_updated"], format="mixed", errors="coerce", utc=True)
         # Split date/time (as your fact table shows created_date/created_time etc.)
         po["created_date"] = po["created_at"].dt.date
         po["created_time"] = po["created_at"].dt.time
@@ -296,6 +475,7 @@ class TransformService:
                 "created_time",
                 "last_updated_date",
                 "last_updated_time",
+                "last_updated",
                 "staff_id",
                 "counterparty_id",
                 "item_code",
@@ -316,29 +496,125 @@ class TransformService:
     def run(self):
         logger.info("Starting transformation run")
         logger.info(f"TRANSFORM_MAP contains: {list(TRANSFORM_MAP.keys())}")
-        outputs = {
-            "dim_transaction": self.make_dim_transaction(),
-            "dim_staff": self.make_dim_staff(),
-            "dim_payment_type": self.make_dim_payment_type(),
-            "dim_location": self.make_dim_location(),
-            "dim_design": self.make_dim_design(),
-            "dim_date": self.make_dim_date(),
-            "dim_currency": self.make_dim_currency(),
-            "dim_counterparty": self.make_dim_counterparty(),
-            "fact_sales_order": self.make_fact_sales_order(),
-            "fact_purchase_order": self.make_fact_purchase_order(),
-            "fact_payment": self.make_fact_payment(),
+        return self.write_outputs(self.build_outputs())
+
+    def _builders(self) -> dict:
+        return {
+            "dim_transaction": self.make_dim_transaction,
+            "dim_staff": self.make_dim_staff,
+            "dim_payment_type": self.make_dim_payment_type,
+            "dim_location": self.make_dim_location,
+            "dim_design": self.make_dim_design,
+            "dim_date": self.make_dim_date,
+            "dim_currency": self.make_dim_currency,
+            "dim_counterparty": self.make_dim_counterparty,
+            "fact_sales_order": self.make_fact_sales_order,
+            "fact_purchase_order": self.make_fact_purchase_order,
+            "fact_payment": self.make_fact_payment,
         }
 
-        logger.info(f"Generated {len(outputs)} tables: {list(outputs.keys())}")
-
-        for name, df in outputs.items():
+    def build_outputs(
+        self,
+        frames: Dict[str, pd.DataFrame] | None = None,
+        names: list[str] | None = None,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Builds and validates outputs in memory without writing them; empty outputs
+        are left out. frames (raw table name -> DataFrame, e.g. straight from ingestion)
+        are used instead of reading those tables from the ingest bucket.
+        names limits the build to those outputs (default: all). Validation reports
+        are kept in self.output_validation.
+        """
+        if frames:
+            self._cache.update(frames)
+
+        outputs = {}
+        for name, build in self._builders().items():
+            if names is not None and name not in names:
+                continue
+            if not self._has_input(build.__name__):
+                continue
+            with span(build.__name__), track("transformation", build.__name__) as memory:
+                df = build()
+            if memory:
+                self.output_memory[name] = memory
             if df is None or len(df) == 0:
                 logger.warning("No data for %s - skipping parquet write", name)
                 continue
-            self.processed_s3.write_parquet(name, df)
+            validation = self._validate(name, build.__name__, df)
+            if validation is not None:
+                self.output_validation[name] = validation
+            outputs[name] = df
+
+        logger.info(f"Generated {len(outputs)} tables: {list(outputs.keys())}")
+        return outputs
+
+    def write_outputs(self, outputs: Dict[str, pd.DataFrame]) -> dict:
+        """
+        Writes built outputs to the processed bucket (and the delta state / manifest).
+        Returns {output: {"rows", "s3_keys"}}, plus "validation" (and "memory") when
+        build_outputs recorded them.
+        """
+        written = {}
+        for name, df in outputs.items():
+            written[name] = {"rows": len(df), "s3_keys": self._write_output(name, df)}
+            if name in self.output_memory:
+                written[name]["memory"] = self.output_memory[name]
+            if name in self.output_validation:
+                written[name]["validation"] = self.output_validation[name]
             logger.info("Wrote parquet for %s rows=%d", name, len(df))
 
+        self._commit_delta_state(written)
+        return written
+
+    def _write_output(self, output_name: str, df: pd.DataFrame) -> list[str]:
+        """
+        Writes one output table; facts go to date partitions, dims to a single snapshot file.
+        Returns the S3 keys written.
+        """
+        partition_col = PARTITION_COLUMN.get(output_name)
+        profile = STORAGE_PROFILES.get(output_name)
+        if partition_col:
+            delta = self.mode == "delta"
+            return self.processed_s3.write_partitioned_parquet(output_name, df, partition_col, profile=profile, delta=delta)
+        return [self.processed_s3.write_parquet(output_name, df, profile=profile)]
+
+    def _commit_delta_state(self, written: dict) -> None:
+        """
+        Delta mode: after outputs are written, advance the high-water key of the source
+        tables behind the fact outputs in `written` and record a run manifest (source
+        raw keys -> output keys). Sources whose fact was not written (failed, or not
+        part of this call) keep their state, so a later run retries the same files.
+        """
+        if self.mode != "delta":
+            return
+        sources = sorted(
+            FACT_SOURCE[method] for method, name in OUTPUT_NAME.items() if name in written and method in FACT_SOURCE
+        )
+        consumed = {table: self._consumed_keys[table] for table in sources if self._consumed_keys.get(table)}
+        if not consumed:
+            return
+
+        run_name = f"{datetime.now(timezone.utc).strftime('%Y-%m-%dT%H-%M-%S')}_{uuid4().hex}"
+        manifest = {
+            "run": run_name,
+            "mode": self.mode,
+            "sources": consumed,
+            "outputs": {name: written[name] for name in PARTITION_COLUMN if name in written},
+        }
+        manifest_key = self.processed_s3.write_manifest(run_name, manifest)
+
+        for table, keys in consumed.items():
+            self.processed_s3.write_state(table, {"last_consumed_key": keys[-1], "manifest": manifest_key})
+            logger.info(f"Delta state for {table} advanced to {keys[-1]}")
+            del self._consumed_keys[table]
+
+    def _discard_delta(self, tables) -> None:
+        # forget deltas read by a failed run, so nothing commits them and a retry re-reads them
+        for table in tables:
+            self._consumed_keys.pop(table, None)
+            self._delta_cache.pop(table, None)
+
     # removed duplicate writes in run_single_table
     # def run_single_table(self, table_name: str):
     #     logger.info(f"Running single-table transformation for '{table_name}'")
@@ -376,29 +652,53 @@ class TransformService:
             return {"table": table_name, "status": "skipped", "reason": "no_transform_defined"}
 
         unique_methods = list(dict.fromkeys(methods))  # de-dupe keep order
-        written_outputs = set()
         results = []
 
-        for method_name in unique_methods:
-            transform_method = getattr(self, method_name)
-            df = transform_method()
-
-            output_name = OUTPUT_NAME.get(method_name, method_name)
-
-            if df is None or len(df) == 0:
-                logger.warning("Empty df for %s (%s) - skipping", output_name, method_name)
-                results.append({"method": method_name, "output": output_name, "rows": 0, "status": "skipped_empty"})
-                continue
-
-            if output_name in written_outputs:
-                logger.info("Output %s already written in this run - skipping duplicate", output_name)
-                results.append({"method": method_name, "output": output_name, "rows": len(df), "status": "skipped_duplicate"})
-                continue
-
-            logger.info(f"Writing '{output_name}' from '{method_name}' ({len(df)} rows)")
-            s3_key = self.processed_s3.write_parquet(output_name, df)
-            written_outputs.add(output_name)
-
-            results.append({"method": method_name, "output": output_name, "rows": len(df), "s3_key": s3_key, "status": "written"})
-
-        return {"table": table_name, "status": "success", "results": results}
+        try:
+            for method_name in unique_methods:
+                output_name = OUTPUT_NAME.get(method_name, method_name)
+                if output_name in self._written_outputs:
+                    logger.info("Output %s already written in this run - skipping duplicate", output_name)
+                    results.append({"method": method_name, "output": output_name, "rows": 0, "status": "skipped_duplicate"})
+                    continue
+
+                if not self._has_input(method_name):
+                    logger.info("No new raw files for %s - skipping delta", output_name)
+                    results.append({"method": method_name, "output": output_name, "rows": 0, "status": "skipped_no_delta"})
+                    continue
+
+                transform_method = getattr(self, method_name)
+                with span(method_name), track("transformation", method_name) as memory:
+                    df = transform_method()
+
+                if df is None or len(df) == 0:
+                    logger.warning("Empty df for %s (%s) - skipping", output_name, method_name)
+                    results.append({"method": method_name, "output": output_name, "rows": 0, "status": "skipped_empty"})
+                    continue
+
+                validation = self._validate(output_name, method_name, df)
+
+                logger.info(f"Writing '{output_name}' from '{method_name}' ({len(df)} rows)")
+                s3_keys = self._write_output(output_name, df)
+                self._written_outputs.add(output_name)
+
+                result = {"method": method_name, "output": output_name, "rows": len(df), "status": "written"}
+                if memory:
+                    result["memory"] = memory
+                if validation is not None:
+                    result["validation"] = validation
+                if output_name in PARTITION_COLUMN:
+                    result["s3_keys"] = s3_keys
+                    if not s3_keys:
+                        result["status"] = "unchanged"
+                else:
+                    result["s3_key"] = s3_keys[0]
+                results.append(result)
+        except Exception:
+            # facts written before the failure keep their state; the failed ones are retried
+            self._commit_delta_state(_written_facts(results))
+            self._discard_delta({FACT_SOURCE[m] for m in unique_methods if m in FACT_SOURCE})
+            raise
+
+        self._commit_delta_state(_written_facts(results))
+        return {"table": table_name, "status": "success", "mode": self.mode, "results": results}
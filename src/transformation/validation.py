@@ -1,3 +1,5 @@
+import time
+
 import pandas as pd
 
 
@@ -6,57 +8,198 @@ class TransformValidationError(Exception):
     pass
 
 
-def validate_schema(
+# Declarative per-output contracts checked before every parquet write.
+#   columns:      exact output schema
+#   not_null:     columns that must not contain NULL/NaN/NaT (mirrors NOT NULL in loading/sql.py)
+#   unique:       columns forming a unique key (dims are de-duplicated on their id)
+#   min_rows:     minimum row count
+#   max_row_drop: minimum result/source row ratio (facts are 1:1 with their source rows)
+OUTPUT_CONTRACTS = {
+    "dim_currency": {
+        "columns": ["currency_id", "currency_code"],
+        "not_null": ["currency_id", "currency_code"],
+        "unique": ["currency_id"],
+        "min_rows": 1,
+    },
+    "dim_staff": {
+        "columns": ["staff_id", "first_name", "last_name", "department_name", "location", "email_address"],
+        "not_null": ["staff_id", "first_name", "last_name", "department_name", "location"],
+        "unique": ["staff_id"],
+        "min_rows": 1,
+    },
+    "dim_location": {
+        "columns": [
+            "location_id", "address_line_1", "address_line_2", "district",
+            "city", "postal_code", "country", "phone",
+        ],
+        "not_null": ["location_id", "address_line_1", "city", "country"],
+        "unique": ["location_id"],
+        "min_rows": 1,
+    },
+    "dim_counterparty": {
+        "columns": [
+            "counterparty_id", "counterparty_legal_name",
+            "counterparty_legal_address_line_1", "counterparty_legal_address_line_2",
+            "counterparty_legal_district", "counterparty_legal_city",
+            "counterparty_legal_postal_code", "counterparty_legal_country",
+            "counterparty_legal_phone_number",
+        ],
+        "not_null": ["counterparty_id", "counterparty_legal_name"],
+        "unique": ["counterparty_id"],
+        "min_rows": 1,
+    },
+    "dim_design": {
+        "columns": ["design_id", "design_name", "file_location", "file_name"],
+        "not_null": ["design_id", "design_name"],
+        "unique": ["design_id"],
+        "min_rows": 1,
+    },
+    "dim_payment_type": {
+        "columns": ["payment_type_id", "payment_type_name"],
+        "not_null": ["payment_type_id", "payment_type_name"],
+        "unique": ["payment_type_id"],
+        "min_rows": 1,
+    },
+    "dim_transaction": {
+        "columns": ["transaction_id", "transaction_type", "sales_order_id", "purchase_order_id"],
+        "not_null": ["transaction_id", "transaction_type"],
+        "unique": ["transaction_id"],
+        "min_rows": 1,
+    },
+    "dim_date": {
+        "columns": [
+            "date_id", "date", "year", "month", "day",
+            "day_of_week", "day_name", "month_name", "quarter",
+        ],
+        "not_null": ["date_id", "date", "year", "month", "day", "day_of_week", "day_name", "month_name", "quarter"],
+        "unique": ["date"],
+        "min_rows": 1,
+    },
+    "fact_sales_order": {
+        "columns": [
+            "sales_order_id", "created_date", "created_time", "last_updated_date",
+            "last_updated_time", "last_updated", "sales_staff_id", "sales_counterparty_id", "units_sold",
+            "unit_price", "currency_id", "design_id", "agreed_payment_date",
+            "agreed_delivery_date", "agreed_delivery_location_id",
+        ],
+        "not_null": [
+            "sales_order_id", "created_date", "created_time", "last_updated_date", "last_updated_time",
+            "last_updated", "sales_staff_id", "sales_counterparty_id", "units_sold", "unit_price", "currency_id",
+            "design_id", "agreed_payment_date", "agreed_delivery_date", "agreed_delivery_location_id",
+        ],
+        "min_rows": 1,
+        "max_row_drop": 1.0,
+    },
+    "fact_purchase_order": {
+        "columns": [
+            "purchase_order_id", "created_date", "created_time", "last_updated_date",
+            "last_updated_time", "last_updated", "staff_id", "counterparty_id", "item_code", "item_quantity",
+            "item_unit_price", "currency_id", "agreed_delivery_date", "agreed_payment_date",
+            "agreed_delivery_location_id",
+        ],
+        "not_null": [
+            "purchase_order_id", "created_date", "created_time", "last_updated_date", "last_updated_time",
+            "last_updated", "staff_id", "counterparty_id", "item_code", "item_quantity", "item_unit_price", "currency_id",
+            "agreed_delivery_date", "agreed_payment_date", "agreed_delivery_location_id",
+        ],
+        "min_rows": 1,
+        "max_row_drop": 1.0,
+    },
+    "fact_payment": {
+        "columns": [
+            "payment_id", "transaction_id", "counterparty_id", "payment_amount",
+            "currency_id", "payment_type_id", "payment_date", "paid", "last_updated",
+        ],
+        "not_null": [
+            "payment_id", "transaction_id", "counterparty_id", "payment_amount",
+            "currency_id", "payment_type_id", "payment_date", "paid", "last_updated",
+        ],
+        "min_rows": 1,
+        "max_row_drop": 1.0,
+    },
+}
+
+
+def validate_output(
     df: pd.DataFrame,
-    expected_columns: list[str],
+    contract: dict,
     table_name: str,
-):
-    missing = set(expected_columns) - set(df.columns)
-    extra = set(df.columns) - set(expected_columns)
+    source_count: int | None = None,
+    sample_rows: int | None = None,
+    raise_on_error: bool = False,
+) -> dict:
+    """
+    Runs every check of a contract (vectorized, no per-row Python) and returns a report:
+        {"table", "rows", "sampled_rows", "passed",
+         "checks": {name: {"violations": int, "seconds": float, ...}}}
 
-    if missing or extra:
-        raise TransformValidationError(
-            f"[{table_name}] Schema mismatch | "
-            f"Missing: {sorted(missing)} | "
-            f"Extra: {sorted(extra)}"
-        )
+    Each check is timed on its own ("seconds"); the NULL check sums one vectorized
+    isna() frame, the uniqueness check one duplicated() mask.
+    With sample_rows set, frames larger than that are checked on a random sample
+    (schema and row counts always use the full frame).
+    """
+    checks: dict[str, dict] = {}
+    rows = len(df)
 
+    start = time.perf_counter()
+    expected = contract.get("columns", list(df.columns))
+    missing = sorted(set(expected) - set(df.columns))
+    extra = sorted(set(df.columns) - set(expected))
+    checks["schema"] = {
+        "violations": len(missing) + len(extra),
+        "missing": missing,
+        "extra": extra,
+        "seconds": time.perf_counter() - start,
+    }
 
-def validate_not_null(
-    df: pd.DataFrame,
-    not_null_columns: list[str],
-    table_name: str,
-):
-    null_counts = df[not_null_columns].isnull().sum()
-    failed = null_counts[null_counts > 0]
+    start = time.perf_counter()
+    min_rows = contract.get("min_rows", 0)
+    row_violations = int(rows < min_rows)
+    max_row_drop = contract.get("max_row_drop")
+    if max_row_drop is not None and source_count:
+        row_violations += int(rows < source_count * max_row_drop)
+    checks["row_count"] = {
+        "violations": row_violations,
+        "rows": rows,
+        "source_rows": source_count,
+        "seconds": time.perf_counter() - start,
+    }
 
-    if not failed.empty:
-        raise TransformValidationError(
-            f"[{table_name}] NULL values detected:\n{failed.to_string()}"
-        )
+    frame = df
+    sampled_rows = None
+    if sample_rows and rows > sample_rows:
+        frame = df.sample(n=sample_rows, random_state=0)
+        sampled_rows = sample_rows
 
+    start = time.perf_counter()
+    not_null = [col for col in contract.get("not_null", []) if col in frame.columns]
+    counts = frame[not_null].isna().sum()
+    null_counts = {col: int(counts[col]) for col in not_null if counts[col]}
+    checks["not_null"] = {
+        "violations": sum(null_counts.values()),
+        "by_column": null_counts,
+        "seconds": time.perf_counter() - start,
+    }
 
-def validate_row_count(
-    df: pd.DataFrame,
-    table_name: str,
-):
-    if df.empty:
-        raise TransformValidationError(
-            f"[{table_name}] Transform produced 0 rows"
-        )
+    unique = [col for col in contract.get("unique", []) if col in frame.columns]
+    if unique:
+        start = time.perf_counter()
+        duplicates = int(frame.duplicated(subset=unique, keep="first").sum())
+        checks["unique"] = {
+            "violations": duplicates,
+            "columns": unique,
+            "seconds": time.perf_counter() - start,
+        }
 
+    report = {
+        "table": table_name,
+        "rows": rows,
+        "sampled_rows": sampled_rows,
+        "passed": all(check["violations"] == 0 for check in checks.values()),
+        "checks": checks,
+    }
 
-def validate_row_drop(
-    source_count: int,
-    result_count: int,
-    table_name: str,
-    threshold: float = 0.9,
-):
-    if source_count == 0:
-        return  # nothing to compare
-
-    if result_count < source_count * threshold:
-        raise TransformValidationError(
-            f"[{table_name}] Row count dropped too much "
-            f"(source={source_count}, result={result_count})"
-        )
\ No newline at end of file
+    if raise_on_error and not report["passed"]:
+        failed = {name: check for name, check in checks.items() if check["violations"]}
+        raise TransformValidationError(f"[{table_name}] Contract violations: {failed}")
+    return report
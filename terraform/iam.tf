@@ -47,11 +47,14 @@ resource "aws_iam_role_policy" "lambda_s3_permissions" {
       ]
     },
 
-    # Processed zone (write for transform)
+    # Processed zone (write for transform; read for the output index and loading;
+    # delete for replaced partition files and stale indexes)
     {
         Effect = "Allow"
         Action = [
           "s3:PutObject",
+          "s3:GetObject",
+          "s3:DeleteObject",
           "s3:ListBucket"
         ]
         Resource = [
@@ -64,6 +67,26 @@ resource "aws_iam_role_policy" "lambda_s3_permissions" {
 }
 
 
+# The loading Lambda is fed by the processed-zone event queue (s3_triggers.tf)
+resource "aws_iam_role_policy" "lambda_sqs_permissions" {
+  name = "${var.project_name}-lambda-sqs-permissions"
+  role = aws_iam_role.lambda_exec.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Effect = "Allow"
+      Action = [
+        "sqs:ReceiveMessage",
+        "sqs:DeleteMessage",
+        "sqs:GetQueueAttributes"
+      ]
+      Resource = aws_sqs_queue.loading_events.arn
+    }]
+  })
+}
+
+
 # resource "aws_iam_role_policy" "lambda_secrets_access" {
 #   name = "${var.project_name}-lambda-secrets-access"
 #   role = aws_iam_role.lambda_exec.id
@@ -17,7 +17,8 @@ resource "aws_lambda_function" "loading" {
   runtime       = var.lambda_runtime
 
 
-  handler = "loading.lambda_handler.lambda_handler"
+  # this handler in ../src/loading/lambda_handler_load.py
+  handler = "loading.lambda_handler_load.lambda_handler"
 
   filename         = data.archive_file.loading_lambda.output_path
   source_code_hash = data.archive_file.loading_lambda.output_base64sha256
@@ -42,6 +43,9 @@ resource "aws_lambda_function" "loading" {
       PROCESSED_BUCKET_NAME = aws_s3_bucket.processed_zone.bucket
       ENVIRONMENT           = var.environment
       LOG_LEVEL             = "INFO"
+      LOAD_DIM_MODE         = "merge"
+      LOAD_FACT_MODE        = "merge"
+      LOAD_MAX_WORKERS      = "4"
     }
   }
 
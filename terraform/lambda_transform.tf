@@ -44,6 +44,7 @@ resource "aws_lambda_function" "transform" {
       PROCESSED_BUCKET_NAME = aws_s3_bucket.processed_zone.bucket
       ENVIRONMENT           = var.environment
       LOG_LEVEL             = "INFO"
+      TRANSFORM_MODE        = "delta"
     }
   }
 
@@ -20,26 +20,78 @@ lambda_function {
 }
 
 
-resource "aws_lambda_permission" "allow_s3_invoke_loading" {
-  statement_id  = "AllowS3InvokeLoading"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.loading.function_name
-  principal     = "s3.amazonaws.com"
-  source_arn    = aws_s3_bucket.processed_zone.arn
+# Processed-zone parquet notifications go through a queue instead of invoking the
+# loader directly: the event source mapping batches a whole transform run into one
+# invocation. Concurrent invocations of the same table are serialized by the loader's
+# per-table pg_advisory_xact_lock (loading/load_service.py), not by Lambda concurrency:
+# a reserved concurrency of 1 throttles the poller and pushes messages to the DLQ.
+resource "aws_sqs_queue" "loading_events_dlq" {
+  name                      = "${var.project_name}-loading-events-dlq-${var.environment}"
+  message_retention_seconds = 1209600
+
+  tags = {
+    Stage = "Week3-Loading"
+  }
+}
+
+resource "aws_sqs_queue" "loading_events" {
+  name = "${var.project_name}-loading-events-${var.environment}"
+  # at least 6x the function timeout, as AWS recommends for Lambda event sources
+  visibility_timeout_seconds = var.lambda_timeout * 6
+  message_retention_seconds  = 345600
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.loading_events_dlq.arn
+    maxReceiveCount     = 5
+  })
+
+  tags = {
+    Stage = "Week3-Loading"
+  }
 }
 
+resource "aws_sqs_queue_policy" "loading_events_from_s3" {
+  queue_url = aws_sqs_queue.loading_events.id
 
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Effect    = "Allow"
+      Principal = { Service = "s3.amazonaws.com" }
+      Action    = "sqs:SendMessage"
+      Resource  = aws_sqs_queue.loading_events.arn
+      Condition = {
+        ArnEquals = { "aws:SourceArn" = aws_s3_bucket.processed_zone.arn }
+      }
+    }]
+  })
+}
 
 
 resource "aws_s3_bucket_notification" "transform_triggers_loading" {
   bucket = aws_s3_bucket.processed_zone.id
 
-lambda_function {
-    lambda_function_arn = aws_lambda_function.loading.arn
-    events              = ["s3:ObjectCreated:*"]
-    filter_suffix       = ".parquet"
-    filter_prefix = ""
+queue {
+    queue_arn     = aws_sqs_queue.loading_events.arn
+    events        = ["s3:ObjectCreated:*"]
+    filter_suffix = ".parquet"
   }
 
-  depends_on = [aws_lambda_permission.allow_s3_invoke_loading]
-}
\ No newline at end of file
+  depends_on = [aws_sqs_queue_policy.loading_events_from_s3]
+}
+
+
+resource "aws_lambda_event_source_mapping" "loading_events" {
+  event_source_arn                   = aws_sqs_queue.loading_events.arn
+  function_name                      = aws_lambda_function.loading.arn
+  batch_size                         = var.loading_batch_size
+  maximum_batching_window_in_seconds = var.loading_batching_window_seconds
+  # the handler returns batchItemFailures for the messages of failed tables only
+  function_response_types = ["ReportBatchItemFailures"]
+
+  # caps the invocations this queue starts (2 is the minimum) without throttling
+  # them: messages beyond it stay in the queue instead of counting as receives
+  scaling_config {
+    maximum_concurrency = 2
+  }
+}
@@ -70,6 +70,19 @@ variable "lambda_runtime" {
   default     = "python3.11"
 }
 
+# Loading queue (processed-zone events -> loading Lambda)
+variable "loading_batch_size" {
+  description = "Max S3 events per loading Lambda invocation"
+  type        = number
+  default     = 100
+}
+
+variable "loading_batching_window_seconds" {
+  description = "Seconds the loading queue gathers events before invoking the loader"
+  type        = number
+  default     = 60
+}
+
 # Schedule
 variable "ingestion_schedule" {
   description = "EventBridge schedule expression"
@@ -0,0 +1,62 @@
+import pytest
+
+from benchmarks.pipeline import compare, main, to_baseline
+
+
+def _row(stage="load", scale=1.0, **metrics):
+    row = {"scale": scale, "stage": stage, "rows": 1000, "seconds": 10.0, "rows_per_sec": 100,
+           "s3_requests": 100, "s3_bytes_out": 1000, "s3_bytes_in": 1000, "peak_rss_mb": 200.0}
+    return {**row, **metrics}
+
+
+def test_to_baseline_keys_rows_by_scale_and_stage():
+    baseline = to_baseline([_row("ingest"), _row("load", scale=10, seconds=90.0)])
+
+    assert set(baseline) == {"scale=1", "scale=10"}
+    assert baseline["scale=1"]["ingest"]["seconds"] == 10.0
+    assert baseline["scale=10"]["load"]["seconds"] == 90.0
+    assert "scale" not in baseline["scale=1"]["ingest"] and "stage" not in baseline["scale=1"]["ingest"]
+
+
+def test_compare_flags_a_metric_just_over_the_threshold():
+    baseline = to_baseline([_row()])
+
+    regressions = compare([_row(seconds=12.6, rows_per_sec=74)], baseline, threshold=0.25)
+
+    assert len(regressions) == 2
+    assert regressions[0].startswith("scale=1 load seconds: 10.0 -> 12.6")
+    assert regressions[1].startswith("scale=1 load rows_per_sec: 100 -> 74")
+
+
+def test_compare_passes_a_metric_just_under_the_threshold():
+    baseline = to_baseline([_row()])
+
+    assert compare([_row(seconds=12.4, rows_per_sec=76, s3_requests=124)], baseline, threshold=0.25) == []
+
+
+def test_compare_limits_to_the_given_metrics():
+    baseline = to_baseline([_row()])
+    results = [_row(seconds=20.0, s3_requests=130)]
+
+    assert compare(results, baseline, threshold=0.25, metrics=["s3_bytes_out"]) == []
+    assert compare(results, baseline, threshold=0.25, metrics=["s3_requests"]) == [
+        "scale=1 load s3_requests: 100 -> 130 (+30%)"
+    ]
+
+
+def test_compare_reports_stages_missing_from_the_baseline():
+    baseline = to_baseline([_row("ingest")])
+
+    assert compare([_row("ingest"), _row("load", scale=10)], baseline, threshold=0.25) == [
+        "scale=10 load: not in the baseline"
+    ]
+
+
+def test_main_fails_without_a_baseline(tmp_path, mocker):
+    run = mocker.patch("benchmarks.pipeline.run_pipeline")
+
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--baseline", str(tmp_path / "missing.json")])
+
+    assert exit_info.value.code == 1
+    run.assert_not_called()
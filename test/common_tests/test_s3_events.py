@@ -0,0 +1,24 @@
+import json
+
+from common.s3_events import extract_s3_records
+
+
+def _s3_record(key):
+    return {"eventSource": "aws:s3", "s3": {"object": {"key": key}}}
+
+
+def test_extract_s3_records_reads_direct_notifications_and_decodes_keys():
+    event = {"Records": [_s3_record("staff/2024-01-01+10%3A00.json")]}
+
+    assert extract_s3_records(event) == [("staff/2024-01-01 10:00.json", None)]
+
+
+def test_extract_s3_records_unwraps_sqs_bodies_and_skips_test_events():
+    event = {"Records": [
+        {"eventSource": "aws:sqs", "messageId": "m1",
+         "body": json.dumps({"Records": [_s3_record("fact_payment/a.parquet"), _s3_record("fact_payment/b.parquet")]})},
+        {"eventSource": "aws:sqs", "messageId": "m2", "body": json.dumps({"Event": "s3:TestEvent"})},
+    ]}
+
+    assert extract_s3_records(event) == [("fact_payment/a.parquet", "m1"), ("fact_payment/b.parquet", "m1")]
+    assert extract_s3_records({}) == []
@@ -0,0 +1,54 @@
+import socket
+import tempfile
+from uuid import uuid4
+
+import pg8000.dbapi
+import pytest
+
+
+@pytest.fixture(scope="session")
+def warehouse_pg():
+    """
+    A throwaway Postgres server for tests that need real SQL (partitions, upserts,
+    identity columns). Skipped when the pgserver package is not installed.
+    Yields the connection settings WarehouseDBClient reads from WAREHOUSE_*.
+    """
+    pgserver = pytest.importorskip("pgserver")
+    from pgserver._commands import pg_ctl
+
+    server = pgserver.get_server(tempfile.mkdtemp(), cleanup_mode="stop")
+    # pgserver only listens on a unix socket; pg8000 needs TCP
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    info = server.get_postmaster_info()
+    pg_ctl(
+        ["-w", "-o", "-h 127.0.0.1", "-o", f"-p {port}", "-o", f"-k {info.socket_dir}", "-l", str(server.log), "restart"],
+        pgdata=server.pgdata,
+        user=server.system_user,
+        timeout=20,
+    )
+    try:
+        yield {"host": "127.0.0.1", "port": port, "user": "postgres", "password": "postgres"}
+    finally:
+        server.cleanup()
+
+
+@pytest.fixture
+def warehouse_db(warehouse_pg, monkeypatch):
+    """
+    A fresh, empty database on warehouse_pg for one test, with the WAREHOUSE_* env
+    vars pointing at it. Returns its name.
+    """
+    database = f"test_{uuid4().hex[:12]}"
+    conn = pg8000.dbapi.connect(database="postgres", **warehouse_pg)
+    conn.autocommit = True
+    conn.cursor().execute(f'CREATE DATABASE "{database}"')
+    conn.close()
+
+    monkeypatch.setenv("WAREHOUSE_HOST", warehouse_pg["host"])
+    monkeypatch.setenv("WAREHOUSE_PORT", str(warehouse_pg["port"]))
+    monkeypatch.setenv("WAREHOUSE_DB", database)
+    monkeypatch.setenv("WAREHOUSE_USER", warehouse_pg["user"])
+    monkeypatch.setenv("WAREHOUSE_PASSWORD", warehouse_pg["password"])
+    return database
@@ -150,3 +150,16 @@ def test_ingest_table_changes_handles_error(mocker):
     with pytest.raises(Exception) as exc_info:
         service.ingest_table_changes("staff")
     assert "DB failed!" in str(exc_info.value)
+
+
+def test_extract_table_rejects_persisting_a_window(mocker):
+    mock_db = mocker.patch("ingestion.ingest_service.DatabaseClient")
+    mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
+    window = (datetime(2024, 1, 1), datetime(2024, 2, 1))
+    service = IngestionService(bucket="test-bucket")
+
+    with pytest.raises(ValueError, match="cannot be used with a window"):
+        service.extract_table("sales_order", persist=True, window=window)
+
+    mock_db.return_value.fetch_window.assert_not_called()
+    mock_s3.return_value.write_checkpoint.assert_not_called()
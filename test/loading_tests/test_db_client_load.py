@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import csv
+import io
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from loading.db_client_load import WarehouseDBClient
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, args=(), stream=None):
+        payload = b"".join(stream) if stream is not None else None
+        self.conn.calls.append({"sql": sql, "args": args, "stream": payload})
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self):
+        self.calls = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    for name in ("WAREHOUSE_HOST", "WAREHOUSE_DB", "WAREHOUSE_USER", "WAREHOUSE_PASSWORD"):
+        monkeypatch.setenv(name, "x")
+    db = WarehouseDBClient()
+    db.conn = FakeConn()
+    return db
+
+
+def test_copy_from_df_streams_csv_batches(client):
+    df = pd.DataFrame(
+        {
+            "staff_id": [1.0, 2.0, None],  # float because of the NULL; must reach Postgres as 1, 2
+            "name": ["A, B", "", None],
+            "hired": [date(2024, 1, 1), None, date(2024, 1, 3)],
+        }
+    )
+
+    copied = client.copy_from_df("dim_staff", df, batch_rows=2)
+
+    assert copied == 3
+    call = client.conn.calls[0]
+    assert call["sql"] == 'COPY "dim_staff" ("staff_id", "name", "hired") FROM STDIN WITH (FORMAT csv)'
+    rows = list(csv.reader(io.StringIO(call["stream"].decode())))
+    assert rows == [["1", "A, B", "2024-01-01"], ["2", "", ""], ["", "", "2024-01-03"]]
+    # NULL is an unquoted empty field, empty string is quoted
+    assert call["stream"].decode().splitlines()[1] == '2,"",'
+
+
+def test_copy_from_df_skips_empty_frames(client):
+    assert client.copy_from_df("dim_staff", pd.DataFrame({"staff_id": []})) == 0
+    assert client.conn.calls == []
@@ -71,7 +71,7 @@ class FakeDB:
     executed_sql: List[str] = field(default_factory=list)
     executemany_calls: List[Dict[str, Any]] = field(default_factory=list)
 
-    def execute(self, sql: str) -> None:
+    def execute(self, sql: str, params: Sequence[Any] = None) -> None:
         self.executed_sql.append(sql)
 
     def executemany(
@@ -237,6 +237,519 @@ def test_fact_skips_if_latest_key_already_loaded(monkeypatch):
 
 
 
+def test_fact_loads_every_partition_of_every_pending_run(monkeypatch):
+    table = "fact_payment"
+
+    fake_db = FakeDB()
+    fake_s3 = FakeS3LoadingClient()
+    # older run (A) only touched day=01; latest run (B) rewrote day=01 and added day=02
+    fake_s3.parquet[f"{table}/year=2024/month=01/day=01/processed_A.parquet"] = pd.DataFrame(
+        [{"payment_id": 1, "payment_date": "2024-01-01"}]
+    )
+    fake_s3.parquet[f"{table}/year=2024/month=01/day=01/processed_B.parquet"] = pd.DataFrame(
+        [{"payment_id": 1, "payment_date": "2024-01-01"}]
+    )
+    fake_s3.parquet[f"{table}/year=2024/month=01/day=02/processed_B.parquet"] = pd.DataFrame(
+        [{"payment_id": 2, "payment_date": "2024-01-02"}, {"payment_id": 3, "payment_date": "2024-01-02"}]
+    )
+
+    svc = LoadService(processed_bucket="fake-processed", db=fake_db)
+    svc.s3_client = fake_s3
+
+    monkeypatch.setattr(
+        "loading.load_service.CREATE_TABLE_SQL",
+        {table: f'CREATE TABLE IF NOT EXISTS "{table}" (payment_id INT, payment_date DATE);'},
+        raising=True,
+    )
+
+    res = svc.load_one_table(table)
+
+    assert res["status"] == "loaded"
+    # run A: 1 row; run B: day=01 re-emits payment 1 (<= A's watermark), day=02 adds 2
+    assert res["rows"] == 3
+    assert res["files"] == 3
+    assert res["latest_key"] == f"{table}/year=2024/month=01/day=02/processed_B.parquet"
+
+    written = json.loads(fake_s3.s3.objects[f"_load_checkpoints/{table}.json"].decode("utf-8"))
+    assert written["last_loaded_key"] == res["latest_key"]
+    assert written["loaded_after"] == []
+
+
+def test_fact_loads_intermediate_files_missed_by_latest_only_loading(monkeypatch):
+    table = "fact_sales_order"
+
+    fake_db = FakeDB()
+    fake_s3 = FakeS3LoadingClient()
+    fake_s3.parquet[f"{table}/part-000.parquet"] = pd.DataFrame(
+        [{"sales_order_id": 1, "last_updated": "2026-01-01T10:00:00Z"}]
+    )
+    # two transform runs landed since the last load
+    fake_s3.parquet[f"{table}/part-001.parquet"] = pd.DataFrame(
+        [{"sales_order_id": 2, "last_updated": "2026-01-01T11:00:00Z"}]
+    )
+    fake_s3.parquet[f"{table}/part-002.parquet"] = pd.DataFrame(
+        [{"sales_order_id": 3, "last_updated": "2026-01-01T12:00:00Z"}]
+    )
+
+    svc = LoadService(processed_bucket="fake-processed", db=fake_db)
+    svc.s3_client = fake_s3
+
+    monkeypatch.setattr(
+        "loading.load_service.CREATE_TABLE_SQL",
+        {table: f'CREATE TABLE IF NOT EXISTS "{table}" (sales_order_id INT, last_updated TIMESTAMPTZ);'},
+        raising=True,
+    )
+
+    ckpt_key = f"_load_checkpoints/{table}.json"
+    fake_s3.s3.objects[ckpt_key] = json.dumps(
+        {"loaded_keys": [f"{table}/part-000.parquet", f"{table}/deleted.parquet"],
+         "last_loaded_ts": "2026-01-01T10:00:00Z"}
+    ).encode("utf-8")
+
+    res = svc.load_one_table(table)
+
+    assert res["rows"] == 2
+    assert res["files"] == 2
+    # one insert per file, in order
+    assert [call["params"][0][0] for call in fake_db.executemany_calls] == [2, 3]
+
+    written = json.loads(fake_s3.s3.objects[ckpt_key].decode("utf-8"))
+    # legacy loaded_keys migrated to the prefix form
+    assert "loaded_keys" not in written
+    assert written["last_loaded_key"] == f"{table}/part-002.parquet"
+    assert written["loaded_after"] == []
+    assert written["last_loaded_ts"] == "2026-01-01T12:00:00Z"
+
+    assert svc.load_one_table(table)["reason"] == "already_loaded"
+
+
+def test_s3_checkpoint_is_not_written_when_the_warehouse_commit_fails(monkeypatch):
+    table = "fact_sales_order"
+
+    @dataclass
+    class FailingCommitDB(FakeDB):
+        def commit(self) -> None:
+            raise RuntimeError("connection lost")
+
+    fake_db = FailingCommitDB()
+    fake_s3 = FakeS3LoadingClient()
+    fake_s3.parquet[f"{table}/part-001.parquet"] = pd.DataFrame(
+        [{"sales_order_id": 2, "last_updated": "2026-01-01T11:00:00Z"}]
+    )
+    ckpt_key = f"_load_checkpoints/{table}.json"
+    before = json.dumps({"last_loaded_key": f"{table}/part-000.parquet", "last_loaded_ts": "2026-01-01T10:00:00Z"})
+    fake_s3.s3.objects[ckpt_key] = before.encode("utf-8")
+
+    svc = LoadService(processed_bucket="fake-processed", db=fake_db)
+    svc.s3_client = fake_s3
+    monkeypatch.setattr(
+        "loading.load_service.CREATE_TABLE_SQL",
+        {table: f'CREATE TABLE IF NOT EXISTS "{table}" (sales_order_id INT, last_updated TIMESTAMPTZ);'},
+        raising=True,
+    )
+
+    with pytest.raises(RuntimeError, match="connection lost"):
+        svc.load_tables([table])
+
+    assert fake_db.executemany_calls  # the rows were sent, but never committed
+    assert fake_s3.s3.objects[ckpt_key].decode("utf-8") == before
+
+def test_fact_checkpoint_keeps_only_keys_past_the_loaded_prefix(monkeypatch):
+    table = "fact_sales_order"
+
+    fake_db = FakeDB()
+    fake_s3 = FakeS3LoadingClient()
+    for i in range(4):
+        fake_s3.parquet[f"{table}/part-00{i}.parquet"] = pd.DataFrame(
+            [{"sales_order_id": i, "last_updated": f"2026-01-01T1{i}:00:00Z"}]
+        )
+
+    svc = LoadService(processed_bucket="fake-processed", db=fake_db)
+    svc.s3_client = fake_s3
+    monkeypatch.setattr(
+        "loading.load_service.CREATE_TABLE_SQL",
+        {table: f'CREATE TABLE IF NOT EXISTS "{table}" (sales_order_id INT, last_updated TIMESTAMPTZ);'},
+        raising=True,
+    )
+
+    # part-002 was loaded from memory by a local run while part-001 was still pending
+    ckpt_key = f"_load_checkpoints/{table}.json"
+    fake_s3.s3.objects[ckpt_key] = json.dumps(
+        {"last_loaded_key": f"{table}/part-000.parquet", "loaded_after": [f"{table}/part-002.parquet"],
+         "last_loaded_ts": "2026-01-01T10:00:00Z"}
+    ).encode("utf-8")
+
+    res = svc.load_one_table(table)
+
+    assert res["files"] == 2
+    assert [call["params"][0][0] for call in fake_db.executemany_calls] == [1, 3]
+    written = json.loads(fake_s3.s3.objects[ckpt_key].decode("utf-8"))
+    # the whole history collapses into the prefix marker
+    assert written["last_loaded_key"] == f"{table}/part-003.parquet"
+    assert written["loaded_after"] == []
+
+
+
+def test_insert_df_prefers_copy_when_client_supports_it():
+    @dataclass
+    class CopyDB(FakeDB):
+        copies: List[Dict[str, Any]] = field(default_factory=list)
+
+        def copy_from_df(self, table: str, df: pd.DataFrame) -> int:
+            self.copies.append({"table": table, "rows": len(df)})
+            return len(df)
+
+    df = pd.DataFrame([{"staff_id": 1}, {"staff_id": 2}])
+
+    copy_db = CopyDB()
+    svc = LoadService(processed_bucket="fake-processed", db=copy_db)
+    assert svc._insert_df("dim_staff", df) == 2
+    assert copy_db.copies == [{"table": "dim_staff", "rows": 2}]
+    assert copy_db.executemany_calls == []
+
+    fallback_db = CopyDB()
+    svc = LoadService(processed_bucket="fake-processed", db=fallback_db, insert_method="executemany")
+    assert svc._insert_df("dim_staff", df) == 2
+    assert fallback_db.copies == []
+    assert len(fallback_db.executemany_calls[0]["params"]) == 2
+
+
+
+def test_dim_merge_stages_and_upserts_changed_rows_only(monkeypatch):
+    table = "dim_staff"
+
+    @dataclass
+    class MergeDB(FakeDB):
+        queries: List[str] = field(default_factory=list)
+
+        def fetchall(self, sql: str, params: Sequence[Any] = None) -> List[tuple]:
+            if "information_schema" in sql:
+                return [("dim_staff", "staff_id", "integer"), ("dim_staff", "name", "text")]
+            self.queries.append(sql)
+            if sql.startswith("WITH upserted"):
+                return [(1, 2)]  # one new row, one changed row
+            return [(1,)]  # one row deleted
+
+    fake_db = MergeDB()
+    fake_s3 = FakeS3LoadingClient()
+    fake_s3.parquet[f"{table}/part-000.parquet"] = pd.DataFrame(
+        [{"staff_id": 1, "name": "A"}, {"staff_id": 2, "name": "B"}]
+    )
+
+    svc = LoadService(processed_bucket="fake-processed", db=fake_db, dim_mode="merge")
+    svc.s3_client = fake_s3
+    monkeypatch.setattr("loading.load_service._CATALOG_CACHE", {})
+
+    monkeypatch.setattr(
+        "loading.load_service.CREATE_TABLE_SQL",
+        {table: f'CREATE TABLE IF NOT EXISTS "{table}" (staff_id INT PRIMARY KEY, name TEXT);'},
+        raising=True,
+    )
+
+    res = svc.load_one_table(table)
+
+    assert res["mode"] == "merge"
+    assert res["rows_changed"] == {"inserted": 1, "updated": 1, "deleted": 1}
+
+    # never truncates the live table; snapshot goes to a temp staging table
+    assert not any("TRUNCATE" in s for s in fake_db.executed_sql)
+    assert any('CREATE TEMP TABLE "_stg_dim_staff"' in s for s in fake_db.executed_sql)
+    assert fake_db.executemany_calls[0]["sql"].startswith('INSERT INTO "_stg_dim_staff"')
+
+    upsert, delete = fake_db.queries
+    assert 'ON CONFLICT ("staff_id") DO UPDATE SET "name" = EXCLUDED."name"' in upsert
+    assert "IS DISTINCT FROM" in upsert
+    assert delete.startswith('DELETE FROM "dim_staff"')
+
+
+def test_dim_swap_loads_shadow_table_and_renames_it_in_a_short_transaction(monkeypatch):
+    table = "dim_staff"
+
+    @dataclass
+    class SwapDB(FakeDB):
+        commits: List[int] = field(default_factory=list)
+
+        def fetchall(self, sql: str, params: Sequence[Any] = None) -> List[tuple]:
+            if "information_schema" in sql:
+                return [("dim_staff", "staff_id", "integer"), ("dim_staff", "name", "text")]
+            if "pg_index" in sql:
+                return [("dim_staff_pkey", "CREATE UNIQUE INDEX dim_staff_pkey ON public.dim_staff USING btree (staff_id)", "dim_staff_pkey", "p")]
+            if "confrelid" in sql:
+                return [("fact_sales_order", "fk_sales_staff", "FOREIGN KEY (sales_staff_id) REFERENCES dim_staff(staff_id)", "r")]
+            return []
+
+        def commit(self) -> None:
+            self.commits.append(len(self.executed_sql))
+
+    fake_db = SwapDB()
+    fake_s3 = FakeS3LoadingClient()
+    fake_s3.parquet[f"{table}/part-000.parquet"] = pd.DataFrame(
+        [{"staff_id": 1, "name": "A"}, {"staff_id": 2, "name": "B"}]
+    )
+
+    svc = LoadService(processed_bucket="fake-processed", db=fake_db, dim_mode="swap")
+    svc.s3_client = fake_s3
+    monkeypatch.setattr("loading.load_service._CATALOG_CACHE", {})
+    monkeypatch.setattr(
+        "loading.load_service.CREATE_TABLE_SQL",
+        {table: f'CREATE TABLE IF NOT EXISTS "{table}" (staff_id INT PRIMARY KEY, name TEXT);'},
+        raising=True,
+    )
+
+    res = svc.load_one_table(table)
+
+    assert res["mode"] == "swap"
+    assert res["rows"] == 2
+    assert res["lock_hold_seconds"] >= 0
+
+    sql = fake_db.executed_sql
+    assert not any("TRUNCATE" in s for s in sql)
+    assert fake_db.executemany_calls[0]["sql"].startswith('INSERT INTO "_swap_dim_staff"')
+    assert 'CREATE UNLOGGED TABLE "_swap_dim_staff"' in "".join(sql)
+    assert 'CREATE UNIQUE INDEX "dim_staff_pkey_swap" ON "_swap_dim_staff" USING btree (staff_id);' in sql
+
+    # bulk load + index build are committed before the live table is touched
+    build_commit, swap_commit, load_commit = fake_db.commits
+    before, during = sql[:build_commit], sql[build_commit:swap_commit]
+    assert 'ALTER TABLE "_swap_dim_staff" SET LOGGED;' in before
+    assert not any(s.startswith(('ALTER TABLE "dim_staff"', 'DROP TABLE "dim_staff"')) for s in before)
+    assert during == [
+        # the build commit released the table lock
+        "SELECT pg_advisory_xact_lock(%s, hashtext(%s));",
+        "SET LOCAL lock_timeout = '5s';",
+        'ALTER TABLE fact_sales_order DROP CONSTRAINT "fk_sales_staff";',
+        'DROP TABLE "dim_staff";',
+        'ALTER TABLE "_swap_dim_staff" RENAME TO "dim_staff";',
+        'ALTER TABLE "dim_staff" RENAME CONSTRAINT "dim_staff_pkey_swap" TO "dim_staff_pkey";',
+        'ALTER TABLE fact_sales_order ADD CONSTRAINT "fk_sales_staff" '
+        "FOREIGN KEY (sales_staff_id) REFERENCES dim_staff(staff_id) NOT VALID;",
+    ]
+    assert sql[-1] == 'ALTER TABLE fact_sales_order VALIDATE CONSTRAINT "fk_sales_staff";'
+    assert load_commit == len(sql)
+
+
+@dataclass
+class FactMergeDB(FakeDB):
+    columns: List[tuple] = field(default_factory=list)
+    upserts: List[str] = field(default_factory=list)
+
+    def execute(self, sql: str, params: Sequence[Any] = None) -> None:
+        self.executed_sql.append(sql)
+
+    def fetchall(self, sql: str, params: Sequence[Any] = None) -> List[tuple]:
+        if "information_schema" in sql:
+            return self.columns
+        if sql.startswith("WITH upserted"):
+            self.upserts.append(sql)
+            return [(1, 2)]
+        return []
+
+
+def test_fact_merge_upserts_each_batch_from_staging(monkeypatch):
+    table = "fact_sales_order"
+    ts = pd.Timestamp("2026-01-01 10:00:00", tz="UTC")
+
+    fake_db = FactMergeDB(columns=[
+        (table, "sales_order_id", "integer"),
+        (table, "created_date", "date"),
+        (table, "units_sold", "integer"),
+        (table, "last_updated", "timestamp with time zone"),
+    ])
+    fake_s3 = FakeS3LoadingClient()
+    fake_s3.parquet[f"{table}/part-000.parquet"] = pd.DataFrame({
+        "sales_order_id": [1, 2, 1],
+        "created_date": ["2026-01-01"] * 3,
+        "units_sold": [5, 7, 6],
+        "last_updated": [ts, ts, ts + pd.Timedelta(minutes=5)],
+    })
+
+    svc = LoadService(processed_bucket="fake-processed", db=fake_db, fact_mode="merge")
+    svc.s3_client = fake_s3
+    monkeypatch.setattr("loading.load_service._CATALOG_CACHE", {})
+    monkeypatch.setattr("loading.load_service._CHECKPOINT_TABLE_READY", set())
+
+    res = svc.load_one_table(table)
+
+    assert res["mode"] == "merge"
+    assert res["rows"] == 3
+    assert res["rows_changed"] == {"inserted": 1, "updated": 1}
+
+    # batch is COPYed/inserted into staging, never straight into the fact
+    assert any(f'CREATE TEMP TABLE "_stg_{table}"' in s for s in fake_db.executed_sql)
+    assert fake_db.executemany_calls[0]["sql"].startswith(f'INSERT INTO "_stg_{table}"')
+
+    (upsert,) = fake_db.upserts
+    assert 'SELECT DISTINCT ON ("sales_order_id", "created_date")' in upsert
+    assert 'ORDER BY "sales_order_id", "created_date", "last_updated" DESC NULLS LAST' in upsert
+    assert 'ON CONFLICT ("sales_order_id", "created_date") DO UPDATE' in upsert
+    assert 'COALESCE(EXCLUDED."last_updated" >= t."last_updated", true)' in upsert
+
+
+def test_fact_merge_appends_when_key_is_generated_by_the_warehouse(monkeypatch):
+    table = "fact_purchase_order"
+
+    fake_db = FactMergeDB(columns=[(table, "purchase_order_id", "integer")])
+    fake_s3 = FakeS3LoadingClient()
+    fake_s3.parquet[f"{table}/part-000.parquet"] = pd.DataFrame({"purchase_order_id": [1, 2]})
+
+    svc = LoadService(processed_bucket="fake-processed", db=fake_db, fact_mode="merge")
+    svc.s3_client = fake_s3
+    monkeypatch.setattr("loading.load_service._CATALOG_CACHE", {})
+    monkeypatch.setattr("loading.load_service._CHECKPOINT_TABLE_READY", set())
+
+    res = svc.load_one_table(table)
+
+    assert res["mode"] == "append_no_watermark"
+    assert fake_db.upserts == []
+    assert fake_db.executemany_calls[0]["sql"].startswith(f'INSERT INTO "{table}"')
+
+
+def test_fact_rows_for_a_new_month_are_loaded_detached_then_attached(monkeypatch):
+    table = "fact_payment"
+
+    @dataclass
+    class PartitionedDB(FactMergeDB):
+        def fetchall(self, sql: str, params: Sequence[Any] = None) -> List[tuple]:
+            if "pg_class" in sql:
+                return [("p", "fact_payment_p2026_01")]
+            return super().fetchall(sql, params)
+
+    fake_db = PartitionedDB(columns=[(table, "payment_id", "integer"), (table, "payment_date", "date")])
+    fake_s3 = FakeS3LoadingClient()
+    fake_s3.parquet[f"{table}/part-000.parquet"] = pd.DataFrame({
+        "payment_id": [1, 2, 3],
+        "payment_date": ["2026-01-30", "2026-02-01", "2026-02-14"],
+    })
+
+    svc = LoadService(processed_bucket="fake-processed", db=fake_db)
+    svc.s3_client = fake_s3
+    monkeypatch.setattr("loading.load_service._CATALOG_CACHE", {})
+    monkeypatch.setattr("loading.load_service._CHECKPOINT_TABLE_READY", set())
+
+    res = svc.load_one_table(table)
+
+    assert res["rows"] == 3
+    assert res["partitions_attached"] == ["fact_payment_p2026_02"]
+
+    # existing month goes through the parent, the new month into its own table
+    parent, detached = fake_db.executemany_calls
+    assert parent["sql"].startswith('INSERT INTO "fact_payment"') and len(parent["params"]) == 1
+    assert detached["sql"].startswith('INSERT INTO "fact_payment_p2026_02"') and len(detached["params"]) == 2
+
+    sql = fake_db.executed_sql
+    create = sql.index(
+        'CREATE TABLE "fact_payment_p2026_02" '
+        '(LIKE "fact_payment" INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES);'
+    )
+    check = sql.index(
+        'ALTER TABLE "fact_payment_p2026_02" ADD CONSTRAINT "fact_payment_p2026_02_bounds" CHECK '
+        "(\"payment_date\" IS NOT NULL AND \"payment_date\" >= DATE '2026-02-01' AND \"payment_date\" < DATE '2026-03-01');"
+    )
+    attach = sql.index(
+        'ALTER TABLE "fact_payment" ATTACH PARTITION "fact_payment_p2026_02" '
+        "FOR VALUES FROM ('2026-02-01') TO ('2026-03-01');"
+    )
+    assert create < check < attach
+    # a partition another loader attached in the meantime is never dropped
+    assert not any(s.startswith("DROP TABLE") for s in sql)
+    assert sql[attach + 1] == 'ALTER TABLE "fact_payment_p2026_02" DROP CONSTRAINT "fact_payment_p2026_02_bounds";'
+
+
+def test_insert_values_batches_rows_under_parameter_limit(monkeypatch):
+    @dataclass
+    class ParamDB(FakeDB):
+        statements: List[Dict[str, Any]] = field(default_factory=list)
+
+        def execute(self, sql: str, params: Sequence[Any] = None) -> None:
+            self.statements.append({"sql": sql, "params": params})
+
+    monkeypatch.setattr("loading.load_service.MAX_BIND_PARAMS", 6)
+    df = pd.DataFrame([{"staff_id": i, "name": f"n{i}"} for i in range(7)])
+
+    db = ParamDB()
+    svc = LoadService(processed_bucket="fake-processed", db=db, insert_method="values")
+    assert svc._insert_df("dim_staff", df) == 7
+
+    # 2 columns -> 3 rows per statement -> 3 + 3 + 1
+    assert [len(s["params"]) for s in db.statements] == [6, 6, 2]
+    assert db.statements[0]["sql"] == (
+        'INSERT INTO "dim_staff" ("staff_id", "name") VALUES (%s, %s), (%s, %s), (%s, %s);'
+    )
+    assert db.statements[2]["params"] == [6, "n6"]
+    assert db.executemany_calls == []
+
+
+def test_fact_checkpoints_live_in_warehouse_and_are_written_once(monkeypatch):
+    @dataclass
+    class ControlDB(FakeDB):
+        selects: List[str] = field(default_factory=list)
+        statements: List[Dict[str, Any]] = field(default_factory=list)
+
+        def execute(self, sql: str, params: Sequence[Any] = None) -> None:
+            self.executed_sql.append(sql)
+            self.statements.append({"sql": sql, "params": params})
+
+        def fetchall(self, sql: str, params: Sequence[Any] = None) -> List[tuple]:
+            if "information_schema" in sql:
+                return [(t, "sales_order_id", "integer") for t in params[0]] + [
+                    (t, "last_updated", "timestamp with time zone") for t in params[0]
+                ]
+            if "pg_class" in sql:
+                return []  # facts not partitioned
+            self.selects.append(sql)
+            return [("fact_payment", {"loaded_keys": ["fact_payment/part-000.parquet"], "last_loaded_ts": None})]
+
+    monkeypatch.setattr("loading.load_service._CATALOG_CACHE", {})
+    monkeypatch.setattr("loading.load_service._CHECKPOINT_TABLE_READY", set())
+    monkeypatch.setattr(
+        "loading.load_service.CREATE_TABLE_SQL",
+        {
+            "fact_sales_order": "CREATE TABLE IF NOT EXISTS fact_sales_order (sales_order_id INT, last_updated TIMESTAMPTZ);",
+            "fact_payment": "CREATE TABLE IF NOT EXISTS fact_payment (sales_order_id INT, last_updated TIMESTAMPTZ);",
+        },
+    )
+
+    db = ControlDB()
+    fake_s3 = FakeS3LoadingClient()
+    for table in ("fact_sales_order", "fact_payment"):
+        fake_s3.parquet[f"{table}/part-001.parquet"] = pd.DataFrame(
+            [{"sales_order_id": 1, "last_updated": pd.Timestamp("2026-01-01T10:00:00Z")}]
+        )
+    # legacy S3 checkpoint, migrated on first read
+    fake_s3.s3.objects["_load_checkpoints/fact_sales_order.json"] = json.dumps(
+        {"last_loaded_key": "fact_sales_order/part-000.parquet", "last_loaded_ts": "2026-01-01T09:00:00Z"}
+    ).encode("utf-8")
+
+    svc = LoadService(processed_bucket="fake-processed", db=db)
+    svc.s3_client = fake_s3
+    monkeypatch.setattr(svc, "_discover_tables_from_s3", lambda: ["fact_payment", "fact_sales_order"])
+
+    res = svc.load_all_tables()
+
+    assert [r["rows"] for r in res["tables"]] == [1, 1]
+    assert len(db.selects) == 1  # one checkpoint read for the run
+
+    # one advisory lock per table, in name order, before anything is loaded
+    locks = db.statements[:2]
+    assert all(lock["sql"] == "SELECT pg_advisory_xact_lock(%s, hashtext(%s));" for lock in locks)
+    assert [lock["params"][1] for lock in locks] == ["fact_payment", "fact_sales_order"]
+
+    upserts = [s for s in db.statements if s["sql"].startswith('INSERT INTO "_load_checkpoints"')]
+    assert len(upserts) == 1
+    params = upserts[0]["params"]
+    assert params[0::2] == ["fact_payment", "fact_sales_order"]
+    assert json.loads(params[3])["last_loaded_key"] == "fact_sales_order/part-001.parquet"
+
+    # nothing written back to S3
+    assert list(fake_s3.s3.objects) == ["_load_checkpoints/fact_sales_order.json"]
+
+
+def test_unknown_dim_mode_is_rejected():
+    with pytest.raises(ValueError):
+        LoadService(processed_bucket="fake-processed", db=FakeDB(), dim_mode="replace")
+
+
+
 
 # from __future__ import annotations
 
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from loading.key_map import DimensionKeyMap
+from loading.load_service import LoadService
+
+
+def test_lookup_is_vectorized_and_unknown_ids_map_to_null():
+    key_map = DimensionKeyMap()
+    key_map.update([(30, 3), (10, 1), (20, 2)])
+
+    keys, missing = key_map.lookup(pd.Series([20, 10, 99, None, 30], dtype=object))
+
+    assert keys.tolist() == [2, 1, pd.NA, pd.NA, 3]
+    assert missing.tolist() == [False, False, True, False, False]  # NULL is not a miss
+    assert key_map.high_water == 3
+
+
+def test_incremental_update_keeps_the_newest_key_per_natural_id():
+    key_map = DimensionKeyMap()
+    key_map.update([(10, 1), (20, 2)])
+    key_map.update([(20, 5), (40, 4)])
+
+    assert key_map.natural.tolist() == [10, 20, 40]
+    assert key_map.surrogate.tolist() == [1, 5, 4]
+    assert key_map.high_water == 5
+
+    keys, _ = DimensionKeyMap().lookup(pd.Series([1, 2]))
+    assert keys.isna().all()
+
+
+@dataclass
+class KeyDB:
+    members: List[tuple] = field(default_factory=list)
+    queries: List[tuple] = field(default_factory=list)
+
+    def fetchall(self, sql: str, params: Sequence[Any] = None) -> List[tuple]:
+        self.queries.append((sql, params))
+        floor = params[0] if params else 0
+        return [(natural, key) for natural, key in self.members if key > floor]
+
+
+def test_fact_keys_resolve_through_cached_maps_refreshed_incrementally(monkeypatch):
+    monkeypatch.setattr("loading.load_service._KEY_MAPS", {})
+    monkeypatch.setattr(
+        "loading.load_service.FACT_DIMENSION_KEYS",
+        {"fact_payment": [("currency_id", "dim_currency", "currency_key")]},
+    )
+
+    db = KeyDB(members=[(1, 100), (2, 101)])
+    svc = LoadService(processed_bucket="fake-processed", db=db, dim_mode="merge")
+
+    df, unknown = svc.resolve_surrogate_keys("fact_payment", pd.DataFrame({"currency_id": [2, 1, 3]}))
+    assert df["currency_key"].tolist() == [101, 100, None]
+    assert unknown == 1
+    # the miss re-checks the dim once for members added since the map was read
+    assert db.queries == [
+        ('SELECT "currency_id", "currency_key" FROM "dim_currency" WHERE "currency_key" IS NOT NULL;', None),
+        ('SELECT "currency_id", "currency_key" FROM "dim_currency" WHERE "currency_key" > %s;', [101]),
+    ]
+
+    # cached for the rest of the run
+    svc.resolve_surrogate_keys("fact_payment", pd.DataFrame({"currency_id": [2]}))
+    assert len(db.queries) == 2
+
+    # a member merged by another loader is picked up by the refresh on the miss
+    db.members.append((3, 102))
+    df, unknown = svc.resolve_surrogate_keys("fact_payment", pd.DataFrame({"currency_id": [3]}))
+    assert df["currency_key"].to_numpy().tolist() == [102]
+    assert unknown == 0
+    assert db.queries[-1] == ('SELECT "currency_id", "currency_key" FROM "dim_currency" WHERE "currency_key" > %s;', [101])
+
+    # a new service in the same container reuses the map
+    svc = LoadService(processed_bucket="fake-processed", db=db, dim_mode="merge")
+    svc.resolve_surrogate_keys("fact_payment", pd.DataFrame({"currency_id": [1]}))
+    assert db.queries[-1][1] == [102]
+    assert np.array_equal(
+        svc.resolve_surrogate_keys("fact_payment", pd.DataFrame({"currency_id": [1, 2, 3]}))[0]["currency_key"],
+        [100, 101, 102],
+    )
+
+
+def test_key_columns_left_null_by_a_non_merge_dim_mode_are_reported(monkeypatch, caplog):
+    monkeypatch.setattr(
+        "loading.load_service._CATALOG_CACHE",
+        {(None, None, None): {"fact_payment": {"currency_id": "integer", "currency_key": "bigint"}}},
+    )
+    monkeypatch.setattr(
+        "loading.load_service.FACT_DIMENSION_KEYS",
+        {"fact_payment": [("currency_id", "dim_currency", "currency_key")]},
+    )
+    svc = LoadService(processed_bucket="fake-processed", db=KeyDB(), dim_mode="snapshot")
+
+    with caplog.at_level("WARNING", logger="loading.load_service"):
+        assert svc._resolves_surrogate_keys("fact_payment") is False
+        assert svc._resolves_surrogate_keys("fact_payment") is False
+
+    warnings = [r for r in caplog.records if "left NULL" in r.getMessage()]
+    assert len(warnings) == 1
+    assert "dim_mode=snapshot" in warnings[0].getMessage()
+    assert LoadService(processed_bucket="fake-processed", db=KeyDB(), dim_mode="merge")._resolves_surrogate_keys("fact_payment")
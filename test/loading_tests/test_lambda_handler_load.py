@@ -0,0 +1,91 @@
+import json
+
+import loading.lambda_handler_load as lh
+
+
+class FakeWarehouseDBClient:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+def _s3_record(key):
+    return {"eventSource": "aws:s3", "s3": {"object": {"key": key}}}
+
+
+def _patch_service(monkeypatch, calls, failing=()):
+    class FakeLoadService:
+        def __init__(self, **kwargs):
+            calls["init"] = kwargs
+
+        def load_tables(self, tables):
+            calls["load_tables"] = tables
+            return {
+                "tables": [
+                    {"table": t, "status": "error" if t in failing else "loaded"} for t in tables
+                ],
+                "consistent": not failing,
+            }
+
+        def load_all_tables(self):
+            calls["load_all_tables"] = True
+            return {"tables": []}
+
+    monkeypatch.setenv("PROCESSED_BUCKET_NAME", "processed")
+    monkeypatch.setattr(lh, "WarehouseDBClient", FakeWarehouseDBClient)
+    monkeypatch.setattr(lh, "LoadService", FakeLoadService)
+
+
+def test_s3_event_loads_only_the_tables_it_touches(monkeypatch):
+    calls = {}
+    _patch_service(monkeypatch, calls)
+
+    event = {"Records": [
+        _s3_record("fact_sales_order/year=2024/month=01/day=01/processed_x.parquet"),
+        _s3_record("fact_sales_order/year=2024/month=01/day=02/processed_x.parquet"),
+        _s3_record("dim_date/processed_x.parquet"),
+        _s3_record("_index/dim_date.json"),
+    ]}
+
+    resp = lh.lambda_handler(event, None)
+
+    assert resp["statusCode"] == 200
+    assert calls["load_tables"] == ["dim_date", "fact_sales_order"]
+    assert "load_all_tables" not in calls
+    body = json.loads(resp["body"])["result"]
+    assert body["records"] == 4
+    assert body["coalesced"] == 2
+
+
+def test_sqs_batch_reports_only_failed_tables_messages(monkeypatch):
+    calls = {}
+    _patch_service(monkeypatch, calls, failing={"fact_payment"})
+
+    def sqs(message_id, key):
+        return {
+            "eventSource": "aws:sqs",
+            "messageId": message_id,
+            "body": json.dumps({"Records": [{"s3": {"object": {"key": key}}}]}),
+        }
+
+    event = {"Records": [
+        sqs("m1", "fact_payment/year=2024/month=01/day=01/delta_x.parquet"),
+        sqs("m2", "dim_staff/processed_x.parquet"),
+    ]}
+
+    resp = lh.lambda_handler(event, None)
+
+    assert resp["statusCode"] == 500
+    assert resp["batchItemFailures"] == [{"itemIdentifier": "m1"}]
+
+
+def test_control_objects_alone_do_not_open_the_warehouse(monkeypatch):
+    calls = {}
+    _patch_service(monkeypatch, calls)
+
+    resp = lh.lambda_handler({"Records": [_s3_record("_load_checkpoints/fact_payment.json")]}, None)
+
+    assert resp["statusCode"] == 200
+    assert calls == {}
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import pytest
+
+from loading.load_service import LoadService, dependency_levels, table_dependencies
+
+
+@dataclass
+class FakeConnDB:
+    name: str
+    events: List[str] = field(default_factory=list)
+
+    def __enter__(self) -> "FakeConnDB":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.events.append("rollback" if exc_type else "commit")
+
+
+def test_dependency_levels_follow_foreign_keys_in_ddl():
+    deps = table_dependencies()
+    assert deps["fact_payment"] == {"dim_counterparty", "dim_currency", "dim_payment_type"}
+    assert deps["dim_staff"] == set()
+
+    levels = dependency_levels(["fact_payment", "dim_currency", "dim_counterparty", "dim_payment_type", "dim_date"])
+    assert levels == [["dim_counterparty", "dim_currency", "dim_date", "dim_payment_type"], ["fact_payment"]]
+
+
+def test_dependency_levels_rejects_cycles():
+    ddl = {
+        "a": "CREATE TABLE a (x INT REFERENCES b(x));",
+        "b": "CREATE TABLE b (x INT REFERENCES a(x));",
+    }
+    with pytest.raises(ValueError):
+        dependency_levels(["a", "b"], ddl)
+
+
+def test_parallel_load_commits_per_table_and_skips_dependents_of_failures(monkeypatch):
+    tables = ["dim_counterparty", "dim_currency", "dim_payment_type", "dim_staff", "fact_payment"]
+    connections: List[FakeConnDB] = []
+    loaded: Dict[str, Any] = {}
+    lock = threading.Lock()
+
+    def factory() -> FakeConnDB:
+        with lock:
+            db = FakeConnDB(name=f"conn-{len(connections)}")
+            connections.append(db)
+            return db
+
+    def fake_load_one_table(self, table: str) -> Dict[str, Any]:
+        if table == "dim_currency":
+            raise RuntimeError("boom")
+        with lock:
+            loaded[table] = self.db
+        return {"table": table, "status": "loaded"}
+
+    svc = LoadService(processed_bucket="fake-processed", db=None, db_factory=factory, max_workers=3)
+    monkeypatch.setattr(svc, "_discover_tables_from_s3", lambda: tables)
+    monkeypatch.setattr(LoadService, "load_one_table", fake_load_one_table)
+
+    res = svc.load_all_tables()
+
+    assert res["consistent"] is False
+    by_table = {r["table"]: r for r in res["tables"]}
+    assert by_table["dim_currency"]["status"] == "error"
+    assert by_table["fact_payment"] == {
+        "table": "fact_payment",
+        "status": "skipped",
+        "reason": "dependency_failed",
+        "dependencies": ["dim_currency"],
+    }
+    assert sorted(loaded) == ["dim_counterparty", "dim_payment_type", "dim_staff"]
+
+    # one connection (and one commit/rollback) per attempted table, never the shared db
+    assert len(connections) == 4
+    assert sorted(e for db in connections for e in db.events) == ["commit"] * 3 + ["rollback"]
+    assert svc.db is None
@@ -0,0 +1,177 @@
+from datetime import date, datetime, timezone
+from io import BytesIO
+
+import boto3
+import numpy as np
+import pandas as pd
+from moto import mock_aws
+
+from loading.s3_client_load import S3LoadingClient
+
+
+def _put_parquet(s3, key, df):
+    buffer = BytesIO()
+    df.to_parquet(buffer, index=False)
+    s3.put_object(Bucket="processed", Key=key, Body=buffer.getvalue())
+
+
+@mock_aws
+def test_list_parquet_keys_prunes_partitions_by_date_range():
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="processed")
+    for day in ("01", "02", "03"):
+        _put_parquet(
+            s3,
+            f"fact_payment/year=2024/month=01/day={day}/processed_x.parquet",
+            pd.DataFrame({"payment_id": [int(day)]}),
+        )
+    _put_parquet(s3, "fact_payment/processed_legacy.parquet", pd.DataFrame({"payment_id": [99]}))
+
+    client = S3LoadingClient(bucket="processed")
+
+    assert len(client.list_parquet_keys("fact_payment")) == 4
+
+    pruned = client.list_parquet_keys("fact_payment", start_date=date(2024, 1, 2), end_date=date(2024, 1, 3))
+    assert sorted(pruned) == [
+        "fact_payment/year=2024/month=01/day=02/processed_x.parquet",
+        "fact_payment/year=2024/month=01/day=03/processed_x.parquet",
+    ]
+
+    df = client.read_partitions_to_df("fact_payment", start_date=date(2024, 1, 3))
+    assert list(df["payment_id"]) == [3]
+
+
+@mock_aws
+def test_iter_parquet_batches_streams_row_groups_with_ranged_gets(monkeypatch):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="processed")
+    rng = np.random.default_rng(0)
+    # ~160KB per row group, so row groups are not covered by the footer prefetch
+    df = pd.DataFrame({
+        "payment_id": np.arange(30_000),
+        "amount": rng.random(30_000),
+        "rate": rng.random(30_000),
+    })
+    buffer = BytesIO()
+    df.to_parquet(buffer, index=False, row_group_size=10_000)
+    s3.put_object(Bucket="processed", Key="fact_payment/processed_x.parquet", Body=buffer.getvalue())
+
+    client = S3LoadingClient(bucket="processed")
+    ranges = []
+    get_object = client.s3.get_object
+
+    def counting_get_object(**kwargs):
+        ranges.append(kwargs.get("Range"))
+        return get_object(**kwargs)
+
+    monkeypatch.setattr(client.s3, "get_object", counting_get_object)
+
+    batches = list(client.iter_parquet_batches("fact_payment/processed_x.parquet", columns=["payment_id", "amount"]))
+
+    assert [len(batch) for batch in batches] == [10_000, 10_000, 10_000]
+    assert list(batches[0].columns) == ["payment_id", "amount"]
+    assert pd.concat(batches, ignore_index=True).equals(df[["payment_id", "amount"]])
+    # one footer GET + one GET per row group, all ranged
+    assert len(ranges) == 4
+    assert all(r.startswith("bytes=") for r in ranges)
+
+
+@mock_aws
+def test_iter_parquet_batches_skips_row_groups_at_or_below_watermark():
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="processed")
+    df = pd.DataFrame({
+        "payment_id": range(6),
+        "last_updated": pd.date_range("2024-01-01", periods=6, freq="h", tz="UTC"),
+    })
+    buffer = BytesIO()
+    df.to_parquet(buffer, index=False, row_group_size=2)
+    s3.put_object(Bucket="processed", Key="fact_payment/processed_x.parquet", Body=buffer.getvalue())
+
+    client = S3LoadingClient(bucket="processed")
+    # row groups end at 01:00, 03:00, 05:00 -> the first two are entirely <= 03:00
+    batches = list(client.iter_parquet_batches(
+        "fact_payment/processed_x.parquet",
+        skip_until=("last_updated", datetime(2024, 1, 1, 3, tzinfo=timezone.utc)),
+    ))
+
+    assert [list(batch["payment_id"]) for batch in batches] == [[4, 5]]
+
+
+@mock_aws
+def test_list_output_keys_reads_index_and_only_lists_without_one(monkeypatch):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="processed")
+    _put_parquet(s3, "dim_staff/processed_1.parquet", pd.DataFrame({"staff_id": [1]}))
+    _put_parquet(s3, "dim_staff/processed_2.parquet", pd.DataFrame({"staff_id": [2]}))
+
+    client = S3LoadingClient(bucket="processed")
+
+    # no index yet: listed, and the loader never writes one
+    assert client.list_output_keys("dim_staff") == ["dim_staff/processed_1.parquet", "dim_staff/processed_2.parquet"]
+    assert client.read_index("dim_staff") is None
+
+    # with an index (written by the transform): no listing at all
+    def no_listing(*args, **kwargs):
+        raise AssertionError("listed the table prefix")
+
+    monkeypatch.setattr(client, "list_parquet_keys", no_listing)
+    s3.put_object(Bucket="processed", Key="_index/dim_staff.json", Body=b'{"keys": ["dim_staff/processed_2.parquet"]}')
+    assert client.list_output_keys("dim_staff") == ["dim_staff/processed_2.parquet"]
+
+
+@mock_aws
+def test_fact_load_fetches_only_the_warehouse_columns(monkeypatch):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="processed")
+    _put_parquet(s3, "fact_payment/processed_x.parquet", pd.DataFrame({
+        "payment_id": [1, 2],
+        "payment_amount": [1.5, 2.5],
+        "debug_blob": ["x" * 1000, "y" * 1000],
+    }))
+
+    from loading.load_service import LoadService
+
+    class CatalogDB:
+        host, port, database = "warehouse", 5432, "dw"
+
+        def __init__(self):
+            self.executemany_calls = []
+
+        def execute(self, sql, params=None):
+            pass
+
+        def executemany(self, sql, params, chunk_size=1000):
+            self.executemany_calls.append(sql)
+
+        def fetchall(self, sql, params=None):
+            return []
+
+    monkeypatch.setattr("loading.load_service.CREATE_TABLE_SQL", {"fact_payment": "CREATE TABLE fact_payment ();"})
+    monkeypatch.setattr("loading.load_service.ADD_COLUMNS", {})
+    monkeypatch.setattr("loading.load_service._CHECKPOINT_TABLE_READY", set())
+    monkeypatch.setattr(
+        "loading.load_service._CATALOG_CACHE",
+        {("warehouse", 5432, "dw"): {"fact_payment": {"payment_id": "integer", "payment_amount": "numeric", "last_updated": "timestamp with time zone"}}},
+    )
+
+    db = CatalogDB()
+    svc = LoadService(processed_bucket="processed", db=db, insert_method="executemany")
+    client = S3LoadingClient(bucket="processed")
+    svc.s3_client = client
+    projections = []
+    iter_parquet_batches = client.iter_parquet_batches
+
+    def recording_iter(key, columns=None, skip_until=None):
+        for batch in iter_parquet_batches(key, columns=columns, skip_until=skip_until):
+            projections.append(list(batch.columns))
+            yield batch
+
+    monkeypatch.setattr(client, "iter_parquet_batches", recording_iter)
+
+    result = svc.load_one_table("fact_payment")
+
+    assert result["rows"] == 2
+    # last_updated is not in this older file; debug_blob is not in the warehouse
+    assert projections == [["payment_id", "payment_amount"]]
+    assert "debug_blob" not in db.executemany_calls[0]
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+
+import pandas as pd
+import pytest
+
+from loading.load_service import LoadService
+
+
+@dataclass
+class CatalogDB:
+    # minimal warehouse: tables -> columns, answers the information_schema query
+    tables: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    executed_sql: List[str] = field(default_factory=list)
+    catalog_queries: int = 0
+    host: str = "warehouse"
+    port: int = 5432
+    database: str = "dw"
+
+    def execute(self, sql: str, params: Sequence[Any] = None) -> None:
+        self.executed_sql.append(sql)
+        if sql.startswith("DO $bootstrap$"):
+            if "CREATE TABLE IF NOT EXISTS dim_staff" in sql:
+                self.tables["dim_staff"] = {"staff_id": "integer", "first_name": "text"}
+            if "CREATE TABLE IF NOT EXISTS fact_payment" in sql:
+                self.tables["fact_payment"] = {"payment_id": "integer", "last_updated": "timestamp with time zone"}
+
+    def fetchall(self, sql: str, params: Sequence[Any] = None) -> List[tuple]:
+        assert "information_schema.columns" in sql
+        self.catalog_queries += 1
+        (wanted,) = params
+        return [
+            (table, column, data_type)
+            for table in wanted if table in self.tables
+            for column, data_type in self.tables[table].items()
+        ]
+
+
+@pytest.fixture
+def ddl(monkeypatch):
+    monkeypatch.setattr("loading.load_service._CATALOG_CACHE", {})
+    monkeypatch.setattr(
+        "loading.load_service.CREATE_TABLE_SQL",
+        {
+            "fact_payment": "CREATE TABLE IF NOT EXISTS fact_payment (payment_id INT, staff_id INT REFERENCES dim_staff(staff_id));",
+            "dim_staff": "CREATE TABLE IF NOT EXISTS dim_staff (staff_id INT PRIMARY KEY, first_name TEXT);",
+        },
+    )
+    monkeypatch.setattr("loading.load_service.ADD_COLUMNS", {"fact_payment": {"last_updated": "TIMESTAMPTZ"}})
+
+
+def test_missing_tables_are_bootstrapped_in_one_batch_and_catalog_is_cached(ddl):
+    db = CatalogDB()
+    svc = LoadService(processed_bucket="fake-processed", db=db)
+
+    svc.create_table_if_not_exists("dim_staff", pd.DataFrame(columns=["staff_id", "first_name"]))
+
+    (bootstrap,) = db.executed_sql
+    assert bootstrap.startswith("DO $bootstrap$")
+    # referenced table first
+    assert bootstrap.index("dim_staff (") < bootstrap.index("fact_payment (")
+    assert db.catalog_queries == 2  # initial read + one re-read after the bootstrap
+
+    # warm: no DDL and no catalog query, even from a new service instance
+    svc = LoadService(processed_bucket="fake-processed", db=db)
+    svc.create_table_if_not_exists("fact_payment", pd.DataFrame(columns=["payment_id"]))
+    svc.create_table_if_not_exists("dim_staff", pd.DataFrame(columns=["staff_id"]))
+    assert len(db.executed_sql) == 1
+    assert db.catalog_queries == 2
+
+
+def test_existing_tables_only_get_missing_added_columns(ddl):
+    db = CatalogDB(tables={
+        "dim_staff": {"staff_id": "integer", "first_name": "text"},
+        "fact_payment": {"payment_id": "integer"},
+    })
+    svc = LoadService(processed_bucket="fake-processed", db=db)
+
+    svc.create_table_if_not_exists("dim_staff", pd.DataFrame(columns=["staff_id"]))
+
+    (bootstrap,) = db.executed_sql
+    assert "CREATE TABLE" not in bootstrap
+    assert 'ALTER TABLE "fact_payment" ADD COLUMN IF NOT EXISTS "last_updated" TIMESTAMPTZ;' in bootstrap
+
+
+def test_schema_drift_is_detected_from_the_cache(ddl):
+    db = CatalogDB(tables={
+        "dim_staff": {"staff_id": "integer", "first_name": "text"},
+        "fact_payment": {"payment_id": "integer", "last_updated": "timestamp with time zone"},
+    })
+    svc = LoadService(processed_bucket="fake-processed", db=db)
+    svc.create_table_if_not_exists("dim_staff", pd.DataFrame(columns=["staff_id", "first_name"]))
+
+    with pytest.raises(ValueError, match="nickname"):
+        svc.create_table_if_not_exists("dim_staff", pd.DataFrame(columns=["staff_id", "nickname"]))
+
+    assert db.executed_sql == []
+    assert db.catalog_queries == 1
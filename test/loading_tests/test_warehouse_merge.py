@@ -0,0 +1,136 @@
+import pandas as pd
+import pytest
+
+from loading.db_client_load import WarehouseDBClient
+from loading.load_service import LoadService
+
+
+def _payments(rows):
+    df = pd.DataFrame(rows, columns=["payment_id", "payment_date", "payment_amount", "last_updated"])
+    return df.assign(
+        transaction_id=1,
+        counterparty_id=1,
+        currency_id=1,
+        payment_type_id=1,
+        paid=False,
+        payment_date=pd.to_datetime(df["payment_date"]).dt.date,
+        last_updated=pd.to_datetime(df["last_updated"], utc=True),
+    )
+
+
+def _load_payments(df):
+    with WarehouseDBClient() as db:
+        service = LoadService(processed_bucket=None, db=db, fact_mode="merge")
+        return service.load_frames({"fact_payment": df})["tables"][0]
+
+
+def _seed_dimensions():
+    with WarehouseDBClient() as db:
+        LoadService(processed_bucket=None, db=db).ensure_schema()
+        db.execute("INSERT INTO dim_counterparty (counterparty_id, counterparty_legal_name) VALUES (1, 'Acme');")
+        db.execute("INSERT INTO dim_currency (currency_id, currency_code) VALUES (1, 'GBP');")
+        db.execute("INSERT INTO dim_payment_type (payment_type_id, payment_type_name) VALUES (1, 'SALES_RECEIPT');")
+
+
+def test_fact_merge_counts_inserts_and_updates_through_a_partitioned_parent(warehouse_db):
+    _seed_dimensions()
+
+    first = _load_payments(_payments([
+        (1, "2026-01-10", 10.0, "2026-01-10 09:00"),
+        (2, "2026-02-03", 20.0, "2026-02-03 09:00"),
+    ]))
+    assert first["partitions_attached"] == ["fact_payment_p2026_01", "fact_payment_p2026_02"]
+    assert first["rows_changed"] == {"inserted": 2, "updated": 0}
+
+    # both months exist now: the upsert goes through the partitioned parent
+    batch = _payments([
+        (1, "2026-01-10", 11.0, "2026-01-11 09:00"),
+        (3, "2026-01-20", 30.0, "2026-01-20 09:00"),
+        (2, "2026-02-03", 19.0, "2026-01-01 09:00"),  # older version: ignored
+    ])
+    second = _load_payments(batch)
+    assert "partitions_attached" not in second
+    assert second["rows_changed"] == {"inserted": 1, "updated": 1}
+
+    assert _load_payments(batch)["rows_changed"] == {"inserted": 0, "updated": 0}
+
+    with WarehouseDBClient() as db:
+        rows = db.fetchall("SELECT payment_id, payment_amount FROM fact_payment ORDER BY payment_id;")
+        partitions = db.fetchall(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'fact_payment'::regclass ORDER BY 1;"
+        )
+    assert [(pid, float(amount)) for pid, amount in rows] == [(1, 11.0), (2, 20.0), (3, 30.0)]
+    assert [name for (name,) in partitions] == ["fact_payment_p2026_01", "fact_payment_p2026_02"]
+
+
+def test_dim_merge_against_the_warehouse_ddl(warehouse_db):
+    def load(df):
+        with WarehouseDBClient() as db:
+            service = LoadService(processed_bucket=None, db=db, dim_mode="merge")
+            return service.load_frames({"dim_currency": df})["tables"][0]
+
+    first = load(pd.DataFrame({"currency_id": [1, 2, 3], "currency_code": ["GBP", "USD", "EUR"]}))
+    assert first["rows_changed"] == {"inserted": 3, "updated": 0, "deleted": 0}
+
+    second = load(pd.DataFrame({"currency_id": [1, 2, 4], "currency_code": ["GBP", "usd", "JPY"]}))
+    assert second["rows_changed"] == {"inserted": 1, "updated": 1, "deleted": 1}
+
+    with WarehouseDBClient() as db:
+        rows = db.fetchall("SELECT currency_id, currency_key, currency_code FROM dim_currency ORDER BY currency_id;")
+    assert [(cid, code) for cid, _, code in rows] == [(1, "GBP"), (2, "usd"), (4, "JPY")]
+    # surrogate keys come from the identity column and survive updates
+    keys = {cid: key for cid, key, _ in rows}
+    assert keys[1] == 1 and keys[2] == 2 and keys[4] > 3
+
+
+def test_second_loader_of_a_table_waits_for_the_first(warehouse_db):
+    df = pd.DataFrame({"currency_id": [1], "currency_code": ["GBP"]})
+
+    with WarehouseDBClient() as first:
+        LoadService(processed_bucket=None, db=first, dim_mode="merge")._lock_tables(["dim_currency"])
+
+        with pytest.raises(Exception, match="lock timeout"):
+            with WarehouseDBClient() as second:
+                second.execute("SET lock_timeout = '200ms';")
+                LoadService(processed_bucket=None, db=second, dim_mode="merge").load_frames({"dim_currency": df})
+
+    # released with the first transaction
+    with WarehouseDBClient() as db:
+        result = LoadService(processed_bucket=None, db=db, dim_mode="merge").load_frames({"dim_currency": df})
+    assert result["tables"][0]["rows_changed"]["inserted"] == 1
+
+
+def test_swap_in_a_multi_table_load_does_not_commit_the_other_tables(warehouse_db):
+    _seed_dimensions()
+    frames = {
+        "dim_currency": pd.DataFrame({"currency_id": [1, 2], "currency_code": ["GBP", "USD"]}),
+        "fact_payment": _payments([(1, "2026-01-10", 10.0, "2026-01-10 09:00")]),
+        # loaded after fact_payment and rejected by its NOT NULL columns
+        "fact_sales_order": pd.DataFrame({"sales_order_id": [1], "created_date": [pd.Timestamp("2026-01-10").date()]}),
+    }
+
+    commits = []
+    with pytest.raises(Exception, match="null value"):
+        with WarehouseDBClient() as db:
+            commit = db.commit
+            db.commit = lambda: (commits.append(True), commit())
+            service = LoadService(processed_bucket=None, db=db, dim_mode="swap", db_factory=WarehouseDBClient)
+            service.load_frames(frames)
+
+    # nothing was committed on the shared connection
+    assert commits == []
+
+    with WarehouseDBClient() as db:
+        currencies = db.fetchall("SELECT currency_id, currency_code FROM dim_currency ORDER BY 1;")
+        payments = db.fetchall("SELECT count(*) FROM fact_payment;")
+    # the swap committed on its own connection; the fact loaded before the failure rolled back
+    assert [tuple(row) for row in currencies] == [(1, "GBP"), (2, "USD")]
+    assert payments[0][0] == 0
+
+
+def test_swap_refuses_a_shared_transaction_without_db_factory():
+    service = LoadService(processed_bucket=None, db=object(), dim_mode="swap")
+
+    with pytest.raises(ValueError, match="db_factory"):
+        service.load_frames({"dim_currency": pd.DataFrame({"currency_id": [1]}), "fact_payment": pd.DataFrame()})
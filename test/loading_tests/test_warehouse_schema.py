@@ -0,0 +1,18 @@
+from loading.db_client_load import WarehouseDBClient
+from loading.load_service import LoadService
+from transformation.validation import OUTPUT_CONTRACTS
+
+
+def test_warehouse_ddl_has_every_transform_output_column(warehouse_db):
+    with WarehouseDBClient() as db:
+        catalog = LoadService(processed_bucket=None, db=db).ensure_schema()
+        live = {}
+        for table, column in db.fetchall(
+            "SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = 'public';"
+        ):
+            live.setdefault(table, set()).add(column)
+
+    for output, contract in OUTPUT_CONTRACTS.items():
+        missing = sorted(set(contract["columns"]) - live.get(output, set()))
+        assert not missing, f"{output} columns missing from the warehouse DDL: {missing}"
+        assert set(contract["columns"]) <= set(catalog[output])
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+import local_pipeline.backfill as backfill
+from local_pipeline.backfill import make_windows, run_backfill, window_id
+from transformation.transform_service import TransformService, build_dim_date
+
+
+def _sources(days):
+    rows = lambda cols: pd.DataFrame({col: days for col in cols})
+    return {
+        "payment": rows(["created_at", "last_updated", "payment_date"]),
+        "sales_order": rows(["created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date"]),
+        "purchase_order": rows(["created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date"]),
+    }
+
+
+def test_windows_cover_the_range_without_overlap():
+    windows = make_windows(datetime(2024, 1, 1), datetime(2024, 3, 1), days=25)
+
+    assert windows[0][0] == datetime(2024, 1, 1)
+    assert windows[-1][1] == datetime(2024, 3, 1)
+    assert all(a[1] == b[0] for a, b in zip(windows, windows[1:]))
+    assert len(windows) == 3
+
+
+def test_dim_date_from_window_days_matches_a_full_build():
+    first = ["2024-01-03 10:00:00", "2024-01-01 09:00:00"]
+    second = ["2024-02-10 08:30:00", "2024-01-03 23:00:00"]
+
+    full = TransformService(None, None, mode="full")
+    full._cache.update(_sources(first + second))
+
+    per_window = []
+    for days in (second, first):  # windows finish in any order
+        service = TransformService(None, None, mode="full")
+        service._cache.update(_sources(days))
+        per_window.extend(day.date().isoformat() for day in service.source_dates())
+
+    from_windows = build_dim_date(pd.to_datetime(pd.Series(per_window), utc=True))
+    pd.testing.assert_frame_equal(
+        from_windows.reset_index(drop=True), full.make_dim_date().reset_index(drop=True)
+    )
+
+
+def test_backfill_records_progress_and_resumes_failed_windows(monkeypatch, tmp_path):
+    monkeypatch.setattr(backfill, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(backfill, "load_dimensions", lambda insert_method: {"loaded": {"dim_staff": 2}})
+    dim_date_days = []
+    monkeypatch.setattr(
+        backfill, "load_dim_date", lambda days, insert_method: dim_date_days.append(sorted(set(days))) or {}
+    )
+
+    failing = {"2024-01-11T00:00:00"}
+    calls = []
+
+    def fake_window(start, end, insert_method):
+        calls.append(start)
+        if start in failing:
+            raise RuntimeError("warehouse went away")
+        return {"loaded": {"fact_payment": 1}, "days": [start[:10]]}
+
+    monkeypatch.setattr(backfill, "run_window", fake_window)
+    progress = str(tmp_path / "progress.json")
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 21)
+
+    first = run_backfill(start, end, window_days=10, workers=2, progress_path=progress)
+    assert first["failed"] == ["2024-01-11T00:00:00/2024-01-21T00:00:00"]
+    assert "dim_date" not in first["ran"]
+    steps = json.load(open(progress))["steps"]
+    assert steps["dimensions"]["status"] == "done"
+    assert steps[window_id((start, datetime(2024, 1, 11)))]["status"] == "done"
+    assert steps["2024-01-11T00:00:00/2024-01-21T00:00:00"]["status"] == "error"
+
+    failing.clear()
+    calls.clear()
+    second = run_backfill(start, end, window_days=10, workers=2, progress_path=progress)
+    assert calls == ["2024-01-11T00:00:00"]
+    assert second["ran"] == ["2024-01-11T00:00:00/2024-01-21T00:00:00", "dim_date"]
+    assert second["failed"] == []
+    assert dim_date_days == [["2024-01-01", "2024-01-11"]]
+
+    # nothing left to do
+    assert run_backfill(start, end, window_days=10, workers=2, progress_path=progress)["ran"] == []
+
+
+SOURCE_DDL = """
+CREATE TABLE currency (currency_id INT PRIMARY KEY, currency_code TEXT, created_at TIMESTAMP, last_updated TIMESTAMP);
+CREATE TABLE department (department_id INT PRIMARY KEY, department_name TEXT, location TEXT,
+    created_at TIMESTAMP, last_updated TIMESTAMP);
+CREATE TABLE staff (staff_id INT PRIMARY KEY, first_name TEXT, last_name TEXT, department_id INT, email_address TEXT,
+    created_at TIMESTAMP, last_updated TIMESTAMP);
+CREATE TABLE address (address_id INT PRIMARY KEY, address_line_1 TEXT, address_line_2 TEXT, district TEXT, city TEXT,
+    postal_code TEXT, country TEXT, phone TEXT, created_at TIMESTAMP, last_updated TIMESTAMP);
+CREATE TABLE counterparty (counterparty_id INT PRIMARY KEY, counterparty_legal_name TEXT, legal_address_id INT,
+    created_at TIMESTAMP, last_updated TIMESTAMP);
+CREATE TABLE design (design_id INT PRIMARY KEY, design_name TEXT, file_location TEXT, file_name TEXT,
+    created_at TIMESTAMP, last_updated TIMESTAMP);
+CREATE TABLE payment_type (payment_type_id INT PRIMARY KEY, payment_type_name TEXT,
+    created_at TIMESTAMP, last_updated TIMESTAMP);
+CREATE TABLE transaction (transaction_id INT PRIMARY KEY, transaction_type TEXT, sales_order_id INT,
+    purchase_order_id INT, created_at TIMESTAMP, last_updated TIMESTAMP);
+CREATE TABLE sales_order (sales_order_id INT PRIMARY KEY, created_at TIMESTAMP, last_updated TIMESTAMP, design_id INT,
+    staff_id INT, counterparty_id INT, units_sold INT, unit_price NUMERIC(10, 2), currency_id INT,
+    agreed_delivery_date TEXT, agreed_payment_date TEXT, agreed_delivery_location_id INT);
+CREATE TABLE purchase_order (purchase_order_id INT PRIMARY KEY, created_at TIMESTAMP, last_updated TIMESTAMP,
+    staff_id INT, counterparty_id INT, item_code TEXT, item_quantity INT, item_unit_price NUMERIC, currency_id INT,
+    agreed_delivery_date TEXT, agreed_payment_date TEXT, agreed_delivery_location_id INT);
+CREATE TABLE payment (payment_id INT PRIMARY KEY, created_at TIMESTAMP, last_updated TIMESTAMP, transaction_id INT,
+    counterparty_id INT, payment_amount NUMERIC(10, 2), currency_id INT, payment_type_id INT, paid BOOLEAN,
+    payment_date TEXT);
+
+INSERT INTO currency VALUES (1, 'GBP', '2023-01-01', '2023-01-01'), (2, 'USD', '2023-01-01', '2023-01-01');
+INSERT INTO department VALUES (1, 'Sales', 'Leeds', '2023-01-01', '2023-01-01'),
+    (2, 'Purchasing', 'Manchester', '2023-01-01', '2023-01-01');
+INSERT INTO staff VALUES (1, 'Ada', 'Lovelace', 2, 'ada@example.com', '2023-01-01', '2023-01-01'),
+    (2, 'Alan', 'Turing', 1, 'alan@example.com', '2023-01-01', '2023-01-01');
+INSERT INTO address VALUES (1, '1 Main St', NULL, NULL, 'London', 'N1', 'UK', '000', '2023-01-01', '2023-01-01');
+INSERT INTO counterparty VALUES (1, 'Acme', 1, '2023-01-01', '2023-01-01');
+INSERT INTO design VALUES (1, 'Poster', '/designs', 'poster.pdf', '2023-01-01', '2023-01-01');
+INSERT INTO payment_type VALUES (1, 'SALES_RECEIPT', '2023-01-01', '2023-01-01');
+INSERT INTO transaction VALUES (1, 'SALE', 1, NULL, '2023-01-01', '2023-01-01');
+INSERT INTO sales_order VALUES
+    (1, '2024-01-02 10:00', '2024-01-02 10:00', 1, 2, 1, 10, 2.50, 1, '2024-01-20', '2024-01-25', 1),
+    (2, '2024-01-15 10:00', '2024-01-15 10:00', 1, 2, 1, 5, 3.00, 2, '2024-02-01', '2024-02-03', 1),
+    -- created in January, changed in the second window
+    (3, '2024-01-03 10:00', '2024-01-16 10:00', 1, 2, 1, 7, 1.00, 1, '2024-01-21', '2024-01-22', 1),
+    (4, '2024-02-02 10:00', '2024-02-02 10:00', 1, 2, 1, 1, 9.99, 1, '2024-02-10', '2024-02-11', 1);
+INSERT INTO purchase_order VALUES
+    (1, '2024-01-04 09:00', '2024-01-04 09:00', 1, 1, 'SKU1', 3, 4.50, 1, '2024-01-10', '2024-01-12', 1);
+INSERT INTO payment VALUES
+    (1, '2024-01-05 08:00', '2024-01-05 08:00', 1, 1, 25.00, 1, 1, false, '2024-01-05'),
+    (2, '2024-01-25 08:00', '2024-01-25 08:00', 1, 1, 15.00, 1, 1, true, '2024-01-25');
+"""
+
+
+def test_backfill_loads_real_warehouse_through_existing_partitions(warehouse_db, warehouse_pg, monkeypatch, tmp_path):
+    import pg8000.dbapi
+
+    from loading.db_client_load import WarehouseDBClient
+
+    source = f"{warehouse_db}_source"
+    conn = pg8000.dbapi.connect(database="postgres", **warehouse_pg)
+    conn.autocommit = True
+    conn.cursor().execute(f'CREATE DATABASE "{source}"')
+    conn.close()
+    conn = pg8000.dbapi.connect(database=source, **warehouse_pg)
+    conn.autocommit = True
+    conn.cursor().execute(SOURCE_DDL)
+    conn.close()
+
+    monkeypatch.setenv("DB_HOST", warehouse_pg["host"])
+    monkeypatch.setenv("DB_PORT", str(warehouse_pg["port"]))
+    monkeypatch.setenv("DB_NAME", source)
+    monkeypatch.setenv("DB_USER", warehouse_pg["user"])
+    monkeypatch.setenv("DB_PASSWORD", warehouse_pg["password"])
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-2")
+    monkeypatch.setattr(backfill, "ProcessPoolExecutor", ThreadPoolExecutor)
+
+    progress = str(tmp_path / "progress.json")
+    # the January partition is created by one window and merged into by the next two
+    summary = run_backfill(
+        datetime(2024, 1, 1), datetime(2024, 2, 10), window_days=10, workers=2, progress_path=progress
+    )
+    assert summary["failed"] == []
+    assert summary["ran"][0] == "dimensions" and summary["ran"][-1] == "dim_date"
+
+    def warehouse():
+        with WarehouseDBClient() as db:
+            rows = lambda sql: [tuple(row) for row in db.fetchall(sql)]
+            return {
+                "staff": rows("SELECT staff_id, department_name FROM dim_staff ORDER BY 1;"),
+                "sales": rows("SELECT sales_order_id, units_sold FROM fact_sales_order ORDER BY 1;"),
+                "purchases": rows("SELECT purchase_order_id FROM fact_purchase_order;"),
+                "payments": rows("SELECT payment_id FROM fact_payment ORDER BY 1;"),
+                "days": rows("SELECT count(*), min(date), max(date) FROM dim_date;"),
+                "partitions": rows(
+                    "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = 'fact_sales_order'::regclass ORDER BY 1;"
+                ),
+            }
+
+    loaded = warehouse()
+    assert loaded["staff"] == [(1, "Purchasing"), (2, "Sales")]
+    assert loaded["sales"] == [(1, 10), (2, 5), (3, 7), (4, 1)]
+    assert loaded["purchases"] == [(1,)]
+    assert loaded["payments"] == [(1,), (2,)]
+    assert [name for (name,) in loaded["partitions"]] == ["fact_sales_order_p2024_01", "fact_sales_order_p2024_02"]
+    # every day mentioned by any window, from the first order to the last agreed date
+    assert [(str(low), str(high)) for _, low, high in loaded["days"]] == [("2024-01-02", "2024-02-11")]
+
+    # a fresh run over the same range merges into the existing partitions: same rows
+    rerun = run_backfill(
+        datetime(2024, 1, 1), datetime(2024, 2, 10), window_days=10, workers=2, progress_path=str(tmp_path / "again.json")
+    )
+    assert rerun["failed"] == []
+    assert warehouse() == loaded
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Sequence
+
+import pandas as pd
+from botocore.exceptions import ClientError
+
+from loading.load_service import LoadService
+from local_pipeline.runner import raw_frame
+
+
+def test_raw_frame_matches_the_landing_json_round_trip():
+    rows = [
+        {"payment_id": 1, "amount": Decimal("10.50"), "payment_date": date(2024, 1, 2),
+         "last_updated": datetime(2024, 1, 2, 10, 30, 0, 123000), "paid": True, "note": None},
+        {"payment_id": 2, "amount": Decimal("3.00"), "payment_date": date(2024, 1, 3),
+         "last_updated": datetime(2024, 1, 3, 9, 0), "paid": False, "note": "x"},
+    ]
+
+    from_json = pd.DataFrame(json.loads(json.dumps(rows, default=str)))
+
+    pd.testing.assert_frame_equal(raw_frame(rows, list(rows[0])), from_json)
+
+
+def test_raw_frame_keeps_the_columns_of_an_empty_table():
+    df = raw_frame([], ["staff_id", "first_name"])
+
+    assert df.empty
+    assert list(df.columns) == ["staff_id", "first_name"]
+
+
+class _FakeBody:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def read(self) -> bytes:
+        return self._data
+
+
+@dataclass
+class FakeS3Api:
+    objects: Dict[str, bytes] = field(default_factory=dict)
+
+    def get_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "Not Found"}}, "GetObject")
+        return {"Body": _FakeBody(self.objects[Key])}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, ContentType: str = "application/json") -> Dict[str, Any]:
+        self.objects[Key] = Body
+        return {}
+
+
+@dataclass
+class FakeS3LoadingClient:
+    s3: Any = field(default_factory=FakeS3Api)
+    keys: List[str] = field(default_factory=list)
+
+    def list_parquet_keys(self, table: str) -> List[str]:
+        return sorted(k for k in self.keys if k.startswith(f"{table}/"))
+
+    def read_parquet_to_df(self, key: str) -> pd.DataFrame:
+        raise AssertionError(f"frames are loaded from memory, not read back: {key}")
+
+
+@dataclass
+class FakeDB:
+    executed_sql: List[str] = field(default_factory=list)
+    inserts: List[tuple] = field(default_factory=list)
+
+    def execute(self, sql: str) -> None:
+        self.executed_sql.append(sql)
+
+    def executemany(self, sql: str, params: List[Sequence[Any]], chunk_size: int = 1000) -> None:
+        self.inserts.append((sql.split('"')[1], len(params)))
+
+
+def test_load_frames_loads_in_memory_and_checkpoints_persisted_fact_keys(monkeypatch):
+    monkeypatch.setattr(
+        "loading.load_service.CREATE_TABLE_SQL",
+        {
+            "dim_currency": 'CREATE TABLE IF NOT EXISTS "dim_currency" (currency_id INT);',
+            "fact_payment": 'CREATE TABLE IF NOT EXISTS "fact_payment" (payment_id INT REFERENCES "dim_currency");',
+        },
+    )
+    monkeypatch.setattr("loading.load_service.ADD_COLUMNS", {})
+
+    fact_key = "fact_payment/year=2024/month=01/day=02/processed_1.parquet"
+    fake_s3 = FakeS3LoadingClient(keys=[fact_key])
+    db = FakeDB()
+    svc = LoadService(processed_bucket="fake-processed", db=db)
+    svc.s3_client = fake_s3
+
+    frames = {
+        "fact_payment": pd.DataFrame(
+            {"payment_id": [1, 2], "last_updated": pd.to_datetime(["2024-01-02 10:00", "2024-01-02 11:00"])}
+        ),
+        "dim_currency": pd.DataFrame({"currency_id": [1, 2, 3]}),
+    }
+    result = svc.load_frames(frames, s3_keys={"fact_payment": [fact_key]})
+
+    assert [entry["table"] for entry in result["tables"]] == ["dim_currency", "fact_payment"]
+    assert db.inserts == [("dim_currency", 3), ("fact_payment", 2)]
+    assert result["tables"][1]["mode"] == "append"
+
+    ckpt = json.loads(fake_s3.s3.objects["_load_checkpoints/fact_payment.json"])
+    assert ckpt["last_loaded_key"] == fact_key
+    assert ckpt["last_loaded_ts"].startswith("2024-01-02T11:00:00")
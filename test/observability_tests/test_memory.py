@@ -0,0 +1,62 @@
+import json
+
+from ingestion.ingest_service import IngestionService
+from observability.memory import track
+
+
+def test_track_is_a_no_op_unless_enabled(monkeypatch, capsys):
+    monkeypatch.delenv("MEMORY_PROFILE", raising=False)
+
+    with track("loading", "dim_staff") as memory:
+        pass
+
+    assert memory == {}
+    assert capsys.readouterr().out == ""
+
+
+def test_tracemalloc_mode_reports_peaks_and_top_allocators(monkeypatch, capsys):
+    monkeypatch.setenv("MEMORY_PROFILE", "tracemalloc")
+    monkeypatch.setenv("MEMORY_PROFILE_TOP", "3")
+
+    with track("transformation", "make_fact_sales_order") as memory:
+        blob = [bytes(1024) for _ in range(2048)]  # ~2 MB
+    del blob
+
+    assert memory["peak_rss_mb"] > 0
+    assert memory["traced_peak_mb"] >= 2
+    assert 0 < len(memory["top_allocations"]) <= 3
+    assert "test_memory.py:" in memory["top_allocations"][0]["where"]
+
+    document = json.loads(capsys.readouterr().out)
+    assert (document["Stage"], document["Table"]) == ("transformation", "make_fact_sales_order")
+    assert document["PeakRSS"] == memory["peak_rss_mb"]
+    assert document["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["Stage", "Table"]]
+
+
+def test_ingest_all_tables_returns_memory_per_table(mocker, monkeypatch):
+    monkeypatch.setenv("MEMORY_PROFILE", "rss")
+    mock_db = mocker.patch("ingestion.ingest_service.DatabaseClient")
+    mocker.patch("ingestion.ingest_service.S3Client")
+    mock_db.return_value.fetch_changes.side_effect = [[], Exception("DB failed!")]
+
+    results = IngestionService(bucket="test-bucket").ingest_all_tables(tables=["staff", "currency"])
+
+    assert results["staff"]["status"] == "no_changes"
+    assert results["currency"]["status"] == "error"
+    assert all(results[table]["memory"]["peak_rss_mb"] > 0 for table in results)
+
+
+def test_nested_blocks_keep_the_outer_peak(monkeypatch, capsys):
+    monkeypatch.setenv("MEMORY_PROFILE", "tracemalloc")
+
+    with track("loading", "run") as outer:
+        blob = b"x" * (64 * 1024 * 1024)  # touched, so it shows in RSS too
+        del blob
+        with track("loading", "dim_staff") as inner:
+            small = [bytes(1024) for _ in range(1024)]  # ~1 MB
+        del small
+
+    assert inner["traced_peak_mb"] < 16
+    assert outer["traced_peak_mb"] >= 64
+    assert outer["peak_rss_mb"] >= inner["peak_rss_mb"] + 32
+    assert [json.loads(line)["Table"] for line in capsys.readouterr().out.splitlines()] == ["dim_staff", "run"]
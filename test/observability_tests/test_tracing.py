@@ -0,0 +1,71 @@
+import io
+import json
+
+import pytest
+
+from ingestion.ingest_service import IngestionService
+from observability.tracing import EMFSink, InMemorySink, Span, invocation, span
+
+
+def test_spans_are_recorded_only_inside_an_invocation():
+    sink = InMemorySink()
+
+    with span("outside"):
+        pass
+
+    with invocation("loading", sink=sink):
+        with span("insert", table="fact_payment") as attrs:
+            attrs["rows"] = 3
+        with pytest.raises(RuntimeError):
+            with span("ddl"):
+                raise RuntimeError("boom")
+
+    assert sink.names() == ["insert", "ddl"]
+    insert, ddl = sink.spans
+    assert insert.attributes == {"table": "fact_payment", "rows": 3}
+    assert not insert.error and ddl.error
+    assert sink.invocations[0][0] == "loading"
+
+
+def test_ingestion_spans_cover_checkpoint_fetch_and_write(mocker):
+    mock_db = mocker.patch("ingestion.ingest_service.DatabaseClient")
+    mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
+    mock_db.return_value.fetch_changes.return_value = [{"id": 1, "last_updated": "2025-01-01T00:00:00"}]
+    mock_db.return_value.infer_timestamp_column.return_value = "last_updated"
+    mock_s3.return_value.get_checkpoint.return_value = None
+
+    sink = InMemorySink()
+    with invocation("ingestion", sink=sink):
+        IngestionService(bucket="test-bucket").ingest_table_changes("staff")
+
+    assert sink.names() == ["checkpoint_read", "db_fetch", "checkpoint_write"]
+    assert sink.spans[1].attributes == {"table": "staff", "rows": 1}
+
+
+def test_emf_sink_writes_one_document_per_span_name():
+    stream = io.StringIO()
+    spans = [Span("s3_put", 0.010), Span("s3_put", 0.020, error=True), Span("parquet_encode", 0.005)]
+
+    EMFSink(namespace="Test", stream=stream).emit("transformation", spans, {"FunctionName": "transform"})
+
+    documents = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [doc["Span"] for doc in documents] == ["s3_put", "parquet_encode"]
+    put = documents[0]
+    assert put["Service"] == "transformation" and put["FunctionName"] == "transform"
+    assert put["Duration"] == [10.0, 20.0]
+    assert (put["Calls"], put["Errors"]) == (2, 1)
+    metrics = put["_aws"]["CloudWatchMetrics"][0]
+    assert metrics["Namespace"] == "Test"
+    assert metrics["Dimensions"] == [["Service", "Span"]]
+
+
+def test_emf_duration_values_are_capped_without_losing_time():
+    stream = io.StringIO()
+    spans = [Span("insert", 0.001) for _ in range(150)]
+
+    EMFSink(namespace="Test", stream=stream).emit("loading", spans, {})
+
+    document = json.loads(stream.getvalue())
+    assert len(document["Duration"]) == 100
+    assert sum(document["Duration"]) == pytest.approx(150.0)
+    assert document["Calls"] == 150
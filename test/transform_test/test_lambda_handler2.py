@@ -37,3 +37,47 @@ def test_lambda_handler_calls_run(monkeypatch):
     assert calls["init"] == ('landing_bucket', 'processed_bucket')
     assert calls["run_single_table"] == "sales_order"
     assert resp["statusCode"] == 200
+
+
+def test_lambda_handler_coalesces_s3_and_sqs_records(monkeypatch):
+    import transformation.lambda_handler as lh
+
+    monkeypatch.setenv("LANDING_BUCKET_NAME", "landing_bucket")
+    monkeypatch.setenv("PROCESSED_BUCKET_NAME", "processed_bucket")
+
+    calls = []
+
+    class FakeTransformService:
+        def __init__(self, ingest_bucket: str, processed_bucket: str):
+            pass
+
+        def run_single_table(self, table_name: str):
+            calls.append(table_name)
+            if table_name == "payment":
+                raise RuntimeError("boom")
+            return {"table": table_name, "status": "success"}
+
+    monkeypatch.setattr(lh, "TransformService", FakeTransformService)
+
+    def s3_record(key):
+        return {"s3": {"object": {"key": key}}}
+
+    sqs_body = {"Records": [s3_record("sales_order/raw_2.json"), s3_record("payment/raw_1.json")]}
+    event = {
+        "Records": [
+            {"eventSource": "aws:sqs", "messageId": "m1", "body": json.dumps({"Records": [s3_record("sales_order/raw_1.json")]})},
+            {"eventSource": "aws:sqs", "messageId": "m2", "body": json.dumps(sqs_body)},
+            {"eventSource": "aws:sqs", "messageId": "m3", "body": json.dumps({"Event": "s3:TestEvent"})},
+            {"eventSource": "aws:sqs", "messageId": "m4", "body": json.dumps({"Records": [s3_record("checkpoints/staff_checkpoint.json")]})},
+        ]
+    }
+
+    resp = lh.lambda_handler(event, None)
+    body = json.loads(resp["body"])
+
+    assert calls == ["sales_order", "payment"]
+    assert body["records"] == 4
+    assert body["skipped"] == 1
+    assert body["coalesced"] == 1
+    assert body["tables"]["sales_order"]["status"] == "success"
+    assert resp["batchItemFailures"] == [{"itemIdentifier": "m2"}]
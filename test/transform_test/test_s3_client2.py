@@ -6,6 +6,10 @@ from io import BytesIO
 import json
 import pandas as pd
 import pytest
+import boto3
+import pyarrow.parquet as pq
+from datetime import date
+from moto import mock_aws
 from transformation.s3_client import S3TransformationClient
 
 
@@ -26,14 +30,34 @@ def test_read_raw_json_list_format(mocker):
 
 class FakeBotoS3:
     """Minimal fake boto3 S3 client."""
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
     def __init__(self):
         self.objects = {}  # {(Bucket, Key): bytes}
 
     def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
         body = self.objects[(Bucket, Key)]
         return {"Body": io.BytesIO(body)}
 
-    def put_object(self, Bucket, Key, Body):
+    def get_paginator(self, name):
+        fake = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix=""):
+                contents = [
+                    {"Key": key, "LastModified": i}
+                    for i, (bucket, key) in enumerate(fake.objects)
+                    if bucket == Bucket and key.startswith(Prefix)
+                ]
+                return [{"Contents": contents}]
+
+        return Paginator()
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
         if isinstance(Body, str):
             Body = Body.encode("utf-8")
         self.objects[(Bucket, Key)] = Body
@@ -73,4 +97,105 @@ def test_write_parquet_puts_object(monkeypatch):
     # Verify it wrote something to S3 under returned key
     assert ("processed", key) in fake_s3.objects
     assert key.startswith("dim_test/processed_")
-    assert key.endswith(".parquet")
\ No newline at end of file
+    assert key.endswith(".parquet")
+    assert client.read_index("dim_test") == [key]
+
+
+def test_write_parquet_seeds_missing_index_from_listing(monkeypatch):
+    fake_s3 = FakeBotoS3()
+    fake_s3.objects[("processed", "dim_test/processed_old.parquet")] = b"old"
+
+    import transformation.s3_client as s3_mod
+    monkeypatch.setattr(s3_mod.boto3, "client", lambda service: fake_s3)
+
+    client = S3TransformationClient(bucket="processed")
+    key = client.write_parquet("dim_test", pd.DataFrame({"id": [1]}))
+
+    assert client.read_index("dim_test") == ["dim_test/processed_old.parquet", key]
+
+
+@mock_aws
+def test_write_partitioned_parquet_only_rewrites_changed_partitions():
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="processed")
+
+    client = S3TransformationClient(bucket="processed")
+    df = pd.DataFrame(
+        {
+            "sales_order_id": [1, 2, 3],
+            "created_date": [date(2024, 1, 1), date(2024, 1, 1), date(2024, 1, 2)],
+        }
+    )
+
+    first = client.write_partitioned_parquet("fact_sales_order", df, "created_date")
+    assert len(first) == 2
+    assert first[0].startswith("fact_sales_order/year=2024/month=01/day=01/processed_")
+
+    # New row only touches 2024-01-02; 2024-01-01 must be left alone
+    df2 = pd.concat(
+        [df, pd.DataFrame({"sales_order_id": [4], "created_date": [date(2024, 1, 2)]})],
+        ignore_index=True,
+    )
+    second = client.write_partitioned_parquet("fact_sales_order", df2, "created_date")
+    assert len(second) == 1
+    assert "/day=02/" in second[0]
+
+    keys = [o["Key"] for o in s3.list_objects_v2(Bucket="processed")["Contents"] if o["Key"].endswith(".parquet")]
+    assert sorted(keys) == sorted([first[0], second[0]])
+    # index tracks the live outputs in write order (replaced day=02 file dropped)
+    assert client.read_index("fact_sales_order") == [first[0], second[0]]
+    day2 = pd.read_parquet(BytesIO(s3.get_object(Bucket="processed", Key=second[0])["Body"].read()))
+    assert list(day2["sales_order_id"]) == [3, 4]
+
+
+@mock_aws
+def test_write_partitioned_parquet_switches_index_before_deleting_and_drops_empty_partitions(monkeypatch):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="processed")
+
+    client = S3TransformationClient(bucket="processed")
+    df = pd.DataFrame(
+        {
+            "sales_order_id": [1, 2],
+            "created_date": [date(2024, 1, 1), date(2024, 1, 2)],
+        }
+    )
+    first = client.write_partitioned_parquet("fact_sales_order", df, "created_date")
+
+    # the old files must still exist when the index is switched to the new ones
+    live_at_swap = []
+    update_index = client.update_index
+
+    def recording_update_index(table_name, added, removed=None):
+        live_at_swap.extend(o["Key"] for o in s3.list_objects_v2(Bucket="processed")["Contents"])
+        return update_index(table_name, added, removed)
+
+    monkeypatch.setattr(client, "update_index", recording_update_index)
+
+    # day=01 no longer has rows, day=02 changes
+    df2 = pd.DataFrame({"sales_order_id": [2, 3], "created_date": [date(2024, 1, 2), date(2024, 1, 2)]})
+    second = client.write_partitioned_parquet("fact_sales_order", df2, "created_date")
+
+    assert set(first) <= set(live_at_swap)
+    assert second[0] in live_at_swap
+    keys = [o["Key"] for o in s3.list_objects_v2(Bucket="processed")["Contents"] if o["Key"].endswith(".parquet")]
+    assert keys == second
+    assert client.read_index("fact_sales_order") == second
+
+
+def test_write_parquet_applies_storage_profile(monkeypatch):
+    fake_s3 = FakeBotoS3()
+
+    import transformation.s3_client as s3_mod
+    monkeypatch.setattr(s3_mod.boto3, "client", lambda service: fake_s3)
+
+    client = S3TransformationClient(bucket="processed")
+    df = pd.DataFrame({"id": [3, 1, 2], "code": ["c", "a", "b"]})
+    profile = {"compression": "zstd", "compression_level": 5, "row_group_size": 2, "sort_by": ["id"]}
+
+    key = client.write_parquet("dim_test", df, profile=profile)
+
+    parquet = pq.ParquetFile(BytesIO(fake_s3.objects[("processed", key)]))
+    assert parquet.metadata.num_row_groups == 2
+    assert parquet.metadata.row_group(0).column(0).compression == "ZSTD"
+    assert list(parquet.read().to_pandas()["id"]) == [1, 2, 3]
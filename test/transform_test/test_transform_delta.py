@@ -0,0 +1,162 @@
+import json
+from io import BytesIO
+
+import boto3
+import pandas as pd
+from moto import mock_aws
+
+from transformation.transform_service import TransformService
+
+
+def _sales_order(sales_order_id, created_at):
+    return {
+        "sales_order_id": sales_order_id,
+        "created_at": created_at,
+        "last_updated": created_at,
+        "staff_id": 1,
+        "counterparty_id": 1,
+        "units_sold": 10,
+        "unit_price": 2.5,
+        "currency_id": 1,
+        "design_id": 1,
+        "agreed_delivery_location_id": 1,
+        "agreed_delivery_date": "2024-02-01",
+        "agreed_payment_date": "2024-02-02",
+    }
+
+
+def _seed(s3, key, rows):
+    s3.put_object(Bucket="landing", Key=key, Body=json.dumps(rows))
+
+
+def _fact_rows(s3, keys):
+    frames = [pd.read_parquet(BytesIO(s3.get_object(Bucket="processed", Key=k)["Body"].read())) for k in keys]
+    return sorted(pd.concat(frames)["sales_order_id"].tolist())
+
+
+@mock_aws
+def test_delta_mode_only_transforms_new_raw_files():
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="landing")
+    s3.create_bucket(Bucket="processed")
+
+    # dim_date (built alongside fact_sales_order) needs the other fact sources too
+    _seed(s3, "payment/raw_2024-01-01T00-00-00.json", [
+        {"created_at": "2024-01-01", "last_updated": "2024-01-01", "payment_date": "2024-01-01"}
+    ])
+    _seed(s3, "purchase_order/raw_2024-01-01T00-00-00.json", [
+        {"created_at": "2024-01-01", "last_updated": "2024-01-01",
+         "agreed_delivery_date": "2024-01-01", "agreed_payment_date": "2024-01-01"}
+    ])
+    _seed(s3, "sales_order/raw_2024-01-01T00-00-00.json", [
+        _sales_order(1, "2024-01-01T10:00:00"), _sales_order(2, "2024-01-02T10:00:00")
+    ])
+
+    first = TransformService("landing", "processed", mode="delta").run_single_table("sales_order")
+    fact = next(r for r in first["results"] if r["output"] == "fact_sales_order")
+    assert fact["rows"] == 2
+    assert all("/delta_" in key for key in fact["s3_keys"])
+
+    _seed(s3, "sales_order/raw_2024-01-03T00-00-00.json", [_sales_order(3, "2024-01-03T10:00:00")])
+
+    second = TransformService("landing", "processed", mode="delta").run_single_table("sales_order")
+    fact = next(r for r in second["results"] if r["output"] == "fact_sales_order")
+    assert fact["rows"] == 1
+    assert _fact_rows(s3, fact["s3_keys"]) == [3]
+
+    state = json.loads(s3.get_object(Bucket="processed", Key="_transform_state/sales_order.json")["Body"].read())
+    assert state["last_consumed_key"] == "sales_order/raw_2024-01-03T00-00-00.json"
+    manifest = json.loads(s3.get_object(Bucket="processed", Key=state["manifest"])["Body"].read())
+    assert manifest["sources"] == {"sales_order": ["sales_order/raw_2024-01-03T00-00-00.json"]}
+    assert manifest["outputs"]["fact_sales_order"]["s3_keys"] == fact["s3_keys"]
+
+    third = TransformService("landing", "processed", mode="delta").run_single_table("sales_order")
+    fact = next(r for r in third["results"] if r["output"] == "fact_sales_order")
+    assert fact["status"] == "skipped_no_delta"
+
+
+@mock_aws
+def test_failed_table_keeps_its_delta_state_when_another_table_succeeds(monkeypatch):
+    import transformation.lambda_handler as lh
+
+    monkeypatch.setenv("LANDING_BUCKET_NAME", "landing")
+    monkeypatch.setenv("PROCESSED_BUCKET_NAME", "processed")
+    monkeypatch.setenv("TRANSFORM_MODE", "delta")
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="landing")
+    s3.create_bucket(Bucket="processed")
+
+    # payment rows without payment_id etc.: make_fact_payment fails after reading its delta
+    _seed(s3, "payment/raw_2024-01-01T00-00-00.json", [
+        {"created_at": "2024-01-01", "last_updated": "2024-01-01", "payment_date": "2024-01-01"}
+    ])
+    _seed(s3, "purchase_order/raw_2024-01-01T00-00-00.json", [
+        {"created_at": "2024-01-01", "last_updated": "2024-01-01",
+         "agreed_delivery_date": "2024-01-01", "agreed_payment_date": "2024-01-01"}
+    ])
+    _seed(s3, "sales_order/raw_2024-01-01T00-00-00.json", [_sales_order(1, "2024-01-01T10:00:00")])
+
+    def s3_record(key):
+        return {"s3": {"object": {"key": key}}}
+
+    event = {"Records": [
+        {"eventSource": "aws:sqs", "messageId": "m1",
+         "body": json.dumps({"Records": [s3_record("payment/raw_2024-01-01T00-00-00.json")]})},
+        {"eventSource": "aws:sqs", "messageId": "m2",
+         "body": json.dumps({"Records": [s3_record("sales_order/raw_2024-01-01T00-00-00.json")]})},
+    ]}
+
+    resp = lh.lambda_handler(event, None)
+
+    body = json.loads(resp["body"])
+    assert body["tables"]["sales_order"]["status"] == "success"
+    assert resp["batchItemFailures"] == [{"itemIdentifier": "m1"}]
+
+    states = s3.list_objects_v2(Bucket="processed", Prefix="_transform_state/").get("Contents", [])
+    assert [obj["Key"] for obj in states] == ["_transform_state/sales_order.json"]
+    state = json.loads(s3.get_object(Bucket="processed", Key="_transform_state/sales_order.json")["Body"].read())
+    manifest = json.loads(s3.get_object(Bucket="processed", Key=state["manifest"])["Body"].read())
+    assert list(manifest["sources"]) == ["sales_order"]
+    assert list(manifest["outputs"]) == ["fact_sales_order"]
+
+
+def _dim_date(s3):
+    index = json.loads(s3.get_object(Bucket="processed", Key="_index/dim_date.json")["Body"].read())
+    body = s3.get_object(Bucket="processed", Key=index["keys"][-1])["Body"].read()
+    return pd.read_parquet(BytesIO(body))
+
+
+@mock_aws
+def test_delta_mode_builds_dim_date_from_new_raw_files_only(monkeypatch):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="landing")
+    s3.create_bucket(Bucket="processed")
+    _seed(s3, "payment/raw_2024-01-01T00-00-00.json", [
+        {"created_at": "2024-01-01", "last_updated": "2024-01-01", "payment_date": "2024-01-05"}
+    ])
+    _seed(s3, "sales_order/raw_2024-01-01T00-00-00.json", [_sales_order(1, "2024-01-01T10:00:00")])
+
+    def full_read(self, table_name):
+        raise AssertionError(f"delta mode read the full history of {table_name}")
+
+    monkeypatch.setattr("transformation.s3_client.S3TransformationClient.read_table", full_read)
+
+    TransformService("landing", "processed", mode="delta").run_single_table("sales_order")
+    assert sorted(_dim_date(s3)["date"].astype(str)) == ["2024-01-01", "2024-01-05", "2024-02-01", "2024-02-02"]
+    # payment's delta was read for dim_date only, so its state is not advanced
+    assert "Contents" not in s3.list_objects_v2(Bucket="processed", Prefix="_transform_state/payment")
+
+    _seed(s3, "sales_order/raw_2024-01-03T00-00-00.json", [_sales_order(2, "2023-12-31T10:00:00")])
+    second = TransformService("landing", "processed", mode="delta").run_single_table("sales_order")
+    dim_date = _dim_date(s3)
+    assert dim_date["date"].astype(str).tolist() == [
+        "2023-12-31", "2024-01-01", "2024-01-05", "2024-02-01", "2024-02-02"
+    ]
+    # same ids as a full build over every day
+    assert dim_date["date_id"].tolist() == [1, 2, 3, 4, 5]
+    assert next(r for r in second["results"] if r["output"] == "dim_date")["status"] == "written"
+
+    _seed(s3, "sales_order/raw_2024-01-04T00-00-00.json", [_sales_order(3, "2024-01-01T12:00:00")])
+    third = TransformService("landing", "processed", mode="delta").run_single_table("sales_order")
+    assert next(r for r in third["results"] if r["output"] == "dim_date")["status"] == "skipped_empty"
+    assert next(r for r in third["results"] if r["output"] == "fact_sales_order")["rows"] == 1
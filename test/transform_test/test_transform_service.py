@@ -22,10 +22,14 @@ class FakeS3TransformationClient:
         FakeS3TransformationClient.read_calls.append((self.bucket, table_name))
         return FakeS3TransformationClient.data[self.bucket][table_name].copy()
 
-    def write_parquet(self, table_name: str, df: pd.DataFrame):
+    def write_parquet(self, table_name: str, df: pd.DataFrame, profile=None):
         FakeS3TransformationClient.writes[self.bucket][table_name] = df.copy()
         return f"{table_name}/processed_TEST.parquet"
 
+    def write_partitioned_parquet(self, table_name: str, df: pd.DataFrame, partition_col: str, profile=None, delta=False):
+        FakeS3TransformationClient.writes[self.bucket][table_name] = df.copy()
+        return [f"{table_name}/year=2024/month=01/day=01/processed_TEST.parquet"]
+
 
 @pytest.fixture
 def seeded_service(monkeypatch):
@@ -176,6 +180,62 @@ def test_run_writes_all_required_tables(seeded_service):
     assert required.issubset(written), f"Missing: {required - written}"
 
 
+def test_run_returns_validation_reports(seeded_service):
+    service, _, _ = seeded_service
+
+    written = service.run()
+
+    assert written["dim_currency"]["validation"]["passed"] is True
+    assert written["dim_staff"]["validation"]["passed"] is True
+    assert all("seconds" in check for check in written["dim_staff"]["validation"]["checks"].values())
+
+
+
+def test_run_single_table_writes_fact_partitions(seeded_service):
+    service, _, processed = seeded_service
+
+    res = service.run_single_table("sales_order")
+
+    fact = next(r for r in res["results"] if r["output"] == "fact_sales_order")
+    assert fact["status"] == "written"
+    assert fact["s3_keys"] == ["fact_sales_order/year=2024/month=01/day=01/processed_TEST.parquet"]
+    assert "fact_sales_order" in FakeS3TransformationClient.writes[processed]
+
+
+
+def test_batched_tables_build_shared_outputs_once(seeded_service):
+    service, _, _ = seeded_service
+
+    service.run_single_table("sales_order")
+    res = service.run_single_table("payment")
+
+    dim_date = next(r for r in res["results"] if r["output"] == "dim_date")
+    assert dim_date["status"] == "skipped_duplicate"
+
+
+
+def test_run_single_table_validates_outputs_before_write(seeded_service, monkeypatch):
+    service, landing, processed = seeded_service
+
+    res = service.run_single_table("currency")
+    assert res["results"][0]["validation"]["passed"] is True
+
+    # staff in a department that does not exist -> department_name is NULL
+    FakeS3TransformationClient.data[landing]["staff"].loc[0, "department_id"] = 99
+    res = service.run_single_table("staff")
+    validation = res["results"][0]["validation"]
+    assert validation["checks"]["not_null"]["by_column"] == {"department_name": 1}
+
+    from transformation.validation import TransformValidationError
+
+    service.validation = "strict"
+    FakeS3TransformationClient.writes[processed].clear()
+    service._written_outputs.clear()
+    with pytest.raises(TransformValidationError):
+        service.run_single_table("staff")
+    assert "dim_staff" not in FakeS3TransformationClient.writes[processed]
+
+
 
 # TESTING FOR CORRECT TYPES IN EACH TABLE
 
@@ -360,6 +420,13 @@ def test_fact_payment_value_types(seeded_service):
     assert isinstance(df.loc[0, "paid"], (bool, np.bool_))
 
 
+def test_facts_carry_typed_utc_last_updated(seeded_service):
+    service, _, _ = seeded_service
+    for df in (service.make_fact_sales_order(), service.make_fact_purchase_order(), service.make_fact_payment()):
+        assert str(df["last_updated"].dtype) == "datetime64[ns, UTC]"
+    assert service.make_fact_payment().loc[0, "last_updated"] == pd.Timestamp("2024-01-05T08:30:00Z")
+
+
 
 def test_debug_dim_counterparty(seeded_service):
     service, _, _ = seeded_service
@@ -2,14 +2,12 @@ import pandas as pd
 import pytest
 
 from transformation.validation import (
-    validate_schema,
-    validate_not_null,
-    validate_row_count,
-    validate_row_drop,
+    OUTPUT_CONTRACTS,
+    validate_output,
     TransformValidationError,
 )
 
-def test_validate_schema_passes_when_schema_is_correct():
+def test_validate_output_passes_when_schema_is_correct():
     df = pd.DataFrame(
         {
             "id": [1, 2],
@@ -17,24 +15,22 @@ def test_validate_schema_passes_when_schema_is_correct():
         }
     )
 
-    expected_columns = ["id", "name"]
+    report = validate_output(df, {"columns": ["id", "name"]}, "test_table")
 
-    # не має впасти
-    validate_schema(df, expected_columns, "test_table")
+    assert report["passed"] is True
+    assert report["checks"]["schema"]["violations"] == 0
 
-def test_validate_schema_fails_when_column_missing():
+def test_validate_output_fails_when_column_missing():
     df = pd.DataFrame(
         {
             "id": [1, 2],
         }
     )
 
-    expected_columns = ["id", "name"]
-
     with pytest.raises(TransformValidationError):
-        validate_schema(df, expected_columns, "test_table")
+        validate_output(df, {"columns": ["id", "name"]}, "test_table", raise_on_error=True)
 
-def test_validate_schema_fails_when_extra_column_present():
+def test_validate_output_fails_when_extra_column_present():
     df = pd.DataFrame(
         {
             "id": [1],
@@ -43,12 +39,12 @@ def test_validate_schema_fails_when_extra_column_present():
         }
     )
 
-    expected_columns = ["id", "name"]
+    report = validate_output(df, {"columns": ["id", "name"]}, "test_table")
 
-    with pytest.raises(TransformValidationError):
-        validate_schema(df, expected_columns, "test_table")
+    assert report["checks"]["schema"]["extra"] == ["extra"]
+    assert report["passed"] is False
 
-def test_validate_not_null_fails_when_null_present():
+def test_validate_output_fails_when_null_present():
     df = pd.DataFrame(
         {
             "id": [1, None],
@@ -56,12 +52,10 @@ def test_validate_not_null_fails_when_null_present():
         }
     )
 
-    not_null_columns = ["id", "name"]
-
     with pytest.raises(TransformValidationError):
-        validate_not_null(df, not_null_columns, "test_table")
+        validate_output(df, {"not_null": ["id", "name"]}, "test_table", raise_on_error=True)
 
-def test_validate_not_null_passes_when_no_nulls():
+def test_validate_output_passes_when_no_nulls():
     df = pd.DataFrame(
         {
             "id": [1, 2],
@@ -69,35 +63,70 @@ def test_validate_not_null_passes_when_no_nulls():
         }
     )
 
-    not_null_columns = ["id", "name"]
+    report = validate_output(df, {"not_null": ["id", "name"]}, "test_table", raise_on_error=True)
 
-    validate_not_null(df, not_null_columns, "test_table")
+    assert report["checks"]["not_null"]["violations"] == 0
 
-def test_validate_row_count_fails_when_df_empty():
+def test_validate_output_fails_when_df_empty():
     df = pd.DataFrame(columns=["id", "name"])
 
     with pytest.raises(TransformValidationError):
-        validate_row_count(df, "test_table")
+        validate_output(df, {"min_rows": 1}, "test_table", raise_on_error=True)
+
+def test_validate_output_passes_when_drop_within_threshold():
+    df = pd.DataFrame({"id": range(95)})  # 95% залишилось
+
+    report = validate_output(df, {"max_row_drop": 0.9}, "test_table", source_count=100, raise_on_error=True)
+
+    assert report["checks"]["row_count"]["violations"] == 0
 
-def test_validate_row_drop_passes_when_drop_within_threshold():
-    source_count = 100
-    result_count = 95  # 95% залишилось
+def test_validate_output_fails_when_drop_exceeds_threshold():
+    df = pd.DataFrame({"id": range(50)})  # 50% залишилось
 
-    validate_row_drop(
-        source_count,
-        result_count,
-        table_name="test_table",
-        threshold=0.9,
+    with pytest.raises(TransformValidationError):
+        validate_output(df, {"max_row_drop": 0.9}, "test_table", source_count=100, raise_on_error=True)
+
+def test_fact_sales_order_contract_requires_agreed_dates():
+    not_null = OUTPUT_CONTRACTS["fact_sales_order"]["not_null"]
+
+    assert "agreed_payment_date" in not_null
+    assert "agreed_delivery_date" in not_null
+
+def test_validate_output_reports_all_violations_in_one_pass():
+    df = pd.DataFrame(
+        {
+            "id": [1, 1, 2, None],
+            "name": ["A", None, "B", "C"],
+        }
     )
+    contract = {"columns": ["id", "name", "code"], "not_null": ["id", "name"], "unique": ["id"], "min_rows": 1}
+
+    report = validate_output(df, contract, "test_table")
+
+    assert report["passed"] is False
+    assert report["checks"]["schema"]["missing"] == ["code"]
+    assert report["checks"]["not_null"]["by_column"] == {"id": 1, "name": 1}
+    assert report["checks"]["unique"]["violations"] == 1
+    assert report["checks"]["row_count"]["violations"] == 0
+    assert all("seconds" in check for check in report["checks"].values())
+
 
-def test_validate_row_drop_fails_when_drop_exceeds_threshold():
-    source_count = 100
-    result_count = 50  # 50% залишилось
+def test_validate_output_row_drop_and_strict_mode():
+    df = pd.DataFrame({"id": [1, 2]})
+    contract = {"columns": ["id"], "max_row_drop": 1.0}
+
+    report = validate_output(df, contract, "test_table", source_count=3)
+    assert report["checks"]["row_count"]["violations"] == 1
 
     with pytest.raises(TransformValidationError):
-        validate_row_drop(
-            source_count,
-            result_count,
-            table_name="test_table",
-            threshold=0.9,
-        )
\ No newline at end of file
+        validate_output(df, contract, "test_table", source_count=3, raise_on_error=True)
+
+
+def test_validate_output_samples_large_frames():
+    df = pd.DataFrame({"id": range(1000)})
+
+    report = validate_output(df, {"columns": ["id"], "not_null": ["id"], "unique": ["id"]}, "test_table", sample_rows=100)
+
+    assert report["rows"] == 1000
+    assert report["sampled_rows"] == 100
+    assert report["passed"] is True